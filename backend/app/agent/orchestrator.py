@@ -21,9 +21,17 @@ class AgentOrchestrator:
         copied.pop("content", None)
         return copied
 
+    def _replace_cached(self, items: List[Dict[str, Any]]):
+        # Edited items keep their position in the hot cache; unknown ids are ignored.
+        by_id = {x.get("id"): x for x in items if isinstance(x, dict)}
+        for i, cached in enumerate(self.global_cache):
+            updated = by_id.get(cached.get("id"))
+            if updated is not None:
+                self.global_cache[i] = updated
+
     async def broadcast(self, event: str, data: Any):
         out_data = data
-        if event == "new_intel":
+        if event in ("new_intel", "intel_updated"):
             out_data = self._strip_content_for_sse(data)
         msg = f"event: {event}\ndata: {json.dumps(out_data, ensure_ascii=False)}\n\n"
         
@@ -32,11 +40,46 @@ class AgentOrchestrator:
                 self.global_cache.append(data)
                 if len(self.global_cache) > 1000:
                     self.global_cache = self.global_cache[-1000:]
+        elif event == "intel_updated":
+            async with self.lock:
+                self._replace_cached([data])
+
+        self._deliver(msg)
+
+    async def broadcast_many(self, event: str, items: List[Any]):
+        """
+        Broadcast several items with one cache update and one enqueue per listener.
+        `new_intel` batches go out as a single `new_intel_batch` frame whose data is
+        the list of items; other events are concatenated into one chunk of frames.
+        """
+        items = list(items or [])
+        if not items:
+            return
+        if len(items) == 1:
+            await self.broadcast(event, items[0])
+            return
 
+        if event == "new_intel":
+            out_items = [self._strip_content_for_sse(x) for x in items]
+            msg = f"event: new_intel_batch\ndata: {json.dumps(out_items, ensure_ascii=False)}\n\n"
+            async with self.lock:
+                self.global_cache.extend(items)
+                if len(self.global_cache) > 1000:
+                    self.global_cache = self.global_cache[-1000:]
+        elif event == "intel_updated":
+            msg = "".join(f"event: {event}\ndata: {json.dumps(self._strip_content_for_sse(x), ensure_ascii=False)}\n\n" for x in items)
+            async with self.lock:
+                self._replace_cached(items)
+        else:
+            msg = "".join(f"event: {event}\ndata: {json.dumps(x, ensure_ascii=False)}\n\n" for x in items)
+
+        self._deliver(msg)
+
+    def _deliver(self, msg: str):
         to_remove = []
         for q in self.listeners:
             try:
-                await q.put(msg)
+                q.put_nowait(msg)
             except Exception:
                 to_remove.append(q)
         
@@ -102,6 +145,16 @@ class AgentOrchestrator:
                 return item
         return None
 
+    def get_cached_intel_many(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """`get_cached_intel` for many ids in one pass over the cache; ids not cached are left out"""
+        wanted = set(item_ids)
+        found: Dict[str, Dict[str, Any]] = {}
+        for item in self.global_cache:
+            item_id = item.get("id")
+            if item_id in wanted and item_id not in found:
+                found[item_id] = item
+        return found
+
     async def analyze_data_file(self):
         logger.info("Backfilling hot intel cache from database...")
         try:
@@ -0,0 +1,62 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from app import crud
+from app.database import SessionLocal
+from app.models import AgentSearchResponse, IntelItem
+from app.services.search_index import SearchResult, search_index
+
+
+def compose_answer(query: str, sources: List[IntelItem]) -> str:
+    # Extractive answer until an LLM stage is plugged in; retrieval works fully offline.
+    if not sources:
+        return f"未找到与“{query}”相关的情报。"
+    titles = "；".join(x.title for x in sources[:3])
+    return f"找到 {len(sources)} 条与“{query}”相关的情报，最相关的是：{titles}"
+
+
+async def retrieve_sources(
+    query: str,
+    type_filter: Optional[str] = "all",
+    range_filter: Optional[str] = "all",
+    top_k: int = 10,
+) -> Tuple[List[IntelItem], List[float], SearchResult]:
+    """BM25 top-k over the in-process index, materialized from the DB in rank order"""
+    top_k = max(1, min(top_k, 100))
+    result = search_index.search(query, top_k=top_k, type_filter=type_filter, range_filter=range_filter)
+    ids = [item_id for item_id, _ in result.hits]
+
+    def _load() -> List[IntelItem]:
+        db = SessionLocal()
+        try:
+            return crud.get_by_ids(db, ids)
+        finally:
+            db.close()
+
+    by_id = {x.id: x for x in (await asyncio.to_thread(_load) if ids else [])}
+    sources, scores = [], []
+    for item_id, score in result.hits:
+        item = by_id.get(item_id)
+        if item is None:
+            # Deleted by retention cleanup since it was indexed.
+            search_index.remove(item_id)
+            continue
+        sources.append(item)
+        scores.append(round(score, 4))
+    return sources, scores, result
+
+
+async def retrieve(
+    query: str,
+    type_filter: Optional[str] = "all",
+    range_filter: Optional[str] = "all",
+    top_k: int = 10,
+) -> AgentSearchResponse:
+    sources, scores, result = await retrieve_sources(query, type_filter, range_filter, top_k)
+    return AgentSearchResponse(
+        answer=compose_answer(query, sources),
+        sources=sources,
+        scores=scores,
+        took_ms=round(result.took_ms, 3),
+        truncated=result.truncated,
+    )
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.agent.retrieval import compose_answer, retrieve_sources
+from app.models import AgentSearchResponse
+
+logger = logging.getLogger("agent_tasks")
+
+TERMINAL = ("done", "failed")
+
+
+def task_key(query: str, type_filter: str, range_filter: str, top_k: int) -> Tuple[str, str, str, int]:
+    """Requests with the same key share one execution and its result"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split()), type_filter, range_filter, top_k
+
+
+class TaskQueueFull(Exception):
+    """Raised by `submit` when every worker is busy and the queue is full"""
+
+
+@dataclass(eq=False)
+class AgentTask:
+    id: str
+    key: Tuple[str, str, str, int]
+    query: str
+    type: str
+    range: str
+    top_k: int
+    status: str = "submitted"
+    result: Optional[AgentSearchResponse] = None
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+    # SSE frames emitted so far; late subscribers replay them.
+    events: List[str] = field(default_factory=list)
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def emit(self, event: str, data: Any):
+        payload = data if isinstance(data, str) else json.dumps(data)
+        self.events.append(f"event: {event}\ndata: {payload}\n\n")
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class AgentTaskEngine:
+    """
+    Registry and bounded worker pool for agent runs.
+
+    `submit` registers a task and queues it for one of `workers` coroutines, which
+    run retrieval and then the answer step, emitting SSE frames as they go. Any
+    number of streams can follow a task, from the start, while it runs or after it
+    finished. Identical requests (see `task_key`) share the in-flight task, and a
+    finished task keeps answering them for `dedup_seconds`. Finished tasks are
+    evicted `ttl_seconds` after completion, or oldest first beyond `max_tasks`.
+    """
+
+    def __init__(self):
+        self.configure()
+        self.workers: List[asyncio.Task] = []
+        self.is_running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, workers: int = 4, queue_size: int = 100, ttl_seconds: float = 600, dedup_seconds: float = 30, max_tasks: int = 1000):
+        self.worker_count = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.dedup_seconds = max(0.0, dedup_seconds)
+        self.max_tasks = max(1, max_tasks)
+        self._tasks: "OrderedDict[str, AgentTask]" = OrderedDict()
+        self._by_key: Dict[Tuple[str, str, str, int], AgentTask] = {}
+        self._last_sweep = 0.0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.is_running and self._loop is loop:
+            return
+        # A previous loop (e.g. a finished asyncio.run) leaves dead workers and tasks behind.
+        self.configure(self.worker_count, self.queue_size, self.ttl_seconds, self.dedup_seconds, self.max_tasks)
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self.is_running = True
+        logger.info(f"Agent task engine started: workers={self.worker_count}, queue_size={self.queue_size}")
+
+    async def stop(self):
+        if not self.is_running:
+            return
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.is_running = False
+
+    async def submit(self, query: str, type_filter: str = "hot", range_filter: str = "all", top_k: int = 10) -> AgentTask:
+        await self.start()
+        self._evict()
+        key = task_key(query, type_filter, range_filter, top_k)
+        shared = self._by_key.get(key)
+        if shared is not None and (
+            shared.status not in TERMINAL
+            or (shared.status == "done" and time.monotonic() - shared.finished_at <= self.dedup_seconds)
+        ):
+            return shared
+
+        task = AgentTask(str(uuid.uuid4()), key, query, type_filter, range_filter, top_k)
+        try:
+            self._queue.put_nowait(task)
+        except asyncio.QueueFull:
+            raise TaskQueueFull(f"Agent task queue is full ({self.queue_size} waiting)")
+        self._tasks[task.id] = task
+        self._by_key[key] = task
+        task.emit("status", {"status": "submitted"})
+        return task
+
+    def get(self, task_id: str) -> Optional[AgentTask]:
+        self._evict()
+        return self._tasks.get(task_id)
+
+    async def follow(self, task: AgentTask) -> AsyncIterator[str]:
+        """Yield every SSE frame of `task`, waiting for new ones until it finishes"""
+        sent = 0
+        while True:
+            while sent < len(task.events):
+                yield task.events[sent]
+                sent += 1
+            if task.status in TERMINAL:
+                return
+            await task.changed.wait()
+
+    async def _worker(self):
+        while True:
+            task: AgentTask = await self._queue.get()
+            try:
+                await self._execute(task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Agent task {task.id} failed: {e}")
+                task.error = str(e)
+                self._finish(task, "failed")
+                task.emit("error", {"message": "Agent task failed"})
+                task.emit("status", {"status": "failed"})
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, task: AgentTask):
+        task.status = "running"
+        task.emit("status", {"status": "running"})
+        task.emit("progress", {"step": "search", "message": "Searching..."})
+        sources, scores, found = await retrieve_sources(task.query, task.type, task.range, task.top_k)
+
+        task.emit("progress", {"step": "answer", "message": f"Found {len(sources)} sources", "sources": len(sources)})
+        task.result = AgentSearchResponse(
+            answer=compose_answer(task.query, sources),
+            sources=sources,
+            scores=scores,
+            took_ms=round(found.took_ms, 3),
+            truncated=found.truncated,
+        )
+        task.emit("result", task.result.model_dump_json())
+        self._finish(task, "done")
+        task.emit("status", {"status": "done"})
+
+    def _finish(self, task: AgentTask, status: str):
+        task.status = status
+        task.finished_at = time.monotonic()
+
+    def _evict(self):
+        now = time.monotonic()
+        if now - self._last_sweep < min(1.0, self.ttl_seconds) and len(self._tasks) <= self.max_tasks:
+            return
+        self._last_sweep = now
+        finished = [t for t in self._tasks.values() if t.status in TERMINAL]
+        expired = [t for t in finished if now - t.finished_at > self.ttl_seconds]
+        # Over the cap, the oldest finished tasks go first; queued or running ones are kept.
+        excess = len(self._tasks) - len(expired) - self.max_tasks
+        if excess > 0:
+            expired += [t for t in finished if now - t.finished_at <= self.ttl_seconds][:excess]
+        for task in expired:
+            del self._tasks[task.id]
+            if self._by_key.get(task.key) is task:
+                del self._by_key[task.key]
+
+
+agent_tasks = AgentTaskEngine()
@@ -0,0 +1,203 @@
+import asyncio
+import zlib
+from typing import Optional, Tuple
+
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Optional codecs: offered only when their package is installed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+class _Brotli:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+# Server preference, best first, with the level used for responses generated per request.
+CODECS = {"zstd": (_Zstd, 3), "br": (_Brotli, 4), "gzip": (_Gzip, 6)}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return tuple(name for name in CODECS if name == "gzip" or {"zstd": zstandard, "br": brotli}[name] is not None)
+
+
+def negotiate(accept_encoding: Optional[str], available: Tuple[str, ...]) -> Optional[str]:
+    """The first of `available` the client accepts (q > 0), honoring `*`; None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for name in available:
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def compress_body(encoding: str, body: bytes) -> bytes:
+    codec, level = CODECS[encoding]
+    c = codec(level)
+    return c.compress(body) + c.finish()
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip / br / zstd for JSON and text responses of `min_size` bytes
+    or more. Bodies of `offload_size` bytes or more are compressed in a thread, so
+    a large list page does not stall the event loop. Streaming responses are
+    compressed as a stream; for SSE every chunk the app sends (an event, or a
+    batch of them) is flushed at once, so live events keep their latency while
+    an `initial_batch` backlog shrinks with the shared compression window.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = 1024, offload_size: int = 64 * 1024):
+        self.app = app
+        self.min_size = min_size
+        self.offload_size = offload_size
+        self.available = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.available)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.active: Optional[bool] = None  # decided on the first body message
+        self.stream = None
+        self.flush_each = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.on_send)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if self.start["status"] < 200 or self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def on_send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.active is False:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.active is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            compressible = self._compressible(headers)
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if not compressible or (not more and len(body) < self.middleware.min_size):
+                self.active = False
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.active = True
+            headers["Content-Encoding"] = self.encoding
+            if not more:
+                body = await self._compress_once(body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            codec, level = CODECS[self.encoding]
+            self.stream = codec(level)
+            self.flush_each = headers.get("content-type", "").startswith("text/event-stream")
+            await self.send(self.start)
+
+        out = await self._compress_chunk(body, more)
+        if out or not more:
+            await self.send({"type": "http.response.body", "body": out, "more_body": more})
+
+    async def _compress_once(self, body: bytes) -> bytes:
+        if len(body) >= self.middleware.offload_size:
+            return await asyncio.to_thread(compress_body, self.encoding, body)
+        return compress_body(self.encoding, body)
+
+    async def _compress_chunk(self, body: bytes, more: bool) -> bytes:
+        def step() -> bytes:
+            out = self.stream.compress(body) if body else b""
+            if not more:
+                return out + self.stream.finish()
+            if self.flush_each:
+                return out + self.stream.flush()
+            return out
+
+        if len(body) >= self.middleware.offload_size:
+            return await asyncio.to_thread(step)
+        return step()
+
+
+def setup_compression(app: FastAPI, min_size: int = 1024, offload_size: int = 64 * 1024):
+    app.add_middleware(CompressionMiddleware, min_size=min_size, offload_size=offload_size)
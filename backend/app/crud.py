@@ -1,25 +1,65 @@
 from sqlalchemy.orm import Session
 from . import db_models
-from .models import IntelItem, Tag
+from .models import TAG_COLORS, IntelItem, Tag
 import json
 from datetime import datetime
-from sqlalchemy import or_
-from typing import List, Optional, Iterable
-
-def _deserialize_tags(raw_tags) -> List[Tag]:
-    if not raw_tags:
-        return []
-    tags: List[Tag] = []
-    for t in raw_tags:
-        if isinstance(t, dict):
-            tags.append(Tag(label=str(t.get("label", "")), color=str(t.get("color", "blue"))))
-        else:
-            tags.append(Tag(label=str(t), color="blue"))
-    return tags
+from sqlalchemy import String, func, insert, literal, null, or_, select, tuple_, type_coerce
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 def _serialize_tags(tags: List[Tag]):
     return [{"label": t.label, "color": t.color} for t in (tags or [])]
 
+# IntelItem 的字段顺序；按列元组查询，不构造 ORM 对象
+_INTEL_COLUMNS = (
+    db_models.IntelItemDB.id,
+    db_models.IntelItemDB.title,
+    db_models.IntelItemDB.summary,
+    db_models.IntelItemDB.source,
+    db_models.IntelItemDB.url,
+    db_models.IntelItemDB.publish_time_str.label("time"),
+    db_models.IntelItemDB.timestamp,
+    db_models.IntelItemDB.tags,
+    db_models.IntelItemDB.favorited,
+    db_models.IntelItemDB.is_hot,
+    db_models.IntelItemDB.content,
+    db_models.IntelItemDB.thing_id,
+    db_models.IntelItemDB.cluster_id,
+)
+_INTEL_FIELDS = ("id", "title", "summary", "source", "url", "time", "timestamp", "tags", "favorited", "is_hot", "content", "thing_id", "cluster_id")
+# 收藏列表与收藏切换的响应不含正文 / thingId / 聚类 (以 NULL 占位，字段不变)
+_INTEL_LIST_COLUMNS = _INTEL_COLUMNS[:10] + (null().label("content"), null().label("thing_id"), null().label("cluster_id"))
+
+def _tag_dicts(raw_tags) -> List[Dict[str, str]]:
+    """
+    存储的标签 -> Tag 形状的 dict (字符串标签为蓝色)。
+    列表快速路径不经过 Tag 校验，颜色在这里归一化：不在 Tag.color 取值范围内的按蓝色输出。
+    """
+    return [
+        {"label": str(t.get("label", "")), "color": t.get("color") if t.get("color") in TAG_COLORS else "blue"}
+        if isinstance(t, dict) else {"label": str(t), "color": "blue"}
+        for t in raw_tags or []
+    ]
+
+def _intel_dicts(rows) -> List[Dict[str, Any]]:
+    """
+    列元组 -> 与 IntelItem 序列化结果相同的 dict (零校验)，
+    供列表接口直接编码为 JSON。
+    """
+    out = []
+    for row in rows:
+        d = dict(zip(_INTEL_FIELDS, row))
+        d["tags"] = _tag_dicts(d["tags"])
+        out.append(d)
+    return out
+
+def _intel_items(rows) -> List[IntelItem]:
+    """列元组 -> 经过校验的 IntelItem，供内部调用方使用。"""
+    return [IntelItem(**d) for d in _intel_dicts(rows)]
+
+def _row_of(db_item) -> tuple:
+    """ORM 对象 -> 与 _INTEL_COLUMNS 查询相同的元组"""
+    return tuple(getattr(db_item, "publish_time_str" if f == "time" else f) for f in _INTEL_FIELDS)
+
 # ===========================
 # 原始数据操作 (Raw Data Operations)
 # ===========================
@@ -96,6 +136,36 @@ def create_intel_item(db: Session, item: IntelItem):
     db.refresh(db_item)
     return db_item
 
+def insert_missing_intel_items(db: Session, items: List[IntelItem]) -> int:
+    """
+    批量插入数据库中尚不存在的情报条目 (一次查询 + 一次批量 INSERT，单个事务)，
+    已存在的 ID 保持不变。返回插入的条数。
+    """
+    missing = set(missing_intel_ids(db, [x.id for x in items]))
+    rows = []
+    for x in items:
+        if x.id not in missing:
+            continue
+        missing.discard(x.id)  # 同一 ID 只插入一次
+        rows.append({
+            "id": x.id,
+            "title": x.title,
+            "summary": x.summary,
+            "source": x.source,
+            "url": x.url,
+            "publish_time_str": x.time,
+            "timestamp": x.timestamp,
+            "tags": _serialize_tags(x.tags),
+            "is_hot": x.is_hot,
+            "favorited": x.favorited,
+            "content": x.content,
+            "thing_id": x.thing_id,
+        })
+    if rows:
+        db.execute(db_models.IntelItemDB.__table__.insert(), rows)
+        db.commit()
+    return len(rows)
+
 def upsert_intel_item(db: Session, item: IntelItem):
     """
     Upsert intel item by primary key id.
@@ -146,6 +216,7 @@ def upsert_intel_items(db: Session, items: Iterable[IntelItem]) -> int:
         existing_by_thing_id = {r.thing_id: r for r in rows if r.thing_id}
 
     changed = 0
+    renamed = []
     for item in items_list:
         tags_list = _serialize_tags(item.tags)
         row = existing_by_id.get(item.id)
@@ -156,6 +227,8 @@ def upsert_intel_items(db: Session, items: Iterable[IntelItem]) -> int:
             if row.id != item.id:
                 if item.id and item.id not in existing_by_id:
                     existing_by_id.pop(row.id, None)
+                    # Feed clients still hold the row under its old id.
+                    renamed.append(row.id)
                     row.id = item.id
                     existing_by_id[row.id] = row
             row.title = item.title
@@ -170,6 +243,13 @@ def upsert_intel_items(db: Session, items: Iterable[IntelItem]) -> int:
                 row.content = item.content
             if item.thing_id:
                 row.thing_id = item.thing_id
+            if item.simhash is not None:
+                row.simhash = item.simhash
+                row.duplicate_of = item.duplicate_of
+            if item.cluster_id:
+                row.cluster_id = item.cluster_id
+            row.refine_hash = item.refine_hash
+            row.refine_tags = _serialize_tags(item.refine_tags) if item.refine_tags is not None else None
             changed += 1
             continue
 
@@ -186,6 +266,11 @@ def upsert_intel_items(db: Session, items: Iterable[IntelItem]) -> int:
             favorited=item.favorited,
             content=item.content,
             thing_id=item.thing_id,
+            simhash=item.simhash,
+            duplicate_of=item.duplicate_of,
+            cluster_id=item.cluster_id,
+            refine_hash=item.refine_hash,
+            refine_tags=_serialize_tags(item.refine_tags) if item.refine_tags is not None else None,
         )
         db.add(db_item)
         existing_by_id[item.id] = db_item
@@ -193,6 +278,8 @@ def upsert_intel_items(db: Session, items: Iterable[IntelItem]) -> int:
             existing_by_thing_id[item.thing_id] = db_item
         changed += 1
 
+    if renamed:
+        _write_tombstones(db, renamed)
     db.commit()
     return changed
 
@@ -220,29 +307,9 @@ def get_intel_by_id(db: Session, item_id: str):
     """
     return db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id == item_id).first()
 
-def get_filtered_intel(
-    db: Session,
-    type_filter: str = "all",
-    q: Optional[str] = None,
-    range_filter: str = "all",
-    limit: int = 20,
-    offset: int = 0
-):
-    """
-    获取过滤后的情报列表，支持多种筛选条件。
-    
-    参数:
-        db: 数据库会话
-        type_filter: 类型筛选 ("hot", "history", "all")
-        q: 搜索关键词 (匹配标题或摘要)
-        range_filter: 时间范围筛选 ("all", "3h", "6h", "12h")
-        limit: 每页条数
-        offset: 分页偏移量
-    
-    返回:
-        (pydantic_items, total): 元组，包含 Pydantic 对象列表和总记录数
-    """
-    query = db.query(db_models.IntelItemDB)
+def _filter_intel_query(query, type_filter: str = "all", q: Optional[str] = None, range_filter: str = "all"):
+    """列表与导出共用的筛选条件 (类型 / 关键词 / 时间范围)，不含排序。"""
+    query = query.filter(db_models.IntelItemDB.duplicate_of.is_(None))
 
     # 1. 类型筛选 (Type Filter)
     if type_filter == "hot":
@@ -272,39 +339,43 @@ def get_filtered_intel(
         elif range_filter == "12h":
             cutoff = now_ts - 12 * 3600
             query = query.filter(db_models.IntelItemDB.timestamp >= cutoff)
+    return query
+
+def get_filtered_intel(
+    db: Session,
+    type_filter: str = "all",
+    q: Optional[str] = None,
+    range_filter: str = "all",
+    limit: int = 20,
+    offset: int = 0,
+    as_dicts: bool = False,
+):
+    """
+    获取过滤后的情报列表，支持多种筛选条件。
     
+    参数:
+        db: 数据库会话
+        type_filter: 类型筛选 ("hot", "history", "all")
+        q: 搜索关键词 (匹配标题或摘要)
+        range_filter: 时间范围筛选 ("all", "3h", "6h", "12h")
+        limit: 每页条数
+        offset: 分页偏移量
+        as_dicts: 返回可直接编码的 dict 而不是 Pydantic 对象 (列表接口使用)
+    
+    返回:
+        (items, total): 元组，包含 Pydantic 对象 (或 dict) 列表和总记录数
+    """
+    query = _filter_intel_query(db.query(*_INTEL_COLUMNS), type_filter, q, range_filter)
     if type_filter == "history":
         query = query.order_by(db_models.IntelItemDB.created_at.desc(), db_models.IntelItemDB.timestamp.desc())
     else:
         query = query.order_by(db_models.IntelItemDB.timestamp.desc())
 
     total = query.count()
-    items = query.offset(offset).limit(limit).all()
-
-    # 将数据库模型转换为 Pydantic 模型以供响应
-    pydantic_items = []
-    for item in items:
-        tags = _deserialize_tags(item.tags)
-        pydantic_items.append(
-            IntelItem(
-                id=item.id,
-                title=item.title,
-                summary=item.summary,
-                source=item.source,
-                url=item.url,
-                time=item.publish_time_str,
-                timestamp=item.timestamp,
-                tags=tags,
-                favorited=item.favorited,
-                is_hot=item.is_hot,
-                content=item.content,
-                thing_id=item.thing_id
-            )
-        )
-
-    return pydantic_items, total
+    rows = query.offset(offset).limit(limit).all()
+    return (_intel_dicts(rows) if as_dicts else _intel_items(rows)), total
 
-def get_favorites(db: Session, q: Optional[str] = None, limit: int = 20, offset: int = 0):
+def get_favorites(db: Session, q: Optional[str] = None, limit: int = 20, offset: int = 0, as_dicts: bool = False):
     """
     获取收藏的情报列表。
     
@@ -313,8 +384,9 @@ def get_favorites(db: Session, q: Optional[str] = None, limit: int = 20, offset:
         q: 搜索关键词 (可选)
         limit: 每页条数
         offset: 分页偏移量
+        as_dicts: 返回可直接编码的 dict 而不是 Pydantic 对象
     """
-    query = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.favorited == True)
+    query = db.query(*_INTEL_LIST_COLUMNS).filter(db_models.IntelItemDB.favorited == True)
     
     if q:
         search = f"%{q}%"
@@ -328,27 +400,8 @@ def get_favorites(db: Session, q: Optional[str] = None, limit: int = 20, offset:
     query = query.order_by(db_models.IntelItemDB.timestamp.desc())
     
     total = query.count()
-    items = query.offset(offset).limit(limit).all()
-    
-    pydantic_items = []
-    for item in items:
-        tags = _deserialize_tags(item.tags)
-        pydantic_items.append(
-            IntelItem(
-                id=item.id,
-                title=item.title,
-                summary=item.summary,
-                source=item.source,
-                url=item.url,
-                time=item.publish_time_str,
-                timestamp=item.timestamp,
-                tags=tags,
-                favorited=item.favorited,
-                is_hot=item.is_hot
-            )
-        )
-        
-    return pydantic_items, total
+    rows = query.offset(offset).limit(limit).all()
+    return (_intel_dicts(rows) if as_dicts else _intel_items(rows)), total
 
 
 def toggle_favorite(db: Session, item_id: str, favorited: bool):
@@ -367,20 +420,8 @@ def toggle_favorite(db: Session, item_id: str, favorited: bool):
     if item:
         item.favorited = favorited
         db.commit()
-        # 返回转换后的 Pydantic 对象
-        tags = _deserialize_tags(item.tags)
-        return IntelItem(
-            id=item.id,
-            title=item.title,
-            summary=item.summary,
-            source=item.source,
-            url=item.url,
-            time=item.publish_time_str,
-            timestamp=item.timestamp,
-            tags=tags,
-            favorited=item.favorited,
-            is_hot=item.is_hot
-        )
+        # 返回转换后的 Pydantic 对象 (字段与收藏列表相同)
+        return _intel_items([_row_of(item)[:10] + (None, None, None)])[0]
     return None
 
 def get_by_ids(db: Session, ids: List[str]):
@@ -391,32 +432,109 @@ def get_by_ids(db: Session, ids: List[str]):
         db: 数据库会话
         ids: ID 字符串列表
     """
-    items = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.in_(ids)).all()
-    pydantic_items = []
-    for item in items:
-        tags = _deserialize_tags(item.tags)
-        pydantic_items.append(
-            IntelItem(
-                id=item.id,
-                title=item.title,
-                summary=item.summary,
-                source=item.source,
-                url=item.url,
-                time=item.publish_time_str,
-                timestamp=item.timestamp,
-                tags=tags,
-                favorited=item.favorited,
-                is_hot=item.is_hot,
-                content=item.content,
-                thing_id=item.thing_id
-            )
-        )
-    return pydantic_items
+    return _intel_items(db.query(*_INTEL_COLUMNS).filter(db_models.IntelItemDB.id.in_(ids)).all())
+
+def get_intel_item(db: Session, item_id: str) -> Optional[IntelItem]:
+    """根据 ID 获取情报详情 (Pydantic 对象)，不存在时返回 None。"""
+    rows = db.query(*_INTEL_COLUMNS).filter(db_models.IntelItemDB.id == item_id).all()
+    return _intel_items(rows)[0] if rows else None
+
+def get_dedup_state(db: Session, item_id: str):
+    """返回已持久化条目的 (duplicate_of, cluster_id)，不存在时返回 None (入库流水线判断是否为编辑)。"""
+    return db.query(db_models.IntelItemDB.duplicate_of, db_models.IntelItemDB.cluster_id).filter(db_models.IntelItemDB.id == item_id).first()
+
+def missing_intel_ids(db: Session, ids: List[str], chunk_size: int = 500) -> List[str]:
+    """返回数据库中不存在的 ID (按请求顺序)，只查询 ID 列。"""
+    found = set()
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        found.update(x for (x,) in db.query(db_models.IntelItemDB.id).filter(db_models.IntelItemDB.id.in_(chunk)))
+    return [x for x in ids if x not in found]
+
+def intel_versions(db: Session, ids: List[str], chunk_size: int = 500) -> Dict[str, Optional[float]]:
+    """返回 ID -> 最后修改时间 (updated_at)，只查询这两列；不存在的 ID 不在结果中。"""
+    versions = {}
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        rows = db.query(db_models.IntelItemDB.id, db_models.IntelItemDB.updated_at).filter(db_models.IntelItemDB.id.in_(chunk))
+        versions.update((x, v) for x, v in rows)
+    return versions
+
+# The stored value, not a parsed datetime, so it compares exactly when fed back as a cursor.
+_CREATED_AT_KEY = type_coerce(db_models.IntelItemDB.created_at, String).label("created_at_key")
+
+def iter_intel_rows(
+    db: Session,
+    type_filter: str = "all",
+    q: Optional[str] = None,
+    range_filter: str = "all",
+    ids: Optional[List[str]] = None,
+    chunk_size: int = 500,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    分块读取导出用的情报行 (dict，tags 为原始 JSON)，内存占用与总行数无关。
+
+    参数:
+        db: 数据库会话
+        type_filter / q / range_filter: 与 get_filtered_intel 相同的筛选条件
+        ids: 指定 ID 时按请求顺序导出，忽略其他筛选条件
+        chunk_size: 每块行数
+
+    按筛选条件导出时使用 keyset 分页：以上一块最后一行的排序键作为游标，
+    而不是 OFFSET，所以每一块都沿索引直接定位，排序与列表接口一致。
+    """
+    if ids:
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            rows = db.query(*_INTEL_COLUMNS).filter(db_models.IntelItemDB.id.in_(chunk)).all()
+            by_id = {r.id: dict(zip(_INTEL_FIELDS, r)) for r in rows}
+            yield [by_id[x] for x in chunk if x in by_id]
+        return
+
+    item = db_models.IntelItemDB
+    if type_filter == "history":
+        columns = (*_INTEL_COLUMNS, _CREATED_AT_KEY)
+        sort = (type_coerce(item.created_at, String), item.timestamp, item.id)
+        sort_key = lambda r: (r.created_at_key, r.timestamp, r.id)
+    else:
+        columns = _INTEL_COLUMNS
+        sort = (item.timestamp, item.id)
+        sort_key = lambda r: (r.timestamp, r.id)
+    query = _filter_intel_query(db.query(*columns), type_filter, q, range_filter).order_by(*(col.desc() for col in sort))
+    cursor = None
+    while True:
+        page = query if cursor is None else query.filter(tuple_(*sort) < tuple_(*cursor))
+        rows = page.limit(chunk_size).all()
+        if not rows:
+            return
+        cursor = sort_key(rows[-1])
+        # zip stops before the extra sort-key column
+        yield [dict(zip(_INTEL_FIELDS, r)) for r in rows]
+        if len(rows) < chunk_size:
+            return
+
+def _write_tombstones(db: Session, ids):
+    """
+    在调用方的事务中为 ids (ID 列表或 select) 写入变更流的删除记录，
+    同一 ID 先前删除留下的记录被替换。
+    """
+    tombstones = db_models.IntelTombstoneDB
+    db.query(tombstones).filter(tombstones.id.in_(ids)).delete(synchronize_session=False)
+    version = db_models.allocate_change_version(db.connection())
+    deleted_at = datetime.now().timestamp()
+    if isinstance(ids, list):
+        if ids:
+            db.execute(insert(tombstones), [{"id": x, "change_version": version, "deleted_at": deleted_at} for x in ids])
+        return
+    db.execute(insert(tombstones).from_select(
+        ["id", "change_version", "deleted_at"], ids.add_columns(literal(version), literal(deleted_at))
+    ))
 
 def clear_intel_items(db: Session):
     """
     清空所有情报数据 (慎用)。
     """
+    _write_tombstones(db, select(db_models.IntelItemDB.id))
     db.query(db_models.IntelItemDB).delete()
     db.commit()
 
@@ -427,10 +545,12 @@ def delete_old_intel_items(db: Session, days: int = 30) -> int:
     """
     cutoff_ts = datetime.now().timestamp() - (days * 86400)
     # Don't delete favorites!
-    deleted_count = db.query(db_models.IntelItemDB).filter(
+    expired = select(db_models.IntelItemDB.id).where(
         db_models.IntelItemDB.timestamp < cutoff_ts,
         db_models.IntelItemDB.favorited == False
-    ).delete()
+    )
+    _write_tombstones(db, expired)
+    deleted_count = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.in_(expired)).delete(synchronize_session=False)
     db.commit()
     return deleted_count
 
@@ -446,3 +566,71 @@ def demote_hot_items(db: Session, older_than_hours: int = 12) -> int:
     ).update({db_models.IntelItemDB.is_hot: False}, synchronize_session=False)
     db.commit()
     return int(updated or 0)
+
+def sync_change_counter(db: Session) -> int:
+    """
+    启动时调用：计数器不低于已有的最大版本 (计数器之前写入的数据库)，
+    并给变更版本列之前写入的行分配版本 (同一版本)，使其出现在变更流中。
+    返回补齐版本的条数。
+    """
+    item = db_models.IntelItemDB
+    tombstone = db_models.IntelTombstoneDB
+    counter = db_models.ChangeCounterDB
+    highest = max(
+        db.query(func.max(item.change_version)).scalar() or 0,
+        db.query(func.max(tombstone.change_version)).scalar() or 0,
+    )
+    db.query(counter).filter(counter.id == 1, counter.value < highest).update({counter.value: highest}, synchronize_session=False)
+    updated = 0
+    if db.query(item.id).filter(item.change_version.is_(None)).first() is not None:
+        version = db_models.allocate_change_version(db.connection())
+        updated = db.query(item).filter(item.change_version.is_(None)).update({item.change_version: version}, synchronize_session=False)
+    db.commit()
+    return int(updated or 0)
+
+def get_intel_changes(db: Session, since: int = 0, after_id: Optional[str] = None, limit: int = 200):
+    """
+    按 (change_version, id) 顺序返回游标之后的变更，keyset 分页。
+
+    参数:
+        db: 数据库会话
+        since / after_id: 上一页最后一条变更的版本与 ID (首次同步为 0 / None)
+            只给 since 时返回版本大于 since 的变更
+        limit: 每页条数
+
+    返回:
+        (changes, has_more): changes 中每项为
+        {"op": "upsert", "version", "item"} 或 {"op": "delete", "version", "id"}；
+        被标记为重复的条目与已删除的条目一样以 delete 返回 (列表接口不显示它们)。
+    """
+    item = db_models.IntelItemDB
+    tombstone = db_models.IntelTombstoneDB
+    def after(version_col, id_col):
+        # 只给版本时，该版本本身已同步过
+        if not after_id:
+            return version_col > since
+        return tuple_(version_col, id_col) > tuple_(since, after_id)
+
+    # 两个来源各取 limit + 1 条再归并，足以判断是否还有下一页
+    rows = (
+        db.query(*_INTEL_COLUMNS, item.change_version, item.duplicate_of)
+        .filter(item.change_version.isnot(None), after(item.change_version, item.id))
+        .order_by(item.change_version, item.id)
+        .limit(limit + 1)
+        .all()
+    )
+    deleted = (
+        db.query(tombstone.id, tombstone.change_version)
+        .filter(after(tombstone.change_version, tombstone.id))
+        .order_by(tombstone.change_version, tombstone.id)
+        .limit(limit + 1)
+        .all()
+    )
+    changes = [
+        {"op": "delete", "version": r.change_version, "id": r.id} if r.duplicate_of else
+        {"op": "upsert", "version": r.change_version, "item": d}
+        for r, d in zip(rows, _intel_dicts(rows))
+    ]
+    changes += [{"op": "delete", "version": r.change_version, "id": r.id} for r in deleted]
+    changes.sort(key=lambda c: (c["version"], c["id"] if c["op"] == "delete" else c["item"]["id"]))
+    return changes[:limit], len(changes) > limit
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime, JSON
+from sqlalchemy import Column, Index, Integer, BigInteger, String, Text, Boolean, Float, DateTime, JSON, event, update
 from sqlalchemy.sql import func
 from .database import Base
+import time
 import uuid
 
 def generate_uuid():
@@ -16,6 +17,40 @@ class RawData(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     processed = Column(Boolean, default=False)
 
+class ChangeCounterDB(Base):
+    """The single row (id 1) handing out change feed versions"""
+    __tablename__ = "change_counter"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+event.listen(
+    ChangeCounterDB.__table__,
+    "after_create",
+    lambda target, connection, **kw: connection.execute(target.insert().values(id=1, value=0)),
+)
+
+def allocate_change_version(connection) -> int:
+    """
+    Take the next change feed version inside the caller's transaction. The counter
+    row stays locked until that transaction ends (a row lock on Postgres, the write
+    lock on SQLite), so versions are unique and become visible in commit order:
+    a feed reader never sees a version after a later one.
+    """
+    counter = ChangeCounterDB.__table__
+    version = connection.execute(
+        update(counter).where(counter.c.id == 1).values(value=counter.c.value + 1).returning(counter.c.value)
+    ).scalar()
+    if version is None:
+        raise RuntimeError("change_counter has no row; create it with Base.metadata.create_all")
+    return version
+
+def _statement_change_version(context) -> int:
+    # One version per statement: the rows of a bulk insert or update share it.
+    if not hasattr(context, "_change_version"):
+        context._change_version = allocate_change_version(context.connection)
+    return context._change_version
+
 class IntelItemDB(Base):
     __tablename__ = "intel_items"
 
@@ -31,7 +66,32 @@ class IntelItemDB(Base):
     favorited = Column(Boolean, default=False)
     content = Column(Text, nullable=True) # Full translated content
     thing_id = Column(String, nullable=True) # Original CMS thingId
+    simhash = Column(BigInteger, nullable=True, index=True) # SimHash of title + summary
+    duplicate_of = Column(String, nullable=True, index=True) # Canonical item id if a near-duplicate
+    cluster_id = Column(String, nullable=True, index=True) # Story cluster (id of the item that started it)
+    refine_hash = Column(String, nullable=True) # Hash of the raw text the model refined
+    refine_tags = Column(JSON(none_as_null=True), nullable=True) # Tags the model gave for refine_hash, without source or gazetteer tags
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(Float, nullable=True, default=time.time, onupdate=time.time) # Epoch seconds of the last write (None on rows older than the column)
+    change_version = Column(BigInteger, nullable=True, index=True, default=_statement_change_version, onupdate=_statement_change_version) # Change feed position of the last write
+
+    __table_args__ = (
+        # Lists and keyset-paged exports only read canonical rows (duplicate_of IS NULL), newest first
+        Index("ix_intel_items_canonical_timestamp", "duplicate_of", "timestamp", "id"),
+        Index("ix_intel_items_canonical_created_at", "duplicate_of", "created_at", "timestamp", "id"),
+    )
+
+class IntelTombstoneDB(Base):
+    """A deleted intel item, kept so change feed clients learn about the deletion"""
+    __tablename__ = "intel_tombstones"
+
+    id = Column(String, primary_key=True)
+    change_version = Column(BigInteger, nullable=False, default=_statement_change_version)
+    deleted_at = Column(Float, nullable=False, default=time.time)
+
+    __table_args__ = (
+        Index("ix_intel_tombstones_change_version", "change_version", "id"),
+    )
 
 class UserDB(Base):
     __tablename__ = "users"
@@ -1,10 +1,24 @@
 from fastapi import FastAPI, Request
-from app.routes import intel, agent, auth
+from app.routes import intel, agent, auth, ingest
 from app.cors import setup_cors
+from app.compression import setup_compression
 from app.agent.orchestrator import orchestrator
+from app.agent.task_engine import agent_tasks
 from app.services.poller import article_poller
 from app.services.payload_poller import payload_poller
-from app.database import engine, Base
+from app.services.ingest_pipeline import ingest_pipeline
+from app.services.http_client import http_client
+from app.database import engine, Base, SessionLocal, add_missing_columns
+from app import crud
+from app.services.near_dup import near_dup_index
+from app.services.story_clusters import story_clusters
+from app.services.search_index import search_index
+from app.services.vector_index import load_embedder, vector_index
+from app.services.refiner import ChatCompletionsModel, refiner
+from app.services.auto_tagger import auto_tagger
+from app.services.export_jobs import export_jobs
+from app.services.export_cache import export_cache
+from app.services.list_cache import list_cache
 import asyncio
 import os
 import time
@@ -12,18 +26,31 @@ from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-for _k in ("CMS_URL", "CMS_COLLECTION", "CMS_EMAIL", "CMS_PASSWORD", "CMS_USER_COLLECTION", "POLL_INTERVAL", "ARTICLE_POLLER_URL"):
+for _k in ("CMS_URL", "CMS_COLLECTION", "CMS_EMAIL", "CMS_PASSWORD", "CMS_USER_COLLECTION", "POLL_INTERVAL", "ARTICLE_POLLER_URL", "ARTICLE_POLLER_LOOKAHEAD", "ARTICLE_POLLER_CONCURRENCY", "HTTP_POOL_LIMIT", "HTTP_POOL_LIMIT_PER_HOST", "HTTP_DNS_CACHE_TTL", "HTTP_CONNECT_TIMEOUT", "HTTP_READ_TIMEOUT", "HTTP_COMPRESSION", "INGEST_QUEUE_SIZE", "INGEST_PERSIST_BATCH_SIZE", "INGEST_NORMALIZE_CONCURRENCY", "INGEST_DEDUP_CONCURRENCY", "INGEST_REFINE_CONCURRENCY", "INGEST_PERSIST_CONCURRENCY", "INGEST_BROADCAST_CONCURRENCY", "INGEST_WEBHOOK_SECRET", "INGEST_WEBHOOK_TOLERANCE_SECONDS", "POLL_RECONCILE_INTERVAL", "PAYLOAD_DEDUP_WINDOW", "NEAR_DUP_MAX_DISTANCE", "NEAR_DUP_WINDOW_HOURS", "NEAR_DUP_ENABLED", "STORY_CLUSTER_THRESHOLD", "STORY_CLUSTER_WINDOW_HOURS", "STORY_CLUSTERS_ENABLED", "SEARCH_BUDGET_MS", "VECTOR_INDEX_ENABLED", "VECTOR_INDEX_PATH", "VECTOR_EMBEDDER", "VECTOR_IVF_THRESHOLD", "VECTOR_IVF_NPROBE", "AGENT_WORKERS", "AGENT_QUEUE_SIZE", "AGENT_TASK_TTL_SECONDS", "AGENT_DEDUP_SECONDS", "REFINE_API_URL", "REFINE_API_KEY", "REFINE_MODEL", "REFINE_BATCH_SIZE", "REFINE_CONCURRENCY", "REFINE_TIMEOUT", "REFINE_CACHE_SIZE", "GAZETTEER_PATH", "AUTO_TAG_ENABLED", "AUTO_TAG_MAX_PER_CATEGORY", "AUTO_TAG_MIN_CONTENT_HITS", "EXPORT_WORKERS", "EXPORT_JOB_TTL_SECONDS", "EXPORT_SYNC_MAX_ITEMS", "EXPORT_DIR", "EXPORT_CACHE_ENABLED", "EXPORT_CACHE_DIR", "EXPORT_CACHE_MAX_MB", "LIST_CACHE_ENABLED", "LIST_CACHE_TTL_SECONDS", "LIST_CACHE_MAX_ENTRIES", "COMPRESSION_ENABLED", "COMPRESSION_MIN_BYTES", "COMPRESSION_OFFLOAD_BYTES"):
     if os.environ.get(_k) == "":
         os.environ.pop(_k, None)
 load_dotenv()
 
 # Create Database Tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
+# Catch the change counter up with existing versions; rows written before the change feed existed join it at a single version.
+_db = SessionLocal()
+try:
+    crud.sync_change_counter(_db)
+finally:
+    _db.close()
 
 app = FastAPI(title="Intel Aggregation API")
 
 # Setup CORS
 setup_cors(app)
+if os.getenv("COMPRESSION_ENABLED", "1").strip().lower() not in ("0", "false", "no"):
+    setup_compression(
+        app,
+        min_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        offload_size=int(os.getenv("COMPRESSION_OFFLOAD_BYTES", str(64 * 1024))),
+    )
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -34,12 +61,102 @@ async def log_requests(request: Request, call_next):
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(intel.router, prefix="/api/intel", tags=["intel"])
 app.include_router(agent.router, prefix="/api/agent", tags=["agent"])
+app.include_router(ingest.router, prefix="/api/ingest", tags=["ingest"])
 
 @app.on_event("startup")
 async def startup_event():
     # Run analysis in background to not block startup
     asyncio.create_task(orchestrator.analyze_data_file())
 
+    http_client.configure(
+        limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+        limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")),
+        dns_cache_ttl=int(os.getenv("HTTP_DNS_CACHE_TTL", "300")),
+        connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+        compression=os.getenv("HTTP_COMPRESSION", "1").strip().lower() not in ("0", "false", "no"),
+    )
+    await http_client.start()
+
+    ingest_pipeline.configure(
+        queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "1000")),
+        persist_batch_size=int(os.getenv("INGEST_PERSIST_BATCH_SIZE", "100")),
+        concurrency={
+            "normalize": int(os.getenv("INGEST_NORMALIZE_CONCURRENCY", "1")),
+            "dedup": int(os.getenv("INGEST_DEDUP_CONCURRENCY", "1")),
+            "refine": int(os.getenv("INGEST_REFINE_CONCURRENCY", "1")),
+            "persist": int(os.getenv("INGEST_PERSIST_CONCURRENCY", "1")),
+            "broadcast": int(os.getenv("INGEST_BROADCAST_CONCURRENCY", "1")),
+        },
+    )
+    near_dup_index.configure(
+        max_distance=int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3")),
+        window_seconds=float(os.getenv("NEAR_DUP_WINDOW_HOURS", "72")) * 3600,
+        enabled=os.getenv("NEAR_DUP_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+    )
+    if near_dup_index.enabled:
+        await asyncio.to_thread(near_dup_index.load_recent, SessionLocal)
+    story_clusters.configure(
+        threshold=float(os.getenv("STORY_CLUSTER_THRESHOLD", "0.35")),
+        window_seconds=float(os.getenv("STORY_CLUSTER_WINDOW_HOURS", "72")) * 3600,
+        enabled=os.getenv("STORY_CLUSTERS_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+    )
+    if story_clusters.enabled:
+        await asyncio.to_thread(story_clusters.load_recent, SessionLocal)
+    search_index.configure(budget_ms=float(os.getenv("SEARCH_BUDGET_MS", "50")))
+    await asyncio.to_thread(search_index.load_all, SessionLocal)
+    vector_index.configure(
+        embedder=load_embedder(os.environ["VECTOR_EMBEDDER"]) if os.getenv("VECTOR_EMBEDDER") else None,
+        path=os.getenv("VECTOR_INDEX_PATH"),
+        ivf_threshold=int(os.getenv("VECTOR_IVF_THRESHOLD", "1000000")),
+        nprobe=int(os.getenv("VECTOR_IVF_NPROBE", "16")),
+        enabled=os.getenv("VECTOR_INDEX_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+    )
+    await asyncio.to_thread(vector_index.load_all, SessionLocal)
+    refine_url = os.getenv("REFINE_API_URL")
+    refiner.configure(
+        model=ChatCompletionsModel(refine_url, os.getenv("REFINE_API_KEY"), os.getenv("REFINE_MODEL", "gpt-4o-mini")) if refine_url else None,
+        batch_size=int(os.getenv("REFINE_BATCH_SIZE", "8")),
+        concurrency=int(os.getenv("REFINE_CONCURRENCY", "2")),
+        timeout=float(os.getenv("REFINE_TIMEOUT", "30")),
+        cache_size=int(os.getenv("REFINE_CACHE_SIZE", "10000")),
+    )
+    await asyncio.to_thread(refiner.load_recent, SessionLocal)
+    auto_tagger.configure(
+        path=os.getenv("GAZETTEER_PATH"),
+        enabled=os.getenv("AUTO_TAG_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+        max_tags=int(os.getenv("AUTO_TAG_MAX_PER_CATEGORY", "3")),
+        min_content_hits=int(os.getenv("AUTO_TAG_MIN_CONTENT_HITS", "2")),
+    )
+    if auto_tagger.enabled:
+        await asyncio.to_thread(auto_tagger.load)
+    await ingest_pipeline.start()
+    agent_tasks.configure(
+        workers=int(os.getenv("AGENT_WORKERS", "4")),
+        queue_size=int(os.getenv("AGENT_QUEUE_SIZE", "100")),
+        ttl_seconds=float(os.getenv("AGENT_TASK_TTL_SECONDS", "600")),
+        dedup_seconds=float(os.getenv("AGENT_DEDUP_SECONDS", "30")),
+    )
+    await agent_tasks.start()
+    # The render processes are spawned on the first large DOCX export.
+    export_jobs.configure(
+        workers=int(os.getenv("EXPORT_WORKERS", "2")),
+        ttl_seconds=float(os.getenv("EXPORT_JOB_TTL_SECONDS", "1800")),
+        sync_max_items=int(os.getenv("EXPORT_SYNC_MAX_ITEMS", "50")),
+        directory=os.getenv("EXPORT_DIR"),
+    )
+    export_cache.configure(
+        directory=os.getenv("EXPORT_CACHE_DIR"),
+        max_bytes=int(float(os.getenv("EXPORT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        enabled=os.getenv("EXPORT_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+    )
+    await asyncio.to_thread(export_cache.start)
+    list_cache.configure(
+        ttl_seconds=float(os.getenv("LIST_CACHE_TTL_SECONDS", "30")),
+        max_entries=int(os.getenv("LIST_CACHE_MAX_ENTRIES", "256")),
+        enabled=os.getenv("LIST_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no"),
+    )
+
     # Auto-start pollers if configured via ENV
     cms_url = os.getenv("CMS_URL")
     cms_collection = os.getenv("CMS_COLLECTION", "posts")
@@ -47,12 +164,23 @@ async def startup_event():
     cms_password = os.getenv("CMS_PASSWORD")
     cms_user_collection = os.getenv("CMS_USER_COLLECTION", "users")
     poll_interval = int(os.getenv("POLL_INTERVAL", "10"))
+    if os.getenv("INGEST_WEBHOOK_SECRET"):
+        # Webhooks deliver changes; polling only reconciles missed hooks.
+        poll_interval = int(os.getenv("POLL_RECONCILE_INTERVAL", "300"))
     
     poller_started = False
 
     if cms_url and cms_email and cms_password:
         print(f"Auto-starting PayloadPoller with URL: {cms_url}")
-        payload_poller.configure(cms_url, cms_collection, cms_email, cms_password, cms_user_collection, poll_interval)
+        payload_poller.configure(
+            cms_url,
+            cms_collection,
+            cms_email,
+            cms_password,
+            cms_user_collection,
+            poll_interval,
+            dedup_window=int(os.getenv("PAYLOAD_DEDUP_WINDOW", "5000")),
+        )
         await payload_poller.start()
         poller_started = True
     else:
@@ -61,7 +189,11 @@ async def startup_event():
     article_base_url = os.getenv("ARTICLE_POLLER_URL")
     if article_base_url:
         print(f"Auto-starting ArticlePoller with URL: {article_base_url}")
-        article_poller.configure(article_base_url)
+        article_poller.configure(
+            article_base_url,
+            lookahead=int(os.getenv("ARTICLE_POLLER_LOOKAHEAD", "20")),
+            concurrency=int(os.getenv("ARTICLE_POLLER_CONCURRENCY", "8")),
+        )
         await article_poller.start()
         poller_started = True
     else:
@@ -71,6 +203,16 @@ async def startup_event():
     if not poller_started:
         print("No real pollers configured. MockPoller is disabled by request.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await payload_poller.stop()
+    await article_poller.stop()
+    await ingest_pipeline.stop()
+    await agent_tasks.stop()
+    await export_jobs.stop()
+    export_cache.stop()
+    await http_client.close()
+
 @app.get("/")
 async def root():
     return {"message": "Intel Agent API is running"}
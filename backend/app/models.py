@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Literal, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal, Dict, Any, get_args
 from datetime import datetime
 import uuid
 import hashlib
@@ -8,6 +8,8 @@ class Tag(BaseModel):
     label: str
     color: Literal["purple", "blue", "gray", "red"]
 
+TAG_COLORS = get_args(Tag.model_fields["color"].annotation)
+
 
 class IntelItem(BaseModel):
     id: str
@@ -22,6 +24,12 @@ class IntelItem(BaseModel):
     is_hot: bool = False # Internal flag for mock data separation
     content: Optional[str] = None # Full translated content
     thing_id: Optional[str] = None # CMS thingId
+    cluster_id: Optional[str] = None # Story cluster
+    # Set by the ingest pipeline, persisted but never serialized.
+    simhash: Optional[int] = Field(default=None, exclude=True)
+    duplicate_of: Optional[str] = Field(default=None, exclude=True)
+    refine_hash: Optional[str] = Field(default=None, exclude=True)
+    refine_tags: Optional[List[Tag]] = Field(default=None, exclude=True)
 
     @staticmethod
     def _stable_id_from_value(value: Optional[Any], fallback: Optional[str] = None) -> str:
@@ -132,6 +140,37 @@ class IntelListResponse(BaseModel):
     items: List[IntelItem]
     total: int
 
+class IntelChange(BaseModel):
+    op: Literal["upsert", "delete"]
+    version: int
+    item: Optional[IntelItem] = None # Set for upserts
+    id: Optional[str] = None # Set for deletions
+
+class IntelChangesResponse(BaseModel):
+    changes: List[IntelChange]
+    # Cursor of the last change returned; pass both back as since / after_id
+    version: int
+    after_id: Optional[str] = None
+    has_more: bool = False
+
+class StoryClusterSummary(BaseModel):
+    id: str
+    label: str
+    size: int
+    first_timestamp: float
+    last_timestamp: float
+    top_terms: List[str] = []
+    latest_item_ids: List[str] = []
+
+class StoryClusterListResponse(BaseModel):
+    clusters: List[StoryClusterSummary]
+    total: int
+
+class SimilarIntelResponse(BaseModel):
+    items: List[IntelItem]
+    scores: List[float] = [] # Cosine similarity per item
+    took_ms: float = 0.0
+
 class FavoriteToggleRequest(BaseModel):
     intel_id: Optional[str] = None
     favorited: bool
@@ -143,15 +182,27 @@ class ExportRequest(BaseModel):
     q: Optional[str] = None
     range: Optional[Literal["all", "3h", "6h", "12h"]] = "all"
 
+class ExportJobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    total: int
+    done: int = 0
+    filename: str
+    size: Optional[int] = None
+    error: Optional[str] = None
+
 class AgentSearchRequest(BaseModel):
     query: str
-    type: Optional[Literal["hot", "history"]] = "hot"
+    type: Optional[Literal["hot", "history", "all"]] = "hot"
     range: Optional[Literal["all", "3h", "6h", "12h"]] = "all"
     top_k: int = 10
 
 class AgentSearchResponse(BaseModel):
     answer: str
     sources: List[IntelItem] = []
+    scores: List[float] = [] # BM25 score per source
+    took_ms: float = 0.0
+    truncated: bool = False # Retrieval stopped at the latency budget
 
 class UserCreate(BaseModel):
     username: str
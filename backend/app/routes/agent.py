@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional, Literal
 from starlette.responses import StreamingResponse
 from app.agent.orchestrator import orchestrator
+from app.agent.retrieval import retrieve
+from app.agent.task_engine import TaskQueueFull, agent_tasks
+from app.models import AgentSearchRequest, AgentSearchResponse, TaskStatusResponse
 from app.db_models import UserDB
 from app.routes.auth import get_current_user, get_current_user_any
-import asyncio
-import uuid
 import json
 
 router = APIRouter()
@@ -15,11 +16,26 @@ class AgentRunRequest(BaseModel):
     query: str
     type: Literal["hot", "history", "all"] = "hot"
     range: Literal["all", "3h", "6h", "12h"] = "all"
+    top_k: int = 10
 
 @router.post("/run")
 async def run_agent(req: AgentRunRequest, current_user: UserDB = Depends(get_current_user)):
-    task_id = str(uuid.uuid4())
-    return {"task_id": task_id}
+    try:
+        task = await agent_tasks.submit(req.query, type_filter=req.type, range_filter=req.range, top_k=req.top_k)
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return {"task_id": task.id}
+
+@router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
+async def get_task_status(task_id: str, current_user: UserDB = Depends(get_current_user)):
+    task = agent_tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired task")
+    return TaskStatusResponse(task_id=task.id, status=task.status, result=task.result)
+
+@router.post("/search", response_model=AgentSearchResponse)
+async def search_agent(req: AgentSearchRequest, current_user: UserDB = Depends(get_current_user)):
+    return await retrieve(req.query, type_filter=req.type, range_filter=req.range, top_k=req.top_k)
 
 @router.get("/stream/global")
 async def stream_global(
@@ -46,19 +62,16 @@ async def stream_global(
 
 @router.get("/stream/{task_id}")
 async def stream_task(task_id: str, request: Request, current_user: UserDB = Depends(get_current_user_any)):
+    task = agent_tasks.get(task_id)
+
     async def gen():
-        yield f"event: status\ndata: {json.dumps({'status': 'running'})}\n\n"
-        yield f"event: progress\ndata: {json.dumps({'step': 'init', 'message': 'Initializing...'})}\n\n"
-        await asyncio.sleep(0.2)
-        if await request.is_disconnected():
-            return
-        yield f"event: progress\ndata: {json.dumps({'step': 'search', 'message': 'Searching...'})}\n\n"
-        await asyncio.sleep(0.2)
-        if await request.is_disconnected():
+        if task is None:
+            yield f"event: error\ndata: {json.dumps({'message': 'Unknown or expired task'})}\n\n"
             return
-
-        yield f"event: result\ndata: {json.dumps({'answer': 'Dummy answer', 'sources': []}, ensure_ascii=False)}\n\n"
-        yield f"event: status\ndata: {json.dumps({'status': 'done'})}\n\n"
+        async for chunk in agent_tasks.follow(task):
+            if await request.is_disconnected():
+                break
+            yield chunk
 
     return StreamingResponse(
         gen(),
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from app.db_models import UserDB
+from app.routes.auth import get_current_user
+from app.services.auth_utils import verify_webhook_signature
+from app.services.idempotency import IdempotencyCache
+from app.services.poller import article_poller
+from app.services.payload_poller import payload_poller
+from app.services.ingest_pipeline import ingest_pipeline
+from app.services.auto_tagger import auto_tagger
+from app.services.http_client import http_client
+
+router = APIRouter()
+
+WEBHOOK_SIGNATURE_HEADER = "X-Ingest-Signature"
+WEBHOOK_TIMESTAMP_HEADER = "X-Ingest-Timestamp"
+webhook_idempotency = IdempotencyCache(ttl_seconds=86400, max_entries=50000)
+
+def _extract_docs(payload: Any) -> List[Dict[str, Any]]:
+    # Accepts a bare doc, a list of docs, {"doc": {...}} (Payload afterChange) or {"docs": [...]}
+    if isinstance(payload, list):
+        docs = payload
+    elif isinstance(payload, dict) and isinstance(payload.get("docs"), list):
+        docs = payload["docs"]
+    elif isinstance(payload, dict) and isinstance(payload.get("doc"), dict):
+        docs = [payload["doc"]]
+    elif isinstance(payload, dict):
+        docs = [payload]
+    else:
+        docs = []
+    return [d for d in docs if isinstance(d, dict)]
+
+def _doc_idempotency_key(doc: Dict[str, Any]) -> str:
+    version = doc.get("updatedAt") or doc.get("publishDate") or doc.get("createdAt") or ""
+    return f"doc:{doc.get('id')}:{doc.get('thingId') or ''}:{version}"
+
+@router.get("/pollers")
+async def get_pollers_status(current_user: UserDB = Depends(get_current_user)):
+    return {"pollers": [payload_poller.get_status(), article_poller.get_status()]}
+
+@router.get("/pipeline")
+async def get_pipeline_stats(current_user: UserDB = Depends(get_current_user)):
+    return ingest_pipeline.get_stats()
+
+@router.get("/http")
+async def get_http_client_stats(current_user: UserDB = Depends(get_current_user)):
+    return http_client.get_stats()
+
+@router.get("/gazetteer")
+async def get_gazetteer_stats(current_user: UserDB = Depends(get_current_user)):
+    return auto_tagger.stats()
+
+@router.post("/gazetteer/reload")
+async def reload_gazetteer(current_user: UserDB = Depends(get_current_user)):
+    try:
+        await asyncio.to_thread(auto_tagger.load)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return auto_tagger.stats()
+
+@router.post("/webhook")
+async def ingest_webhook(request: Request):
+    secret = os.getenv("INGEST_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook ingestion is not configured")
+
+    # The signature covers "<timestamp>.<body>"; deliveries outside the tolerance are
+    # rejected, so a captured request cannot be replayed once idempotency keys expire.
+    body = await request.body()
+    tolerance = int(os.getenv("INGEST_WEBHOOK_TOLERANCE_SECONDS", "300"))
+    timestamp = request.headers.get(WEBHOOK_TIMESTAMP_HEADER)
+    if not verify_webhook_signature(secret, timestamp, body, request.headers.get(WEBHOOK_SIGNATURE_HEADER), tolerance):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired webhook signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    request_key = request.headers.get("Idempotency-Key")
+    if request_key and webhook_idempotency.check_and_add(f"req:{request_key}"):
+        return {"accepted": 0, "duplicates": 0, "replayed": True}
+
+    docs = _extract_docs(payload)
+    fresh_docs = [d for d in docs if not webhook_idempotency.check_and_add(_doc_idempotency_key(d))]
+
+    try:
+        accepted = await payload_poller.ingest_docs(fresh_docs) if fresh_docs else 0
+    except Exception:
+        # Let the CMS retry the delivery.
+        webhook_idempotency.discard(f"req:{request_key}" if request_key else None)
+        for d in fresh_docs:
+            webhook_idempotency.discard(_doc_idempotency_key(d))
+        raise
+
+    return {"accepted": accepted, "duplicates": len(docs) - len(fresh_docs), "replayed": False}
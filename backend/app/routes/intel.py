@@ -1,21 +1,53 @@
+import asyncio
+import csv
 import io
-from datetime import datetime
+import json
+import time
 from urllib.parse import quote
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Pt, Cm
-from fastapi import APIRouter, HTTPException, Response, Depends
-from typing import Optional, Literal
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, status
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Any, Callable, Dict, Iterable, List, Optional, Literal, Tuple
 from sqlalchemy.orm import Session
-from app.models import IntelListResponse, FavoriteToggleRequest, ExportRequest, IntelItem, Tag
-from app.database import get_db
+from app.models import IntelChangesResponse, IntelListResponse, FavoriteToggleRequest, ExportRequest, ExportJobResponse, IntelItem, StoryClusterListResponse, SimilarIntelResponse
+from app.database import SessionLocal, get_db
 from app.db_models import UserDB
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_user, get_current_user_any
 from app import crud
 from app.agent.orchestrator import orchestrator
+from app.services.cached_items import materialize_cached_items
+from app.services.docx_export import DOCX_MEDIA_TYPE, docx_fields, export_filename, render_docx_bytes
+from app.services.export_cache import export_cache, export_key
+from app.services.export_jobs import ExportJob, ExportQueueFull, export_jobs
+from app.services.list_cache import FAVORITES_SCOPE, LIST_SCOPES, list_cache
+from app.services.story_clusters import story_clusters
+from app.services.vector_index import item_text, vector_index
 
 router = APIRouter()
 
+EXPORT_CHUNK_ROWS = 500
+
+def _list_page(fetch: Callable[[Session], Tuple[List[Dict[str, Any]], int]]) -> Tuple[bytes, List[str]]:
+    """
+    One encoded list page and the ids on it. List pages skip response_model
+    validation: crud builds the items as plain dicts in IntelItem's shape, encoded
+    in one orjson call. The response_model on the routes still documents the schema.
+    """
+    db = SessionLocal()
+    try:
+        items, total = fetch(db)
+    finally:
+        db.close()
+    return orjson.dumps({"items": items, "total": total}), [x["id"] for x in items]
+
+async def _cached_list_response(request: Optional[Request], key: tuple, scopes, fetch) -> Response:
+    # The page is loaded on its own session: a load shared by several requests outlives the first one.
+    page = await list_cache.get_or_load(key, scopes, lambda: asyncio.to_thread(_list_page, fetch))
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
 @router.get("/", response_model=IntelListResponse)
 async def get_intel(
     type: Literal["hot", "history", "all"] = "all",
@@ -23,29 +55,156 @@ async def get_intel(
     range: Literal["all", "3h", "6h", "12h"] = "all",
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user),
+    request: Request = None,
 ):
-    items, total = crud.get_filtered_intel(db, type_filter=type, q=q, range_filter=range, limit=limit, offset=offset)
-    return {"items": items, "total": total}
+    q = q or None
+    return await _cached_list_response(
+        request,
+        ("list", type, q, range, limit, offset),
+        LIST_SCOPES[type],
+        lambda db: crud.get_filtered_intel(db, type_filter=type, q=q, range_filter=range, limit=limit, offset=offset, as_dicts=True),
+    )
 
 @router.get("/favorites", response_model=IntelListResponse)
 async def get_favorites(
     q: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
+    current_user: UserDB = Depends(get_current_user),
+    request: Request = None,
+):
+    q = q or None
+    return await _cached_list_response(
+        request,
+        ("favorites", q, limit, offset),
+        FAVORITES_SCOPE,
+        lambda db: crud.get_favorites(db, q=q, limit=limit, offset=offset, as_dicts=True),
+    )
+
+@router.get("/changes", response_model=IntelChangesResponse)
+async def get_intel_changes(
+    since: int = 0,
+    after_id: Optional[str] = None,
+    limit: int = 200,
     db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user),
 ):
-    items, total = crud.get_favorites(db, q=q, limit=limit, offset=offset)
-    return {"items": items, "total": total}
+    """
+    Items inserted, edited (including demotions and favorite toggles) or deleted
+    after the cursor, oldest first. Clients keep the returned version / after_id
+    and poll again; `has_more` means the next page is ready right away. Without
+    `after_id`, `since` is exclusive: changes at that version count as seen.
+    """
+    limit = max(1, min(limit, 1000))
+    changes, has_more = await asyncio.to_thread(crud.get_intel_changes, db, since, after_id, limit)
+    if changes:
+        last = changes[-1]
+        since, after_id = last["version"], last["id"] if last["op"] == "delete" else last["item"]["id"]
+    body = {"changes": changes, "version": since, "after_id": after_id, "has_more": has_more}
+    return Response(content=orjson.dumps(body), media_type="application/json")
+
+@router.get("/clusters", response_model=StoryClusterListResponse)
+async def get_story_clusters(
+    min_size: int = 2,
+    limit: int = 50,
+    current_user: UserDB = Depends(get_current_user),
+):
+    clusters = story_clusters.list_clusters(min_size=max(1, min_size), limit=max(1, min(limit, 500)))
+    return {"clusters": clusters, "total": len(clusters)}
+
+def _export_tags(raw_tags) -> List[Dict[str, str]]:
+    return [
+        {"label": str(t.get("label", "")), "color": str(t.get("color", "blue"))} if isinstance(t, dict) else {"label": str(t), "color": "blue"}
+        for t in raw_tags or []
+    ]
+
+CSV_COLUMNS = ("id", "title", "summary", "content", "source", "url", "time", "timestamp", "tags", "is_hot", "favorited", "thing_id", "cluster_id")
+
+def _csv_bytes(records: Iterable[Iterable[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(records)
+    return buffer.getvalue().encode("utf-8")
+
+def _encode_csv(rows: List[Dict[str, Any]]) -> bytes:
+    records = []
+    for row in rows:
+        row = {**row, "tags": "; ".join(t["label"] for t in _export_tags(row["tags"]) if t["label"])}
+        records.append(["" if row[c] is None else row[c] for c in CSV_COLUMNS])
+    return _csv_bytes(records)
+
+def _encode_ndjson(rows: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps({**row, "tags": _export_tags(row["tags"])}, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+def _stream_export(req: ExportRequest, db: Session) -> StreamingResponse:
+    """
+    CSV / NDJSON export written to the socket as it is read: rows come from the
+    database in keyset-paged chunks of EXPORT_CHUNK_ROWS (read in a thread), so
+    memory stays flat and the download starts with the first chunk.
+    """
+    ids = list(req.ids or [])
+    if ids:
+        # Resolve up front: once streaming has started a 404 can no longer be sent.
+        missing_ids = crud.missing_intel_ids(db, ids)
+        cached_items = materialize_cached_items(db, missing_ids)
+        unresolved_ids = [x for x in missing_ids if x not in cached_items]
+        if unresolved_ids:
+            raise HTTPException(status_code=404, detail=f"Items not found: {', '.join(unresolved_ids)}")
+
+    encode = _encode_csv if req.format == "csv" else _encode_ndjson
+
+    async def body():
+        session = SessionLocal()
+        chunks = crud.iter_intel_rows(
+            session, type_filter=req.type or "all", q=req.q, range_filter=req.range or "all", ids=ids or None, chunk_size=EXPORT_CHUNK_ROWS
+        )
+        try:
+            if req.format == "csv":
+                # BOM so spreadsheet apps open the UTF-8 (Chinese) text correctly
+                yield "\ufeff".encode("utf-8") + _csv_bytes([CSV_COLUMNS])
+            while True:
+                rows = await asyncio.to_thread(next, chunks, None)
+                if rows is None:
+                    break
+                if rows:
+                    yield encode(rows)
+        finally:
+            chunks.close()
+            session.close()
+
+    filename = "情报批量导出.csv" if req.format == "csv" else "情报批量导出.ndjson"
+    return StreamingResponse(
+        body(),
+        media_type="text/csv; charset=utf-8" if req.format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+def _etag_matches(request: Optional[Request], etag: str) -> bool:
+    """Whether the request's `If-None-Match` names `etag` (weak comparison, as for GET)"""
+    header = request.headers.get("if-none-match") if request is not None else None
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)
+
+def _docx_headers(filename: str, etag: str) -> Dict[str, str]:
+    # Encode filename for header
+    encoded_filename = quote(filename)
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}", "ETag": etag}
+
+def _docx_response(content: bytes, filename: str, etag: str) -> Response:
+    return Response(content=content, media_type=DOCX_MEDIA_TYPE, headers=_docx_headers(filename, etag))
 
 @router.post("/export")
 async def export_intel(
     req: ExportRequest,
     db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user),
+    request: Request = None,
 ):
+    if req.format in ("csv", "json"):
+        return _stream_export(req, db)
+
     # Determine items to export
     items = []
     
@@ -55,38 +214,7 @@ async def export_intel(
         by_id = {x.id: x for x in db_items}
 
         missing_ids = [x for x in req.ids if x not in by_id]
-        cached_items = {}
-        for missing_id in missing_ids:
-            cached = orchestrator.get_cached_intel(missing_id)
-            if not cached:
-                continue
-
-            tags = []
-            for t in cached.get("tags") or []:
-                if isinstance(t, dict):
-                    tags.append(Tag(label=t.get("label", ""), color=t.get("color", "blue")))
-                else:
-                    tags.append(Tag(label=str(t), color="blue"))
-
-            intel_item = IntelItem(
-                id=str(cached.get("id", missing_id)),
-                title=cached.get("title") or "",
-                summary=cached.get("summary") or "",
-                source=cached.get("source") or "Hot Stream",
-                url=cached.get("url"),
-                time=cached.get("time") or "",
-                timestamp=float(cached.get("timestamp") or datetime.now().timestamp()),
-                tags=tags,
-                favorited=bool(cached.get("favorited") or False),
-                is_hot=False,
-                content=cached.get("content"),
-                thing_id=cached.get("thing_id") or cached.get("thingId"),
-            )
-
-            if not crud.get_intel_by_id(db, intel_item.id):
-                crud.create_intel_item(db, intel_item)
-
-            cached_items[intel_item.id] = intel_item
+        cached_items = materialize_cached_items(db, missing_ids)
 
         resolved_items = []
         unresolved_ids = []
@@ -112,135 +240,132 @@ async def export_intel(
             limit=1000
         )
     
-    doc = Document()
-
-    normal_style = doc.styles["Normal"]
-    normal_style.font.size = Pt(12)
-
-    def _safe_text(v: Optional[str]) -> str:
-        return (v or "").strip()
-
-    def _add_kv_line(key: str, value: str):
-        p = doc.add_paragraph()
-        rk = p.add_run(f"{key}：")
-        rk.bold = True
-        p.add_run(value)
-        return p
-
-    def _add_center_title(text: str):
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        r = p.add_run(text)
-        r.bold = True
-        r.font.size = Pt(16)
-        return p
-
-    def _add_body(text: str):
-        p = doc.add_paragraph(text)
-        p.paragraph_format.first_line_indent = Cm(0.74)
-        p.paragraph_format.line_spacing = 1.25
-        return p
-
-    for idx, item in enumerate(items):
-        tags_value = " / ".join([t.label for t in (item.tags or []) if _safe_text(t.label)])
-        if not tags_value:
-            tags_value = "暂无"
-
-        _add_kv_line("拟投栏目", tags_value)
-        _add_kv_line("事件时间", _safe_text(item.time) or "暂无")
-        _add_kv_line("价值点", _safe_text(item.summary) or "暂无")
-
-        doc.add_paragraph()
-
-        _add_center_title(_safe_text(item.title) or "未命名")
-
-        body_text = _safe_text(item.content) or _safe_text(item.summary)
-        if body_text:
-            _add_body(body_text)
-
-        source_parts = [f"来源：{_safe_text(item.source) or '未知'}", f"原标题：{_safe_text(item.title) or '未命名'}"]
-        if _safe_text(item.url):
-            source_parts.append(f"来源URL：{_safe_text(item.url)}")
-        doc.add_paragraph(f"（{'，'.join(source_parts)}）")
-
-        if idx != len(items) - 1:
-            doc.add_page_break()
-    
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
-    
-    # Determine filename
-    filename = "情报批量导出.docx"
-    if len(items) == 1:
-        # Remove invalid chars for filename
-        safe_title = "".join([c for c in items[0].title if c not in r'\/:*?"<>|'])
-        filename = f"{safe_title}.docx"
-    
-    # Encode filename for header
-    encoded_filename = quote(filename)
-    
-    return Response(
-        content=output.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"}
+    # Content address of this export: any write to a member bumps its updated_at.
+    ids = [x.id for x in items]
+    versions = crud.intel_versions(db, ids)
+    key = export_key(req.format, [(x, versions.get(x)) for x in ids])
+    etag = f'"{key}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    cached = export_cache.get(key)
+    if cached is not None:
+        # Sent from disk in chunks (Range requests included), never read into memory.
+        stat_result = await asyncio.to_thread(export_cache.stat, cached)
+        if stat_result is not None:
+            return FileResponse(cached.path, media_type=DOCX_MEDIA_TYPE, headers=_docx_headers(cached.filename, etag), stat_result=stat_result)
+
+    fields = [docx_fields(x) for x in items]
+    filename = export_filename(fields)
+    if len(fields) > export_jobs.sync_max_items:
+        try:
+            job = await export_jobs.submit(fields, filename, on_done=lambda job: export_cache.put_file(key, job.path, filename, ids))
+        except ExportQueueFull as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=_export_job_response(job).model_dump())
+
+    # Small exports keep the direct response, rendered in a thread so the loop keeps serving.
+    content = await asyncio.to_thread(render_docx_bytes, fields)
+    await asyncio.to_thread(export_cache.put_bytes, key, content, filename, ids)
+    return _docx_response(content, filename, etag)
+
+def _export_job_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        job_id=job.id, status=job.status, total=job.total, done=job.done, filename=job.filename, size=job.size, error=job.error
     )
 
+def _get_export_job(job_id: str) -> ExportJob:
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired export job")
+    return job
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(job_id: str, current_user: UserDB = Depends(get_current_user)):
+    return _export_job_response(_get_export_job(job_id))
+
+@router.get("/export/jobs/{job_id}/events")
+async def stream_export_job(job_id: str, request: Request, current_user: UserDB = Depends(get_current_user_any)):
+    job = _get_export_job(job_id)
+
+    async def gen():
+        async for chunk in export_jobs.follow(job):
+            if await request.is_disconnected():
+                break
+            yield chunk
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, current_user: UserDB = Depends(get_current_user_any)):
+    job = _get_export_job(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export job is {job.status}")
+    # FileResponse answers Range requests, so interrupted downloads can resume.
+    return FileResponse(job.path, media_type=DOCX_MEDIA_TYPE, filename=job.filename)
+
 @router.get("/{id}", response_model=IntelItem)
-async def get_intel_detail(id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    item = crud.get_intel_by_id(db, id)
+async def get_intel_detail(
+    id: str,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+    request: Request = None,
+    response: Response = None,
+):
+    # A revalidation costs one primary-key lookup. The version is read before the row,
+    # so a write in between leaves an older tag on the newer body, never the reverse.
+    version = crud.intel_versions(db, [id]).get(id)
+    if version is not None:
+        headers = {"ETag": f'W/"{version!r}"', "Cache-Control": "private, no-cache"}
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if response is not None:
+            response.headers.update(headers)
+    item = crud.get_intel_item(db, id)
     if not item:
-        cached = orchestrator.get_cached_intel(id)
-        if not cached:
+        cached = materialize_cached_items(db, [id])
+        if id not in cached:
             raise HTTPException(status_code=404, detail="Intel item not found")
+        return cached[id]
+    return item
 
-        tags = []
-        for t in cached.get("tags") or []:
-            if isinstance(t, dict):
-                tags.append(Tag(label=t.get("label", ""), color=t.get("color", "blue")))
-            else:
-                tags.append(Tag(label=str(t), color="blue"))
-
-        intel_item = IntelItem(
-            id=str(cached.get("id", id)),
-            title=cached.get("title") or "",
-            summary=cached.get("summary") or "",
-            source=cached.get("source") or "Hot Stream",
-            url=cached.get("url"),
-            time=cached.get("time") or "",
-            timestamp=float(cached.get("timestamp") or datetime.now().timestamp()),
-            tags=tags,
-            favorited=bool(cached.get("favorited") or False),
-            is_hot=False,
-            content=cached.get("content"),
-            thing_id=cached.get("thing_id") or cached.get("thingId")
-        )
-
-        if not crud.get_intel_by_id(db, intel_item.id):
-            crud.create_intel_item(db, intel_item)
-
-        return intel_item
-    
-    tags = []
-    for t in item.tags or []:
-        if isinstance(t, dict):
-            tags.append(Tag(label=str(t.get("label", "")), color=str(t.get("color", "blue"))))
+@router.get("/{id}/similar", response_model=SimilarIntelResponse)
+async def get_similar_intel(
+    id: str,
+    limit: int = 10,
+    type: Literal["hot", "history", "all"] = "all",
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    started = time.perf_counter()
+    limit = max(1, min(limit, 50))
+    hits = await asyncio.to_thread(vector_index.similar, id, limit, type_filter=type)
+    if hits is None:
+        # Not indexed (e.g. only in the hot cache): embed it on the fly.
+        item = crud.get_intel_by_id(db, id)
+        if item:
+            text = item_text(item.title, item.summary, item.content)
         else:
-            tags.append(Tag(label=str(t), color="blue"))
-    return IntelItem(
-        id=item.id,
-        title=item.title,
-        summary=item.summary,
-        source=item.source,
-        url=item.url,
-        time=item.publish_time_str,
-        timestamp=item.timestamp,
-        tags=tags,
-        favorited=item.favorited,
-        is_hot=item.is_hot,
-        content=item.content,
-        thing_id=item.thing_id
-    )
+            cached = orchestrator.get_cached_intel(id)
+            if not cached:
+                raise HTTPException(status_code=404, detail="Intel item not found")
+            text = item_text(cached.get("title") or "", cached.get("summary") or "", cached.get("content"))
+        hits = await asyncio.to_thread(vector_index.search_text, text, limit, type_filter=type, exclude=[id])
+
+    by_id = {x.id: x for x in crud.get_by_ids(db, [x for x, _ in hits])} if hits else {}
+    items, scores = [], []
+    for item_id, score in hits:
+        found = by_id.get(item_id)
+        if found is None:
+            # Deleted by retention cleanup since it was indexed.
+            vector_index.remove(item_id)
+            continue
+        items.append(found)
+        scores.append(round(score, 4))
+    return {"items": items, "scores": scores, "took_ms": round((time.perf_counter() - started) * 1000, 3)}
 
 @router.post("/{id}/favorite")
 async def toggle_favorite(
@@ -251,38 +376,17 @@ async def toggle_favorite(
 ):
     item = crud.toggle_favorite(db, id, req.favorited)
     if item:
+        # The write bumped updated_at, so exports containing the item are unreachable now.
+        export_cache.invalidate([id])
+        list_cache.invalidate([id], scopes=FAVORITES_SCOPE)
         return item
 
-    cached = orchestrator.get_cached_intel(id)
-    if not cached:
+    cached = materialize_cached_items(db, [id], keep_hot=True, favorited=bool(req.favorited))
+    if id not in cached:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    tags = []
-    for t in cached.get("tags") or []:
-        if isinstance(t, dict):
-            tags.append(Tag(label=t.get("label", ""), color=t.get("color", "blue")))
-        else:
-            tags.append(Tag(label=str(t), color="blue"))
-
-    intel_item = IntelItem(
-        id=str(cached.get("id", id)),
-        title=cached.get("title") or "",
-        summary=cached.get("summary") or "",
-        source=cached.get("source") or "Hot Stream",
-        url=cached.get("url"),
-        time=cached.get("time") or "",
-        timestamp=float(cached.get("timestamp") or datetime.now().timestamp()),
-        tags=tags,
-        favorited=bool(req.favorited),
-        is_hot=bool(cached.get("is_hot") if cached.get("is_hot") is not None else True),
-        content=cached.get("content"),
-        thing_id=cached.get("thing_id") or cached.get("thingId"),
-    )
-
-    if not crud.get_intel_by_id(db, intel_item.id):
-        crud.create_intel_item(db, intel_item)
-
-    item = crud.toggle_favorite(db, intel_item.id, req.favorited)
+    item = crud.toggle_favorite(db, id, req.favorited)
     if not item:
         raise HTTPException(status_code=500, detail="Failed to toggle favorite")
+    list_cache.invalidate([id], scopes=FAVORITES_SCOPE)
     return item
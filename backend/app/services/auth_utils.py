@@ -1,4 +1,7 @@
 import bcrypt
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -34,3 +37,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def sign_webhook_body(secret: str, timestamp: str, body: bytes) -> str:
+    # The signed timestamp keeps a captured delivery from being replayed later.
+    message = timestamp.encode("utf-8") + b"." + body
+    return "sha256=" + hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def verify_webhook_signature(
+    secret: str, timestamp: Optional[str], body: bytes, signature: Optional[str], tolerance_seconds: int = 300, now: Optional[float] = None
+) -> bool:
+    if not secret or not signature or not timestamp:
+        return False
+    try:
+        sent_at = int(timestamp.strip())
+    except ValueError:
+        return False
+    if abs((time.time() if now is None else now) - sent_at) > tolerance_seconds:
+        return False
+    signature = signature.strip()
+    if not signature.startswith("sha256="):
+        signature = "sha256=" + signature
+    return hmac.compare_digest(sign_webhook_body(secret, timestamp.strip(), body), signature)
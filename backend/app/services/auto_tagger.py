@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models import TAG_COLORS, IntelItem, Tag
+
+logger = logging.getLogger("auto_tagger")
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.json")
+
+
+_FULL_WIDTH = re.compile("[０-９Ａ-Ｚａ-ｚ]+")
+_TO_HALF_WIDTH = {c: c - 0xFEE0 for c in range(0xFF10, 0xFF5B)}
+
+
+def _normalize(text: str) -> str:
+    # Full-width letters and digits fold to ASCII, so "ＵＳＡ" and "usa" match alike.
+    # (Full NFKC would cost more than the scan itself on CJK text.)
+    return _FULL_WIDTH.sub(lambda m: m.group().translate(_TO_HALF_WIDTH), text).lower()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _trie_pattern(aliases: List[str], guard_start: bool) -> str:
+    """
+    Regex for a trie of `aliases`: shared prefixes are factored out and longer
+    continuations are tried first, so the engine walks the trie once per start
+    position and returns the longest alias there. ASCII aliases must end on a
+    word boundary; with `guard_start` they must also begin on one.
+    """
+    trie: Dict[str, Any] = {}
+    for alias in aliases:
+        node = trie
+        for ch in alias:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: Dict[str, Any], last: str, depth: int) -> str:
+        alts = []
+        for ch, child in sorted((c, n) for c, n in node.items() if c):
+            guard = f"(?<![a-z0-9]{re.escape(ch)})" if guard_start and depth == 0 and _is_word_char(ch) else ""
+            alts.append(re.escape(ch) + guard + emit(child, ch, depth + 1))
+        tail = "(?![a-z0-9])" if _is_word_char(last) else ""
+        if not alts:
+            return tail
+        body = alts[0] if len(alts) == 1 else "(?:%s)" % "|".join(alts)
+        if "" in node:
+            return "(?:%s|%s)" % (body, tail) if tail else "(?:%s)?" % body
+        return body
+
+    return emit(trie, "", 0)
+
+
+class AliasMatcher:
+    """
+    Leftmost-longest multi-pattern matcher over normalized aliases.
+
+    The alias trie is compiled into regular expressions, so the scan itself runs
+    in the C regex engine instead of a per-character Python loop. Aliases that
+    start with an ASCII letter or digit only match on word boundaries ("iran" is
+    not found in "iranian"); they get their own pattern, anchored on the
+    preceding separator for mostly-ASCII text and on the alias' first letter
+    otherwise, so neither kind of text makes the engine try every position.
+    """
+
+    def __init__(self, aliases: Dict[str, Any]):
+        self.aliases = aliases
+        words = [a for a in aliases if _is_word_char(a[0])]
+        others = [a for a in aliases if not _is_word_char(a[0])]
+        self._others = re.compile(_trie_pattern(others, False)) if others else None
+        # Anchoring on the separator needs a leading one, see `_ascii_matches`.
+        self._words_after_separator = re.compile("[^a-z0-9](%s)" % _trie_pattern(words, False)) if words else None
+        self._words = re.compile("(%s)" % _trie_pattern(words, True)) if words else None
+
+    def _ascii_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        if self._words is None:
+            return
+        if len(text.encode("utf-8")) < 1.5 * len(text):
+            for m in self._words_after_separator.finditer(" " + text):
+                yield m.start(1) - 1, m.end(1) - 1
+        else:
+            for m in self._words.finditer(text):
+                yield m.start(), m.end()
+
+    def find(self, text: str) -> List[Any]:
+        """
+        Values of the leftmost-longest, non-overlapping alias matches in already
+        normalized `text`, so "印度尼西亚" counts as Indonesia and not also as India.
+        """
+        spans = list(self._ascii_matches(text))
+        if self._others is not None and not text.isascii():
+            others = [m.span() for m in self._others.finditer(text)]
+            # Each pass is already in order; only a mix of both needs sorting.
+            spans = sorted(spans + others, key=lambda x: (x[0], -x[1])) if spans and others else spans or others
+        found, reached = [], 0
+        for start, end in spans:
+            if start >= reached:
+                found.append(self.aliases[text[start:end]])
+                reached = end
+        return found
+
+
+class Gazetteer:
+    """Categories of `{canonical label: [aliases]}` with a tag color each, compiled into one matcher"""
+
+    def __init__(self, data: Dict[str, Any], path: Optional[str] = None, mtime: float = 0.0):
+        if not isinstance(data, dict):
+            raise ValueError("gazetteer must be a JSON object of categories")
+        self.path = path
+        self.mtime = mtime
+        self.colors: Dict[str, str] = {}
+        self.entries = 0
+        aliases: Dict[str, Tuple[str, str]] = {}
+        for category, spec in data.items():
+            if not isinstance(spec, dict) or not isinstance(spec.get("entries"), dict):
+                raise ValueError(f"gazetteer category {category!r} needs an 'entries' object")
+            color = spec.get("color", "gray")
+            if color not in TAG_COLORS:
+                raise ValueError(f"gazetteer category {category!r} has unknown color {color!r}")
+            self.colors[category] = color
+            for label, names in spec["entries"].items():
+                self.entries += 1
+                for alias in [label, *(names or [])]:
+                    alias = _normalize(str(alias)).strip()
+                    # The first category listing an alias owns it.
+                    if alias and alias not in aliases:
+                        aliases[alias] = (category, str(label))
+        self.aliases = len(aliases)
+        self.matcher = AliasMatcher(aliases)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        try:
+            mtime = os.stat(path).st_mtime
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"cannot read gazetteer {path}: {e}") from e
+        return cls(data, path, mtime)
+
+
+class AutoTagger:
+    """
+    Dictionary tagging of ingested items, for sources that carry no country or
+    domain fields and when no refinement model is configured.
+
+    Title and summary are scanned together, content separately. A label is added
+    when it is mentioned in the title or summary, or at least `min_content_hits`
+    times in the content, with the color of its category and at most `max_tags`
+    per category, ranked by mentions (title/summary count triple). Labels already
+    on the item are left alone. The gazetteer file is re-read when its mtime
+    changes (checked every `check_interval` seconds) or on `load()`; the new
+    matcher is built aside and swapped in, so tagging never waits for a reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.gazetteer: Optional[Gazetteer] = None
+        self.configure()
+
+    def configure(self, path: Optional[str] = None, enabled: bool = True, max_tags: int = 3, min_content_hits: int = 2, check_interval: float = 5.0):
+        self.path = path or DEFAULT_GAZETTEER
+        self.enabled = enabled
+        self.max_tags = max(1, max_tags)
+        self.min_content_hits = max(1, min_content_hits)
+        self.check_interval = check_interval
+        self.gazetteer = None
+        self._checked_at = 0.0
+        self.reloads = 0
+        self.counts = {"items": 0, "tagged": 0, "tags_added": 0, "chars": 0, "bytes": 0}
+        self.scan_seconds = 0.0
+
+    def load(self) -> Gazetteer:
+        """(Re)build the matcher from `path`; raises ValueError and keeps the current one if the file is invalid"""
+        with self._lock:
+            started = time.perf_counter()
+            gazetteer = Gazetteer.from_file(self.path)
+            self.gazetteer = gazetteer
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+        logger.info(
+            f"Gazetteer loaded from {self.path}: {gazetteer.entries} entries, {gazetteer.aliases} aliases "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return gazetteer
+
+    def maybe_reload(self) -> Gazetteer:
+        now = time.monotonic()
+        current = self.gazetteer
+        if current is not None and now - self._checked_at < self.check_interval:
+            return current
+        self._checked_at = now
+        try:
+            if current is None or os.stat(self.path).st_mtime != current.mtime:
+                return self.load()
+        except (OSError, ValueError) as e:
+            if current is None:
+                raise
+            logger.error(f"Gazetteer reload failed, keeping the previous one: {e}")
+        return current
+
+    def match(self, title: str, summary: str, content: str = "") -> Dict[str, List[str]]:
+        """Labels to tag per category for the given text"""
+        gazetteer = self.maybe_reload()
+        head = _normalize(f"{title}\n{summary}")
+        body = _normalize(content) if content else ""
+        started = time.perf_counter()
+        head_hits = Counter(gazetteer.matcher.find(head))
+        body_hits = Counter(gazetteer.matcher.find(body)) if body else Counter()
+        self.scan_seconds += time.perf_counter() - started
+        self.counts["chars"] += len(head) + len(body)
+
+        ranked: Dict[str, List[Tuple[int, str]]] = {}
+        for key in head_hits.keys() | body_hits.keys():
+            if head_hits[key] or body_hits[key] >= self.min_content_hits:
+                category, label = key
+                ranked.setdefault(category, []).append((3 * head_hits[key] + body_hits[key], label))
+        return {c: [label for _, label in sorted(xs, key=lambda x: (-x[0], x[1]))[: self.max_tags]] for c, xs in ranked.items()}
+
+    def tag(self, item: IntelItem) -> IntelItem:
+        """`item` with the dictionary tags appended (a copy, or `item` itself when nothing was added)"""
+        content = item.content or ""
+        self.counts["items"] += 1
+        self.counts["bytes"] += len(item.title.encode()) + len((item.summary or "").encode()) + len(content.encode())
+        found = self.match(item.title, item.summary or "", content)
+        labels = {t.label for t in item.tags}
+        tags = list(item.tags)
+        colors = self.gazetteer.colors
+        for category, names in found.items():
+            for label in names:
+                if label not in labels:
+                    labels.add(label)
+                    tags.append(Tag(label=label, color=colors[category]))
+        if len(tags) == len(item.tags):
+            return item
+        self.counts["tagged"] += 1
+        self.counts["tags_added"] += len(tags) - len(item.tags)
+        return item.model_copy(update={"tags": tags})
+
+    def tag_items(self, items: List[IntelItem]) -> List[IntelItem]:
+        if not self.enabled:
+            return items
+        return [self.tag(item) for item in items]
+
+    def stats(self) -> Dict[str, Any]:
+        gazetteer = self.gazetteer
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "entries": gazetteer.entries if gazetteer else 0,
+            "aliases": gazetteer.aliases if gazetteer else 0,
+            "reloads": self.reloads,
+            **self.counts,
+            "mb_per_s": round(self.counts["bytes"] / self.scan_seconds / 1e6, 2) if self.scan_seconds else 0.0,
+        }
+
+
+auto_tagger = AutoTagger()
@@ -1,17 +1,27 @@
 import asyncio
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 from abc import ABC, abstractmethod
+from app.services.poll_scheduler import AdaptivePollScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+class PollError(Exception):
+    """Raised by a polling step that failed upstream (HTTP error, auth, persistence)"""
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
 class BasePoller(ABC):
     def __init__(self, name: str = "BasePoller"):
+        self.name = name
         self.logger = logging.getLogger(name)
         self.is_running: bool = False
         self.task: Optional[asyncio.Task] = None
         self.poll_interval: int = 5  # seconds
+        self.scheduler = AdaptivePollScheduler(self.poll_interval)
         
     @abstractmethod
     def is_configured(self) -> bool:
@@ -19,8 +29,8 @@ class BasePoller(ABC):
         pass
 
     @abstractmethod
-    async def _poll_step(self):
-        """Execute a single polling step"""
+    async def _poll_step(self) -> Optional[int]:
+        """Execute a single polling step, returning the number of new documents (None if unknown)"""
         pass
 
     async def start(self):
@@ -32,6 +42,7 @@ class BasePoller(ABC):
             self.logger.error("Poller not configured properly")
             return
 
+        self.scheduler.reset(self.poll_interval)
         self.is_running = True
         self.task = asyncio.create_task(self._poll_loop())
         self.logger.info("Poller started")
@@ -49,11 +60,32 @@ class BasePoller(ABC):
                 pass
         self.logger.info("Poller stopped")
 
+    def _next_delay(self) -> float:
+        """Seconds to sleep before the next polling step"""
+        return self.scheduler.next_delay()
+
+    async def _run_step(self):
+        if not self.scheduler.allow_request():
+            return
+        try:
+            new_count = await self._poll_step()
+            self.scheduler.record_success(new_count)
+        except PollError as e:
+            self.logger.warning(f"Poll failed: {e}")
+            self.scheduler.record_failure(str(e), e.retry_after)
+        except Exception as e:
+            self.logger.error(f"Poller loop error: {e}")
+            self.scheduler.record_failure(str(e))
+
     async def _poll_loop(self):
         while self.is_running:
-            try:
-                await self._poll_step()
-            except Exception as e:
-                self.logger.error(f"Poller loop error: {e}")
-            
-            await asyncio.sleep(self.poll_interval)
+            await self._run_step()
+            await asyncio.sleep(self._next_delay())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "configured": self.is_configured(),
+            "running": self.is_running,
+            **self.scheduler.snapshot(),
+        }
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.agent.orchestrator import orchestrator
+from app.models import IntelItem, Tag
+from app.services.list_cache import list_cache, scope_of
+
+
+def intel_item_from_cache(cached: Dict[str, Any], item_id: str, keep_hot: bool = False, favorited: Optional[bool] = None) -> IntelItem:
+    """
+    An orchestrator hot-cache entry as an IntelItem. It is stored as a regular
+    (not hot) item unless `keep_hot`, which keeps the entry's flag (hot if unset);
+    `favorited` overrides the entry's favorite state.
+    """
+    tags = []
+    for t in cached.get("tags") or []:
+        if isinstance(t, dict):
+            tags.append(Tag(label=t.get("label", ""), color=t.get("color", "blue")))
+        else:
+            tags.append(Tag(label=str(t), color="blue"))
+
+    return IntelItem(
+        id=str(cached.get("id", item_id)),
+        title=cached.get("title") or "",
+        summary=cached.get("summary") or "",
+        source=cached.get("source") or "Hot Stream",
+        url=cached.get("url"),
+        time=cached.get("time") or "",
+        timestamp=float(cached.get("timestamp") or datetime.now().timestamp()),
+        tags=tags,
+        favorited=bool(cached.get("favorited") or False) if favorited is None else favorited,
+        is_hot=bool(cached.get("is_hot") if cached.get("is_hot") is not None else True) if keep_hot else False,
+        content=cached.get("content"),
+        thing_id=cached.get("thing_id") or cached.get("thingId"),
+    )
+
+
+def materialize_cached_items(
+    db: Session, item_ids: List[str], keep_hot: bool = False, favorited: Optional[bool] = None
+) -> Dict[str, IntelItem]:
+    """
+    Hot-stream items that only live in the orchestrator cache, persisted so the
+    database routes (export, detail, favorite) can read them: one pass over the
+    cache for all `item_ids`, then one bulk insert of those not stored yet.
+    Returns the items found, by id; ids not in the cache are left out.
+    """
+    if not item_ids:
+        return {}
+    cached = orchestrator.get_cached_intel_many(item_ids)
+    items = {item_id: intel_item_from_cache(cached[item_id], item_id, keep_hot, favorited) for item_id in item_ids if item_id in cached}
+    if items and crud.insert_missing_intel_items(db, list(items.values())):
+        scopes = {scope_of(x.is_hot) for x in items.values()}
+        if any(x.favorited for x in items.values()):
+            scopes.add("favorites")
+        list_cache.invalidate(scopes=scopes)
+    return items
@@ -0,0 +1,60 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+NEW = "new"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+
+def content_hash(fields: Dict[str, Any]) -> str:
+    """Stable hash of the mapped fields of a document"""
+    raw = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DedupWindow:
+    """
+    Bounded LRU of recently seen documents: id -> (updatedAt, content hash).
+
+    `classify` tells whether a document is new, an edit of one seen before, or an
+    unchanged repeat. Unlike a trimmed set, eviction always drops the least recently
+    seen ids, so the documents a poll keeps returning are never forgotten.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Optional[str], str]]" = OrderedDict()
+        self.counts = {NEW: 0, UPDATED: 0, UNCHANGED: 0}
+        self.evicted = 0
+
+    def classify(self, key: str, version: Optional[str], fields: Dict[str, Any]) -> str:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            # Same updatedAt: skip without hashing.
+            if version and entry[0] == version:
+                self.counts[UNCHANGED] += 1
+                return UNCHANGED
+
+        digest = content_hash(fields)
+        self._entries[key] = (version, digest)
+        if entry is None:
+            result = NEW
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        else:
+            result = UNCHANGED if entry[1] == digest else UPDATED
+        self.counts[result] += 1
+        return result
+
+    def forget(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "capacity": self.max_entries, "evicted": self.evicted, **self.counts}
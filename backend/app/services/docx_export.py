@@ -0,0 +1,243 @@
+import io
+import re
+import threading
+import zipfile
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Cm, Pt
+
+from app.models import IntelItem
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def docx_fields(item: IntelItem) -> Dict[str, Any]:
+    """The fields the DOCX layout uses, as a plain dict that pickles cheaply into a worker process"""
+    return {
+        "title": item.title,
+        "summary": item.summary,
+        "content": item.content,
+        "source": item.source,
+        "url": item.url,
+        "time": item.time,
+        "tags": [t.label for t in item.tags or []],
+    }
+
+
+def export_filename(items: Sequence[Dict[str, Any]]) -> str:
+    if len(items) == 1:
+        # Remove invalid chars for filename
+        safe_title = "".join([c for c in items[0]["title"] if c not in r'\/:*?"<>|'])
+        return f"{safe_title}.docx"
+    return "情报批量导出.docx"
+
+
+def _new_document():
+    doc = Document()
+    normal_style = doc.styles["Normal"]
+    normal_style.font.size = Pt(12)
+    return doc
+
+
+def render_docx_object_model(
+    items: Sequence[Dict[str, Any]],
+    output: Union[str, IO[bytes]],
+    on_progress: Optional[Callable[[int], None]] = None,
+    progress_every: int = 50,
+):
+    """
+    The export built through python-docx's object model, paragraph by paragraph.
+    Kept as the layout reference for `render_docx`, which writes the same
+    document.xml several times faster.
+    """
+    doc = _new_document()
+
+    def _safe_text(v: Optional[str]) -> str:
+        return (v or "").strip()
+
+    def _add_kv_line(key: str, value: str):
+        p = doc.add_paragraph()
+        rk = p.add_run(f"{key}：")
+        rk.bold = True
+        p.add_run(value)
+        return p
+
+    def _add_center_title(text: str):
+        p = doc.add_paragraph()
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        r = p.add_run(text)
+        r.bold = True
+        r.font.size = Pt(16)
+        return p
+
+    def _add_body(text: str):
+        p = doc.add_paragraph(text)
+        p.paragraph_format.first_line_indent = Cm(0.74)
+        p.paragraph_format.line_spacing = 1.25
+        return p
+
+    for idx, item in enumerate(items):
+        tags_value = " / ".join([label for label in item["tags"] if _safe_text(label)])
+        if not tags_value:
+            tags_value = "暂无"
+
+        _add_kv_line("拟投栏目", tags_value)
+        _add_kv_line("事件时间", _safe_text(item["time"]) or "暂无")
+        _add_kv_line("价值点", _safe_text(item["summary"]) or "暂无")
+
+        doc.add_paragraph()
+
+        _add_center_title(_safe_text(item["title"]) or "未命名")
+
+        body_text = _safe_text(item["content"]) or _safe_text(item["summary"])
+        if body_text:
+            _add_body(body_text)
+
+        source_parts = [f"来源：{_safe_text(item['source']) or '未知'}", f"原标题：{_safe_text(item['title']) or '未命名'}"]
+        if _safe_text(item["url"]):
+            source_parts.append(f"来源URL：{_safe_text(item['url'])}")
+        doc.add_paragraph(f"（{'，'.join(source_parts)}）")
+
+        if idx != len(items) - 1:
+            doc.add_page_break()
+        if on_progress and (idx + 1) % progress_every == 0:
+            on_progress(idx + 1)
+
+    doc.save(output)
+    if on_progress:
+        on_progress(len(items))
+
+
+_template_lock = threading.Lock()
+_template: Optional[Tuple[List[Tuple[str, Tuple[int, ...], bytes]], bytes, bytes]] = None
+
+# Characters XML 1.0 cannot carry; python-docx refuses them, the template renderer drops them.
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_RUN_BREAKS = re.compile("([\t\r\n])")
+
+_KEY_RUN = '<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>%s：</w:t></w:r>'
+_EMPTY_PARAGRAPH = "<w:p/>"
+_TITLE = '<w:p><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr><w:b/><w:sz w:val="32"/></w:rPr>%s</w:r></w:p>'
+# Cm(0.74) is 420 twips; a 1.25 multiple of the 240 twip single line is 300.
+_BODY = '<w:p><w:pPr><w:spacing w:line="300" w:lineRule="auto"/><w:ind w:firstLine="420"/></w:pPr><w:r>%s</w:r></w:p>'
+_PLAIN = "<w:p><w:r>%s</w:r></w:p>"
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def _docx_template():
+    """
+    The parts of an empty export document, saved once by python-docx: every zip
+    entry but word/document.xml, plus that part split around the body content.
+    """
+    global _template
+    with _template_lock:
+        if _template is None:
+            output = io.BytesIO()
+            _new_document().save(output)
+            with zipfile.ZipFile(output) as zf:
+                parts = [(info.filename, info.date_time, zf.read(info)) for info in zf.infolist()]
+            document = next(data for name, _, data in parts if name == "word/document.xml")
+            head, rest = document.split(b"<w:body>", 1)
+            tail = rest[rest.index(b"<w:sectPr"):]
+            _template = (parts, head + b"<w:body>", tail)
+        return _template
+
+
+def _escape(text: str) -> str:
+    return _XML_INVALID.sub("", text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _t(text: str) -> str:
+    if len(text.strip()) < len(text):
+        return '<w:t xml:space="preserve">%s</w:t>' % _escape(text)
+    return "<w:t>%s</w:t>" % _escape(text)
+
+
+def _run_content(text: str) -> str:
+    """`<w:r>` children for `text`, with tabs and line breaks as python-docx writes them"""
+    if "\t" not in text and "\r" not in text and "\n" not in text:
+        return _t(text) if text else ""
+    parts = []
+    for piece in _RUN_BREAKS.split(text):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            parts.append("<w:br/>")
+        elif piece:
+            parts.append(_t(piece))
+    return "".join(parts)
+
+
+def _item_xml(item: Dict[str, Any]) -> str:
+    def _safe_text(v: Optional[str]) -> str:
+        return (v or "").strip()
+
+    def _kv_line(key: str, value: str) -> str:
+        return _KEY_RUN % key + "<w:r>%s</w:r></w:p>" % _run_content(value)
+
+    tags_value = " / ".join([label for label in item["tags"] if _safe_text(label)]) or "暂无"
+    title = _safe_text(item["title"]) or "未命名"
+    parts = [
+        _kv_line("拟投栏目", tags_value),
+        _kv_line("事件时间", _safe_text(item["time"]) or "暂无"),
+        _kv_line("价值点", _safe_text(item["summary"]) or "暂无"),
+        _EMPTY_PARAGRAPH,
+        _TITLE % _run_content(title),
+    ]
+    body_text = _safe_text(item["content"]) or _safe_text(item["summary"])
+    if body_text:
+        parts.append(_BODY % _run_content(body_text))
+    source_parts = [f"来源：{_safe_text(item['source']) or '未知'}", f"原标题：{title}"]
+    if _safe_text(item["url"]):
+        source_parts.append(f"来源URL：{_safe_text(item['url'])}")
+    parts.append(_PLAIN % _run_content(f"（{'，'.join(source_parts)}）"))
+    return "".join(parts)
+
+
+def render_docx(
+    items: Sequence[Dict[str, Any]],
+    output: Union[str, IO[bytes]],
+    on_progress: Optional[Callable[[int], None]] = None,
+    progress_every: int = 50,
+):
+    """
+    Write the export document for `items` (see `docx_fields`) to a path or file
+    object. `on_progress(done)` is called every `progress_every` items.
+
+    The WordprocessingML of each item is written straight into the zip stream
+    of a template document, instead of being built as python-docx objects; the
+    layout is the one of `render_docx_object_model`.
+    """
+    parts, head, tail = _docx_template()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, date_time, data in parts:
+            # A fresh ZipInfo per render: the zip writer fills in sizes and offsets on it.
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            if name != "word/document.xml":
+                zf.writestr(info, data)
+                continue
+            with zf.open(info, "w", force_zip64=True) as document:
+                document.write(head)
+                chunk: List[str] = []
+                for idx, item in enumerate(items):
+                    if idx:
+                        chunk.append(_PAGE_BREAK)
+                    chunk.append(_item_xml(item))
+                    if (idx + 1) % progress_every == 0:
+                        document.write("".join(chunk).encode("utf-8"))
+                        chunk.clear()
+                        if on_progress:
+                            on_progress(idx + 1)
+                document.write("".join(chunk).encode("utf-8"))
+                document.write(tail)
+    if on_progress:
+        on_progress(len(items))
+
+
+def render_docx_bytes(items: List[Dict[str, Any]]) -> bytes:
+    output = io.BytesIO()
+    render_docx(items, output)
+    return output.getvalue()
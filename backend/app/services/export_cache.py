@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("export_cache")
+
+
+def export_key(fmt: str, versions: Iterable[Tuple[str, Optional[float]]]) -> str:
+    """Content address of an export: the format plus each item id (in document order) and its `updated_at`"""
+    digest = hashlib.sha256(fmt.encode("utf-8"))
+    for item_id, version in versions:
+        digest.update(f"\n{item_id}\t{version!r}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedExport:
+    key: str
+    path: str
+    size: int
+    filename: str
+    members: Tuple[str, ...]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key}"'
+
+
+class ExportCache:
+    """
+    Rendered exports on disk, keyed by `export_key`, so re-exporting an unchanged
+    selection (the day's favorites for several recipients) skips the render.
+
+    Any write to an item bumps its `updated_at`, so an entry can never serve stale
+    content; `invalidate` additionally drops the entries an upsert touched right
+    away instead of leaving them to age out. Least recently used entries are
+    removed once the files exceed `max_bytes`. The index lives in memory, so files
+    of a previous run are cleared on `start`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owns_directory = False
+        self.directory: Optional[str] = None
+        self.configure()
+
+    def configure(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, enabled: bool = True):
+        self.stop()
+        self.directory = directory
+        self._started = False
+        self.max_bytes = max(0, max_bytes)
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, CachedExport]" = OrderedDict()
+        self._by_member: Dict[str, Set[str]] = {}
+        self.bytes = 0
+        self.counts = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "invalidated": 0}
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="intel-export-cache-")
+                self._owns_directory = True
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            for name in os.listdir(self.directory):
+                if name.endswith((".docx", ".part")):
+                    os.remove(os.path.join(self.directory, name))
+        logger.info(f"Export cache started: directory={self.directory}, max_bytes={self.max_bytes}")
+
+    def stop(self):
+        self.clear()
+        if self._owns_directory and self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+        self._owns_directory = False
+        self._started = False
+
+    def get(self, key: str) -> Optional[CachedExport]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry.path):
+                self.counts["misses"] += 1
+                if entry is not None:
+                    self._drop(entry)
+                return None
+            self._entries.move_to_end(key)
+            self.counts["hits"] += 1
+            return entry
+
+    def stat(self, entry: CachedExport) -> Optional[os.stat_result]:
+        """`os.stat` of the file of `entry`, or None if it was evicted meanwhile"""
+        try:
+            return os.stat(entry.path)
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes, filename: str, members: List[str]) -> Optional[CachedExport]:
+        if not self._admits(len(data)):
+            return None
+        fd, partial = tempfile.mkstemp(suffix=".part", dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self._add(key, partial, filename, members)
+
+    def put_file(self, key: str, source: str, filename: str, members: List[str]) -> Optional[CachedExport]:
+        """Cache a copy of a rendered file (the original stays with its owner, e.g. an export job)"""
+        if not self._admits(os.path.getsize(source)):
+            return None
+        fd, partial = tempfile.mkstemp(suffix=".part", dir=self.directory)
+        os.close(fd)
+        shutil.copyfile(source, partial)
+        return self._add(key, partial, filename, members)
+
+    def invalidate(self, item_ids: Iterable[str]) -> int:
+        """Drop every entry that contains one of `item_ids`"""
+        dropped = 0
+        with self._lock:
+            if not self._by_member:
+                return 0
+            for item_id in item_ids:
+                for key in list(self._by_member.get(item_id, ())):
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._drop(entry)
+                        dropped += 1
+            self.counts["invalidated"] += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            for entry in list(getattr(self, "_entries", {}).values()):
+                self._drop(entry)
+
+    def _admits(self, size: int) -> bool:
+        if not self.enabled or size > self.max_bytes:
+            return False
+        self.start()
+        return True
+
+    def _add(self, key: str, partial: str, filename: str, members: List[str]) -> CachedExport:
+        # Concurrent renders of one key each write their own temp file; the last rename wins.
+        path = os.path.join(self.directory, f"{key}.docx")
+        os.replace(partial, path)
+        entry = CachedExport(key, path, os.path.getsize(path), filename, tuple(members))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+                self._unindex(previous)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            for item_id in entry.members:
+                self._by_member.setdefault(item_id, set()).add(key)
+            self.counts["stored"] += 1
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries.values())))
+                self.counts["evicted"] += 1
+        return entry
+
+    def _drop(self, entry: CachedExport):
+        """Remove `entry` from the index and disk; the lock must be held"""
+        if self._entries.get(entry.key) is not entry:
+            return
+        del self._entries[entry.key]
+        self.bytes -= entry.size
+        self._unindex(entry)
+        try:
+            # An open download keeps reading the unlinked file.
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def _unindex(self, entry: CachedExport):
+        for item_id in entry.members:
+            keys = self._by_member.get(item_id)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._by_member[item_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            **self.counts,
+        }
+
+
+export_cache = ExportCache()
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from app.services.docx_export import render_docx
+
+logger = logging.getLogger("export_jobs")
+
+TERMINAL = ("done", "failed")
+# How long a finished job waits for its worker's trailing progress messages.
+PROGRESS_GRACE_SECONDS = 1.0
+
+# Set in each worker process by `_init_worker`; carries (job_id, done) back to the server.
+_progress_queue = None
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _render_job(job_id: str, items: List[Dict[str, Any]], path: str) -> int:
+    """Runs in a worker process: render to a temp name, then move into place"""
+    _progress_queue.put((job_id, 0))
+    partial = f"{path}.part"
+    render_docx(items, partial, on_progress=lambda done: _progress_queue.put((job_id, done)))
+    os.replace(partial, path)
+    return os.path.getsize(path)
+
+
+class ExportQueueFull(Exception):
+    """Raised by `submit` when `max_pending` jobs are already queued or rendering"""
+
+
+@dataclass(eq=False)
+class ExportJob:
+    id: str
+    filename: str
+    total: int
+    path: str
+    status: str = "queued"
+    done: int = 0
+    size: Optional[int] = None
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+    # Called (in a thread) with the finished job, e.g. to keep a copy of the file.
+    on_done: Optional[Callable[["ExportJob"], None]] = None
+    # SSE frames emitted so far; late subscribers replay them.
+    events: List[str] = field(default_factory=list)
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def emit(self, event: str, data: Any):
+        self.events.append(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class ExportJobEngine:
+    """
+    DOCX exports rendered in a process pool, so building a large document never
+    blocks the event loop (or, through the GIL, the threads serving it).
+
+    `submit` registers a job and hands it to one of `workers` processes, which
+    report progress over a multiprocessing queue; a reader thread feeds it back
+    into the loop as `status` / `progress` SSE frames. The file is written to
+    `directory` and served from there until `ttl_seconds` after completion, when
+    job and file are removed. At most `max_pending` jobs wait or render at once.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._owns_directory = False
+        self.configure()
+
+    def configure(
+        self,
+        workers: int = 2,
+        ttl_seconds: float = 1800,
+        sync_max_items: int = 50,
+        max_pending: int = 20,
+        directory: Optional[str] = None,
+    ):
+        self.worker_count = max(1, workers)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.sync_max_items = max(0, sync_max_items)
+        self.max_pending = max(1, max_pending)
+        self.directory = directory
+        self._jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._runs: Set[asyncio.Task] = set()
+        self._last_sweep = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._pool is not None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._loop is loop:
+            return
+        if self._loop is not loop:
+            # Jobs of a previous loop (e.g. a finished asyncio.run) cannot be awaited any more.
+            await self.stop()
+        if not self.directory:
+            self.directory = tempfile.mkdtemp(prefix="intel-export-")
+            self._owns_directory = True
+        elif not self._owns_directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._sweep_directory()
+        # spawn: forking a process that runs an event loop and threads is unsafe.
+        context = multiprocessing.get_context("spawn")
+        self._queue = context.Queue()
+        self._pool = ProcessPoolExecutor(self.worker_count, mp_context=context, initializer=_init_worker, initargs=(self._queue,))
+        self._loop = loop
+        self._reader = threading.Thread(target=self._read_progress, args=(self._queue, loop), name="export-progress", daemon=True)
+        self._reader.start()
+        logger.info(f"Export job engine started: workers={self.worker_count}, directory={self.directory}")
+
+    def _discard_pool(self, wait: bool = False):
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        pool.shutdown(wait=wait, cancel_futures=True)
+        self._queue.put(None)
+
+    async def stop(self):
+        if self._pool is not None:
+            await asyncio.to_thread(self._discard_pool, True)
+            await asyncio.to_thread(self._reader.join)
+        for job in self._jobs.values():
+            self._remove_file(job)
+        self._jobs.clear()
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory, self._owns_directory = None, False
+
+    def _read_progress(self, queue, loop: asyncio.AbstractEventLoop):
+        while True:
+            message = queue.get()
+            if message is None:
+                return
+            try:
+                loop.call_soon_threadsafe(self._on_progress, *message)
+            except RuntimeError:
+                return  # loop closed
+
+    def _on_progress(self, job_id: str, done: int):
+        job = self._jobs.get(job_id)
+        if job is None or job.status in TERMINAL:
+            return
+        if job.status == "queued":
+            job.status = "running"
+            job.emit("status", {"status": "running"})
+        job.done = done
+        job.emit("progress", {"done": done, "total": job.total})
+
+    async def submit(
+        self, items: List[Dict[str, Any]], filename: str, on_done: Optional[Callable[[ExportJob], None]] = None
+    ) -> ExportJob:
+        """Queue a render of `items` (see `docx_fields`); raises ExportQueueFull when too many are pending"""
+        await self.start()
+        self._evict()
+        if sum(1 for j in self._jobs.values() if j.status not in TERMINAL) >= self.max_pending:
+            raise ExportQueueFull(f"Export queue is full ({self.max_pending} jobs pending)")
+        job_id = uuid.uuid4().hex
+        job = ExportJob(job_id, filename, len(items), os.path.join(self.directory, f"{job_id}.docx"), on_done=on_done)
+        self._jobs[job_id] = job
+        job.emit("status", {"status": "queued"})
+        run = asyncio.create_task(self._run(job, items))
+        self._runs.add(run)
+        run.add_done_callback(self._runs.discard)
+        return job
+
+    async def _run(self, job: ExportJob, items: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        pool = self._pool
+        try:
+            job.size = await self._loop.run_in_executor(pool, _render_job, job.id, items, job.path)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and pool is self._pool:
+                # A crashed worker breaks the pool; the next submit builds a new one.
+                self._discard_pool()
+            logger.error(f"Export job {job.id} failed: {e!r}")
+            job.error = str(e) or type(e).__name__
+            self._finish(job, "failed")
+            job.emit("error", {"message": "Export failed"})
+            job.emit("status", {"status": "failed"})
+            return
+        # The worker's progress messages travel on their own queue and can trail its
+        # result; give them a moment to land so followers see them before `done`.
+        deadline = self._loop.time() + PROGRESS_GRACE_SECONDS
+        while job.done != job.total and self._loop.time() < deadline:
+            try:
+                await asyncio.wait_for(job.changed.wait(), deadline - self._loop.time())
+            except asyncio.TimeoutError:
+                break
+        if job.done != job.total:
+            self._on_progress(job.id, job.total)
+        self._finish(job, "done")
+        job.emit("status", {"status": "done", "size": job.size})
+        logger.info(f"Export job {job.id}: {job.total} items, {job.size} bytes in {time.perf_counter() - started:.2f}s")
+        if job.on_done is not None:
+            try:
+                await asyncio.to_thread(job.on_done, job)
+            except Exception as e:
+                logger.error(f"Export job {job.id} completion callback failed: {e!r}")
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        self._evict()
+        return self._jobs.get(job_id)
+
+    async def follow(self, job: ExportJob) -> AsyncIterator[str]:
+        """Yield every SSE frame of `job`, waiting for new ones until it finishes"""
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                yield job.events[sent]
+                sent += 1
+            if job.status in TERMINAL:
+                return
+            await job.changed.wait()
+
+    def _finish(self, job: ExportJob, status: str):
+        job.status = status
+        job.finished_at = time.monotonic()
+
+    def _remove_file(self, job: ExportJob):
+        for path in (job.path, f"{job.path}.part"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        now = time.monotonic()
+        if now - self._last_sweep < min(1.0, self.ttl_seconds):
+            return
+        self._last_sweep = now
+        for job in [j for j in self._jobs.values() if j.status in TERMINAL and now - j.finished_at > self.ttl_seconds]:
+            # Unlinking is safe for a download still in progress: it keeps its open handle.
+            self._remove_file(job)
+            del self._jobs[job.id]
+
+    def _sweep_directory(self):
+        """Drop files a previous run left in a configured `directory`"""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith((".docx", ".docx.part")) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"running": self.is_running, "workers": self.worker_count, "jobs": counts, "directory": self.directory}
+
+
+export_jobs = ExportJobEngine()
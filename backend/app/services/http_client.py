@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger("http_client")
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_avg = 0.0
+        self.latency_max = 0.0
+        self.status_counts: Dict[int, int] = {}
+
+    def observe(self, latency: float, status: Optional[int]):
+        self.requests += 1
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_avg = latency if self.requests == 1 else self.latency_avg * 0.9 + latency * 0.1
+        if status is None:
+            self.errors += 1
+        else:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms_avg": round(self.latency_avg * 1000, 3),
+            "latency_ms_max": round(self.latency_max * 1000, 3),
+            "status_counts": dict(self.status_counts),
+        }
+
+
+class HttpClient:
+    """
+    One pooled aiohttp session for all outbound CMS traffic (pollers and CMS login).
+
+    Keeps connections alive between polls, caps connections overall and per host,
+    caches DNS lookups, applies connect/read timeouts and records per-host request
+    latency plus pool usage through aiohttp tracing.
+    """
+
+    def __init__(self):
+        self.limit = 100
+        self.limit_per_host = 20
+        self.dns_cache_ttl = 300
+        self.keepalive_timeout = 30.0
+        self.connect_timeout = 5.0
+        self.read_timeout = 30.0
+        self.compression = True
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.connector: Optional[aiohttp.TCPConnector] = None
+        self.hosts: Dict[str, _HostStats] = {}
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        compression: bool = True,
+    ):
+        self.limit = max(1, limit)
+        self.limit_per_host = max(1, limit_per_host)
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.compression = compression
+
+    async def start(self):
+        self.get_session()
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.connector = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session and not self.session.closed and self._loop is loop:
+            return self.session
+
+        self._loop = loop
+        self.connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        headers = {} if self.compression else {"Accept-Encoding": "identity"}
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=timeout,
+            headers=headers,
+            auto_decompress=True,
+            trace_configs=[self._trace_config()],
+        )
+        logger.info(
+            f"HTTP client pool created: limit={self.limit}, limit_per_host={self.limit_per_host}, "
+            f"dns_ttl={self.dns_cache_ttl}s, connect_timeout={self.connect_timeout}s, read_timeout={self.read_timeout}s, "
+            f"compression={self.compression}"
+        )
+        return self.session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(started=0.0))
+
+        async def on_request_start(session, ctx, params):
+            ctx.started = time.perf_counter()
+            self.in_flight += 1
+
+        async def on_request_end(session, ctx, params):
+            self.in_flight -= 1
+            self._host(params.url).observe(time.perf_counter() - ctx.started, params.response.status)
+
+        async def on_request_exception(session, ctx, params):
+            self.in_flight -= 1
+            self._host(params.url).observe(time.perf_counter() - ctx.started, None)
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.connections_reused += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def _host(self, url) -> _HostStats:
+        host = urlsplit(str(url)).netloc or "unknown"
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = _HostStats()
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        pool: Dict[str, Any] = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "in_flight": self.in_flight,
+        }
+        if self.connector and not self.connector.closed:
+            pool["acquired"] = len(getattr(self.connector, "_acquired", ()))
+            pool["idle"] = sum(len(v) for v in getattr(self.connector, "_conns", {}).values())
+        return {
+            "open": bool(self.session and not self.session.closed),
+            "pool": pool,
+            "hosts": {host: stats.stats() for host, stats in self.hosts.items()},
+        }
+
+
+http_client = HttpClient()
@@ -0,0 +1,37 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class IdempotencyCache:
+    """Bounded, TTL-limited set of keys that have already been processed"""
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    def _evict(self, now: float):
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if now - seen_at <= self.ttl_seconds and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def check_and_add(self, key: Optional[str]) -> bool:
+        """Return True if `key` was seen within the TTL; otherwise record it and return False"""
+        if not key:
+            return False
+        now = time.monotonic()
+        self._evict(now)
+        if key in self._entries:
+            return True
+        self._entries[key] = now
+        return False
+
+    def discard(self, key: Optional[str]):
+        if key:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
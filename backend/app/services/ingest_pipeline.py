@@ -0,0 +1,409 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.models import IntelItem
+from app.agent.orchestrator import orchestrator
+from app.services.near_dup import fingerprint, near_dup_index
+from app.services.story_clusters import story_clusters
+from app.services.search_index import search_index
+from app.services.vector_index import vector_index
+from app.services.auto_tagger import auto_tagger
+from app.services.refiner import refiner
+from app.services.export_cache import export_cache
+from app.services.list_cache import list_cache, scope_of
+from app.database import SessionLocal
+from app import crud
+
+logger = logging.getLogger("ingest_pipeline")
+
+STAGES = ("normalize", "dedup", "refine", "persist", "broadcast")
+
+
+@dataclass
+class IngestEnvelope:
+    payload: Any
+    normalize: Callable[[Any], Optional[IntelItem]]
+    source: str
+    event: str = "new_intel"
+    submitted_at: float = field(default_factory=time.monotonic)
+    stage_enqueued_at: float = field(default_factory=time.monotonic)
+    item: Optional[IntelItem] = None
+    # The unrefined item registered in `in_flight`, compared against repeats by dedup.
+    claimed: Optional[IntelItem] = None
+
+
+def _persisted_dedup_state(item_id: str):
+    db = SessionLocal()
+    try:
+        return crud.get_dedup_state(db, item_id)
+    finally:
+        db.close()
+
+
+def _same_document(a: Optional[IntelItem], b: IntelItem) -> bool:
+    # Ignores fields the dedup stage derives itself (duplicate_of / simhash are not dumped).
+    return a is not None and a.model_dump(exclude={"cluster_id"}) == b.model_dump(exclude={"cluster_id"})
+
+
+class _Stage:
+    def __init__(self, name: str, concurrency: int, maxsize: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.retried = 0
+        self.in_flight = 0
+        self.lag_avg = 0.0
+        self.lag_max = 0.0
+        self.started_at = time.monotonic()
+
+    def observe(self, env: IngestEnvelope):
+        lag = time.monotonic() - env.stage_enqueued_at
+        self.processed += 1
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_avg = lag if self.processed == 1 else self.lag_avg * 0.9 + lag * 0.1
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(1e-6, time.monotonic() - self.started_at)
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "retried": self.retried,
+            "throughput_per_s": round(self.processed / elapsed, 3),
+            "lag_ms_avg": round(self.lag_avg * 1000, 3),
+            "lag_ms_max": round(self.lag_max * 1000, 3),
+        }
+
+
+class IngestPipeline:
+    """
+    fetch (pollers) -> normalize -> dedup -> refine -> persist (micro-batches) -> broadcast
+
+    The dedup stage also fingerprints title + summary and flags near-duplicates of
+    recently ingested stories (`duplicate_of`); those are persisted but not broadcast.
+    Every other item is assigned to a story cluster (`cluster_id`). An edit of an
+    item already persisted or in flight keeps its verdict and cluster. The refine stage
+    translates and tags items through `refiner` when a model is configured, then
+    adds country, organization and domain tags from the local gazetteer (`auto_tagger`).
+
+    Every stage reads from its own bounded queue and runs `concurrency` workers, so a
+    slow DB write no longer delays the next poll and a slow SSE fan-out no longer
+    delays persistence. When a queue is full, `submit` blocks and the poller is
+    slowed down (backpressure). With the default concurrency of 1 per stage, items
+    are persisted and broadcast in submission order, so the latest version wins.
+    Sources move on once an item is submitted, so a failed DB write is retried
+    with exponential backoff (`persist_retries` times) before the batch is dropped.
+    """
+
+    def __init__(self):
+        self.queue_size = 1000
+        self.persist_batch_size = 100
+        self.persist_batch_wait = 0.05
+        self.persist_retries = 8
+        self.persist_retry_wait = 0.1
+        self.persist_retry_max_wait = 5.0
+        self.concurrency: Dict[str, int] = {name: 1 for name in STAGES}
+        self.stages: Dict[str, _Stage] = {}
+        self.workers: List[asyncio.Task] = []
+        self.in_flight: Dict[str, IntelItem] = {}
+        self.end_to_end_lag_avg = 0.0
+        self.end_to_end_lag_max = 0.0
+        self.is_running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(
+        self,
+        queue_size: int = 1000,
+        persist_batch_size: int = 100,
+        persist_batch_wait: float = 0.05,
+        concurrency: Optional[Dict[str, int]] = None,
+        persist_retries: int = 8,
+        persist_retry_wait: float = 0.1,
+        persist_retry_max_wait: float = 5.0,
+    ):
+        self.queue_size = max(1, queue_size)
+        self.persist_batch_size = max(1, persist_batch_size)
+        self.persist_batch_wait = max(0.0, persist_batch_wait)
+        self.persist_retries = max(0, persist_retries)
+        self.persist_retry_wait = max(0.0, persist_retry_wait)
+        self.persist_retry_max_wait = max(self.persist_retry_wait, persist_retry_max_wait)
+        for name, value in (concurrency or {}).items():
+            if name in self.concurrency:
+                self.concurrency[name] = max(1, int(value))
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.is_running and self._loop is loop:
+            return
+        # A previous loop (e.g. a finished asyncio.run) leaves dead workers behind.
+        self.workers = []
+        self.in_flight = {}
+        self._loop = loop
+        self.stages = {name: _Stage(name, self.concurrency[name], self.queue_size) for name in STAGES}
+        runners = {
+            "normalize": self._normalize_worker,
+            "dedup": self._dedup_worker,
+            "refine": self._refine_worker,
+            "persist": self._persist_worker,
+            "broadcast": self._broadcast_worker,
+        }
+        for name in STAGES:
+            for _ in range(self.stages[name].concurrency):
+                self.workers.append(asyncio.create_task(runners[name](self.stages[name])))
+        self.is_running = True
+        logger.info(f"Ingest pipeline started: {self.concurrency}, queue_size={self.queue_size}, persist_batch_size={self.persist_batch_size}")
+
+    async def stop(self, drain: bool = True):
+        if not self.is_running:
+            return
+        if drain:
+            await self.drain()
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.is_running = False
+        logger.info("Ingest pipeline stopped")
+
+    async def submit(self, payload: Any, normalize: Callable[[Any], Optional[IntelItem]], source: str = "unknown", event: str = "new_intel"):
+        """`event` is the SSE event the item is broadcast as: `new_intel` or `intel_updated` for edits"""
+        await self.start()
+        await self.stages["normalize"].queue.put(IngestEnvelope(payload=payload, normalize=normalize, source=source, event=event))
+
+    async def submit_many(self, payloads: Iterable[Any], normalize: Callable[[Any], Optional[IntelItem]], source: str = "unknown", event: str = "new_intel") -> int:
+        count = 0
+        for payload in payloads:
+            await self.submit(payload, normalize, source, event)
+            count += 1
+        return count
+
+    async def drain(self):
+        """Wait until everything submitted so far has been broadcast (or dropped)"""
+        if not self.is_running:
+            return
+        for name in STAGES:
+            await self.stages[name].queue.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "persist_batch_size": self.persist_batch_size,
+            "end_to_end_ms_avg": round(self.end_to_end_lag_avg * 1000, 3),
+            "end_to_end_ms_max": round(self.end_to_end_lag_max * 1000, 3),
+            "near_duplicates": near_dup_index.stats(),
+            "story_clusters": story_clusters.stats(),
+            "refiner": refiner.stats(),
+            "auto_tagger": auto_tagger.stats(),
+            "stages": {name: stage.stats() for name, stage in self.stages.items()},
+        }
+
+    async def _forward(self, name: str, env: Any):
+        if isinstance(env, list):
+            for x in env:
+                x.stage_enqueued_at = time.monotonic()
+        else:
+            env.stage_enqueued_at = time.monotonic()
+        await self.stages[name].queue.put(env)
+
+    def _release(self, env: IngestEnvelope):
+        if env.claimed is not None and self.in_flight.get(env.claimed.id) is env.claimed:
+            self.in_flight.pop(env.claimed.id, None)
+
+    def _observe_end_to_end(self, env: IngestEnvelope):
+        lag = time.monotonic() - env.submitted_at
+        self.end_to_end_lag_max = max(self.end_to_end_lag_max, lag)
+        self.end_to_end_lag_avg = lag if not self.end_to_end_lag_avg else self.end_to_end_lag_avg * 0.9 + lag * 0.1
+
+    async def _normalize_worker(self, stage: _Stage):
+        while True:
+            env: IngestEnvelope = await stage.queue.get()
+            stage.in_flight += 1
+            try:
+                env.item = env.normalize(env.payload)
+                stage.observe(env)
+                if env.item is None:
+                    stage.dropped += 1
+                else:
+                    await self._forward("dedup", env)
+            except Exception as e:
+                stage.errors += 1
+                logger.error(f"[{env.source}] normalize failed: {e}")
+            finally:
+                stage.in_flight -= 1
+                stage.queue.task_done()
+
+    async def _dedup_worker(self, stage: _Stage):
+        while True:
+            env: IngestEnvelope = await stage.queue.get()
+            stage.in_flight += 1
+            try:
+                stage.observe(env)
+                item = env.item
+                item.simhash = fingerprint(item.title, item.summary)
+                claimed = self.in_flight.get(item.id)
+                if _same_document(claimed, item):
+                    # Identical document is already on its way to the DB; drop the repeat.
+                    stage.dropped += 1
+                else:
+                    prior = (claimed.duplicate_of, claimed.cluster_id) if claimed is not None else await asyncio.to_thread(_persisted_dedup_state, item.id)
+                    if prior is not None:
+                        self._keep_dedup_state(item, *prior)
+                    else:
+                        item.duplicate_of = near_dup_index.check_and_add(item.id, item.simhash, item.timestamp)
+                        if item.duplicate_of:
+                            item.cluster_id = story_clusters.cluster_of(item.duplicate_of)
+                        else:
+                            item.cluster_id = story_clusters.assign(item.id, item.title, item.summary, item.timestamp)
+                    self.in_flight[item.id] = env.claimed = item
+                    await self._forward("refine", env)
+            except Exception as e:
+                stage.errors += 1
+                logger.error(f"[{env.source}] dedup failed: {e}")
+            finally:
+                stage.in_flight -= 1
+                stage.queue.task_done()
+
+    @staticmethod
+    def _keep_dedup_state(item: IntelItem, duplicate_of: Optional[str], cluster_id: Optional[str]):
+        # Re-checking an edit could flag a canonical item as a copy of a later story,
+        # hiding it everywhere, or move it to another cluster; it keeps both instead.
+        item.duplicate_of = duplicate_of
+        item.cluster_id = cluster_id
+        if duplicate_of:
+            return
+        if item.simhash is not None and near_dup_index.enabled:
+            # Later items are compared against the edited text.
+            near_dup_index.add(item.id, item.simhash, item.timestamp)
+        if not cluster_id:
+            item.cluster_id = story_clusters.assign(item.id, item.title, item.summary, item.timestamp)
+
+    async def _collect_batch(self, stage: _Stage, size: Optional[int] = None) -> List[IngestEnvelope]:
+        batch = [await stage.queue.get()]
+        deadline = time.monotonic() + self.persist_batch_wait
+        while len(batch) < (size or self.persist_batch_size):
+            try:
+                batch.append(stage.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(stage.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _refine_worker(self, stage: _Stage):
+        while True:
+            # One batch fills every model call slot; items stay in order.
+            batch = await self._collect_batch(stage, refiner.batch_size * refiner.concurrency) if refiner.enabled else [await stage.queue.get()]
+            stage.in_flight += len(batch)
+            try:
+                # Past the high-water mark only cached refinements are applied, so a slow model cannot stall ingest.
+                overloaded = stage.queue.qsize() >= stage.queue.maxsize // 2
+                refined = await refiner.refine_many([env.item for env in batch], overloaded=overloaded)
+                for env, item in zip(batch, refined):
+                    env.item = item
+            except Exception as e:
+                stage.errors += len(batch)
+                logger.error(f"Refinement of {len(batch)} items failed, passing them through: {e}")
+            try:
+                if auto_tagger.enabled:
+                    tagged = await asyncio.to_thread(auto_tagger.tag_items, [env.item for env in batch])
+                    for env, item in zip(batch, tagged):
+                        env.item = item
+            except Exception as e:
+                stage.errors += len(batch)
+                logger.error(f"Dictionary tagging of {len(batch)} items failed, passing them through: {e}")
+            finally:
+                stage.in_flight -= len(batch)
+            for env in batch:
+                stage.observe(env)
+                await self._forward("persist", env)
+                stage.queue.task_done()
+
+    async def _persist_worker(self, stage: _Stage):
+        def _persist_batch(batch: List[IngestEnvelope]) -> int:
+            items = [env.item for env in batch]
+            db = SessionLocal()
+            try:
+                count = crud.upsert_intel_items(db, items)
+            finally:
+                db.close()
+            export_cache.invalidate([x.id for x in items])
+            # Before the broadcast, so a client refetching on the SSE event gets the new page.
+            # An edit may have flipped is_hot, moving the row between the hot and history lists.
+            scopes = {"hot", "history"} if any(env.event != "new_intel" for env in batch) else {scope_of(x.is_hot) for x in items}
+            list_cache.invalidate([x.id for x in items], scopes=scopes)
+            # Embedding is CPU-bound, so it runs here rather than on the event loop.
+            vector_index.upsert_items(items)
+            return count
+
+        while True:
+            batch = await self._collect_batch(stage)
+            stage.in_flight += len(batch)
+            try:
+                for attempt in range(self.persist_retries + 1):
+                    try:
+                        await asyncio.to_thread(_persist_batch, batch)
+                        break
+                    except Exception as e:
+                        if attempt == self.persist_retries:
+                            raise
+                        # A locked or briefly unavailable database; the upsert is idempotent.
+                        delay = min(self.persist_retry_max_wait, self.persist_retry_wait * 2 ** attempt)
+                        stage.retried += 1
+                        logger.warning(f"DB upsert batch of {len(batch)} failed, retrying in {delay:.2f}s: {e}")
+                        await asyncio.sleep(delay)
+                for env in batch:
+                    search_index.upsert_item(env.item)
+                    stage.observe(env)
+                await self._forward("broadcast", batch)
+            except Exception as e:
+                stage.errors += len(batch)
+                logger.error(f"DB upsert batch of {len(batch)} failed after {self.persist_retries} retries, dropping it: {e}")
+                for env in batch:
+                    self._release(env)
+            finally:
+                stage.in_flight -= len(batch)
+                for _ in batch:
+                    stage.queue.task_done()
+
+    async def _broadcast_worker(self, stage: _Stage):
+        while True:
+            batch: List[IngestEnvelope] = await stage.queue.get()
+            stage.in_flight += len(batch)
+            try:
+                # Consecutive runs per event keep new and edited items in submission order.
+                visible = [env for env in batch if not env.item.duplicate_of]
+                start = 0
+                for i in range(1, len(visible) + 1):
+                    if i == len(visible) or visible[i].event != visible[start].event:
+                        await orchestrator.broadcast_many(visible[start].event, [env.item.model_dump() for env in visible[start:i]])
+                        start = i
+                for env in batch:
+                    stage.observe(env)
+                    self._observe_end_to_end(env)
+            except Exception as e:
+                stage.errors += len(batch)
+                logger.error(f"Broadcast of {len(batch)} items failed: {e}")
+            finally:
+                for env in batch:
+                    self._release(env)
+                stage.in_flight -= len(batch)
+                stage.queue.task_done()
+
+
+ingest_pipeline = IngestPipeline()
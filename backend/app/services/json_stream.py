@@ -0,0 +1,98 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, Optional
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_TAIL = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text buffer over an async byte stream exposing `read(n)` (e.g. aiohttp `response.content`)"""
+
+    def __init__(self, stream, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    async def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = await self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        else:
+            self.text = self.text[self.pos:] + self._utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    async def peek(self) -> Optional[str]:
+        """Next non-whitespace character without consuming it (None at EOF)"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not await self.fill():
+                return None
+
+    async def expect(self, chars: str) -> str:
+        ch = await self.peek()
+        if ch is None or ch not in chars:
+            raise ValueError(f"Malformed JSON stream: expected one of {chars!r}, got {ch!r}")
+        self.pos += 1
+        return ch
+
+    async def value(self) -> Any:
+        """Decode one complete JSON value, reading more input only when it is truncated"""
+        await self.peek()
+        retry_at = 0
+        while True:
+            available = len(self.text) - self.pos
+            if self.eof or available >= retry_at:
+                try:
+                    obj, end = _decoder.raw_decode(self.text, self.pos)
+                except json.JSONDecodeError:
+                    if self.eof:
+                        raise
+                else:
+                    # A number cut at a chunk boundary ("12" of "123", "1." of "1.5") decodes
+                    # as a shorter value, so only accept it once a delimiter follows.
+                    if self.eof or (end < len(self.text) and self.text[end] not in _NUMBER_TAIL):
+                        self.pos = end
+                        return obj
+                # Retry once the buffer has doubled, so a large value decodes in amortized linear time.
+                retry_at = available * 2
+            await self.fill()
+
+
+async def iter_json_array(stream, key: str = "docs", chunk_size: int = 64 * 1024) -> AsyncIterator[Any]:
+    """
+    Yield the elements of the top-level `key` array of a JSON object one by one
+    while the body is still being downloaded. Other top-level fields are decoded
+    and discarded; only one array element is held in memory at a time.
+    """
+    buf = _Buffer(stream, chunk_size)
+    await buf.expect("{")
+    if await buf.peek() == "}":
+        return
+    while True:
+        name = await buf.value()
+        await buf.expect(":")
+        if name == key and await buf.peek() == "[":
+            await buf.expect("[")
+            if await buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield await buf.value()
+                    if await buf.expect(",]") == "]":
+                        break
+        else:
+            await buf.value()
+        if await buf.expect(",}") == "}":
+            return
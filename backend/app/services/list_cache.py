@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, List, Set, Tuple
+
+# Which stored rows a list can show, by `type` filter; favorites are their own scope.
+LIST_SCOPES = {
+    "hot": frozenset({"hot"}),
+    "history": frozenset({"history"}),
+    "all": frozenset({"hot", "history"}),
+}
+FAVORITES_SCOPE = frozenset({"favorites"})
+
+
+def scope_of(is_hot: bool) -> str:
+    return "hot" if is_hot else "history"
+
+
+def page_etag(body: bytes) -> str:
+    """Weak validator of an encoded page: equal bodies, equal tags, across restarts too"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+@dataclass
+class CachedPage:
+    key: Hashable
+    body: bytes
+    etag: str
+    members: Tuple[str, ...]
+    scopes: FrozenSet[str]
+    expires_at: float
+
+
+class ListCache:
+    """
+    Encoded list pages (`/api/intel`, `/api/intel/favorites`) by normalized query,
+    so the page every open IntelPage polls is read from the database once per
+    change rather than once per request.
+
+    Writers say what changed: `invalidate(ids=...)` drops the pages showing those
+    rows (an edit, a favorite flag), `invalidate(scopes=...)` every page of a
+    scope whose membership changed (an insert, a demotion, a deletion), since rows
+    entering or leaving a list shift its other pages and its total. `ttl_seconds`
+    bounds the drift of the time-range filters. Identical concurrent misses share
+    one load; a load that overlaps an invalidation is returned but not stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self, ttl_seconds: float = 30, max_entries: int = 256, enabled: bool = True):
+        with self._lock:
+            self.ttl_seconds = max(0.0, ttl_seconds)
+            self.max_entries = max(1, max_entries)
+            self.enabled = enabled
+            self._entries: "OrderedDict[Hashable, CachedPage]" = OrderedDict()
+            self._by_member: Dict[str, Set[Hashable]] = {}
+            self._loads: Dict[Hashable, asyncio.Future] = {}
+            # Bumped by every invalidation; loads started before a bump are not stored.
+            self._epoch = 0
+            self.counts = {"hits": 0, "misses": 0, "coalesced": 0, "stored": 0, "evicted": 0, "invalidated": 0}
+
+    async def get_or_load(
+        self, key: Hashable, scopes: FrozenSet[str], load: Callable[[], Awaitable[Tuple[bytes, List[str]]]]
+    ) -> CachedPage:
+        """
+        The cached page for `key`, or the page of the body `load` returns as
+        `(body, member ids)`. Concurrent callers for a missing key await the same `load`.
+        """
+        if not self.enabled:
+            body, members = await load()
+            return CachedPage(key, body, page_etag(body), tuple(members), scopes, 0.0)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.counts["hits"] += 1
+                return entry
+            fill = self._loads.get(key)
+            if fill is None:
+                self.counts["misses"] += 1
+                fill = asyncio.create_task(self._fill(key, scopes, load, self._epoch))
+                # Retrieve the exception even if every caller went away meanwhile.
+                fill.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._loads[key] = fill
+            else:
+                self.counts["coalesced"] += 1
+        # Shielded, so a caller that disconnects does not cancel the load for the others.
+        return await asyncio.shield(fill)
+
+    async def _fill(self, key: Hashable, scopes: FrozenSet[str], load, epoch: int) -> CachedPage:
+        try:
+            body, members = await load()
+        finally:
+            with self._lock:
+                if self._loads.get(key) is asyncio.current_task():
+                    del self._loads[key]
+        page = CachedPage(key, body, page_etag(body), tuple(members), scopes, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            if epoch == self._epoch:
+                self._store(page)
+        return page
+
+    def invalidate(self, ids: Iterable[str] = (), scopes: Iterable[str] = ()) -> int:
+        """Drop the pages showing any of `ids` and every page of `scopes`; returns how many"""
+        ids, scopes = list(ids), frozenset(scopes)
+        if not ids and not scopes:
+            return 0
+        with self._lock:
+            self._epoch += 1
+            # Loads in flight may predate the change: later callers start a new one.
+            self._loads.clear()
+            keys = {k for k, entry in self._entries.items() if entry.scopes & scopes}
+            for item_id in ids:
+                keys.update(self._by_member.get(item_id, ()))
+            for key in keys:
+                self._drop(key)
+            self.counts["invalidated"] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._loads.clear()
+            self._entries.clear()
+            self._by_member.clear()
+
+    def _store(self, entry: CachedPage):
+        """Add `entry`, evicting the least recently used pages; the lock must be held"""
+        self._drop(entry.key)
+        self._entries[entry.key] = entry
+        for item_id in entry.members:
+            self._by_member.setdefault(item_id, set()).add(entry.key)
+        self.counts["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.counts["evicted"] += 1
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for item_id in entry.members:
+            keys = self._by_member.get(item_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_member[item_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "entries": len(self._entries), "ttl_seconds": self.ttl_seconds, **self.counts}
+
+
+list_cache = ListCache()
@@ -0,0 +1,204 @@
+import hashlib
+import heapq
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.text_tokens import tokenize
+
+logger = logging.getLogger("near_dup")
+
+FINGERPRINT_BITS = 64
+_MASK = (1 << FINGERPRINT_BITS) - 1
+_LANE_BITS = 16
+
+
+@lru_cache(maxsize=65536)
+def _feature_lanes(feature: str) -> int:
+    """
+    Feature hash with every bit widened to its own 16-bit lane, so summing these
+    integers counts set bits per position for up to 65535 features in one `sum`.
+    Words and CJK bigrams repeat heavily across items, so results are cached.
+    """
+    bits = format(int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+    return int(bits.replace("1", "x").replace("0", "0000").replace("x", "0001"), 16)
+
+
+def fingerprint(title: str, summary: str, min_features: int = 8) -> Optional[int]:
+    """
+    64-bit SimHash of title + summary, as a signed integer so it fits a BIGINT column.
+    Returns None for texts too short to fingerprint reliably.
+    """
+    feats = tokenize(f"{title or ''} {summary or ''}")
+    if len(feats) < min_features:
+        return None
+    counts = sum(_feature_lanes(f) for f in feats[:65535]).to_bytes(FINGERPRINT_BITS * _LANE_BITS // 8, "big")
+    half = min(len(feats), 65535) / 2
+    value = 0
+    for i in range(0, len(counts), 2):
+        value = (value << 1) | ((counts[i] << 8 | counts[i + 1]) > half)
+    return value - (1 << FINGERPRINT_BITS) if value >> (FINGERPRINT_BITS - 1) else value
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count  # noqa: F811 - Python 3.10+
+
+
+def hamming(a: int, b: int) -> int:
+    return _popcount((a ^ b) & _MASK)
+
+
+class NearDupIndex:
+    """
+    In-memory LSH index over SimHash fingerprints of recently ingested items.
+
+    The 64 bits are split into `max_distance + 1` bands; by pigeonhole, two
+    fingerprints within `max_distance` bits agree on at least one band, so a lookup
+    only compares against items sharing a band value. Only canonical items are
+    indexed, and entries older than `window_seconds` (by item timestamp, relative
+    to the newest item seen) are evicted.
+    """
+
+    def __init__(self, max_distance: int = 3, window_seconds: float = 72 * 3600, enabled: bool = True):
+        self.configure(max_distance, window_seconds, enabled)
+
+    def configure(self, max_distance: int = 3, window_seconds: float = 72 * 3600, enabled: bool = True):
+        self.enabled = enabled
+        self.max_distance = min(max(0, int(max_distance)), 15)
+        self.window_seconds = max(0.0, float(window_seconds))
+        bands = self.max_distance + 1
+        width, extra = divmod(FINGERPRINT_BITS, bands)
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(bands):
+            bits = width + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << bits) - 1))
+            shift += bits
+        self.clear()
+
+    def clear(self):
+        # Bucket lists hold the entry tuples themselves, so a lookup never goes back to `_entries`.
+        self._entries: Dict[str, Tuple[int, float, str]] = {}
+        self._buckets: List[Dict[int, List[Tuple[int, float, str]]]] = [{} for _ in self._bands]
+        self._expiry: List[Tuple[float, str]] = []
+        self._newest = 0.0
+        self.checked = 0
+        self.flagged = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, fp: int) -> List[int]:
+        fp &= _MASK
+        return [(fp >> shift) & mask for shift, mask in self._bands]
+
+    def find(self, item_id: str, fp: int, timestamp: float) -> Optional[str]:
+        """Id of the closest indexed item within `max_distance` bits and the time window, if any"""
+        fp &= _MASK
+        timestamp = timestamp or 0.0
+        best_id: Optional[str] = None
+        best_distance = self.max_distance + 1
+        for bucket, key in zip(self._buckets, self._keys(fp)):
+            for other_fp, other_ts, other_id in bucket.get(key, ()):
+                distance = _popcount(fp ^ other_fp)
+                if (
+                    distance < best_distance
+                    and other_id != item_id
+                    and abs(timestamp - other_ts) <= self.window_seconds
+                ):
+                    best_id, best_distance = other_id, distance
+        return best_id
+
+    def add(self, item_id: str, fp: int, timestamp: float):
+        self.remove(item_id)
+        fp &= _MASK
+        timestamp = timestamp or 0.0
+        entry = (fp, timestamp, item_id)
+        self._entries[item_id] = entry
+        for bucket, key in zip(self._buckets, self._keys(fp)):
+            bucket.setdefault(key, []).append(entry)
+        heapq.heappush(self._expiry, (timestamp, item_id))
+        if timestamp > self._newest:
+            self._newest = timestamp
+        self._evict()
+
+    def remove(self, item_id: str):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        for bucket, key in zip(self._buckets, self._keys(entry[0])):
+            entries = bucket.get(key)
+            if entries:
+                entries.remove(entry)
+                if not entries:
+                    del bucket[key]
+
+    def check_and_add(self, item_id: str, fp: Optional[int], timestamp: float) -> Optional[str]:
+        """
+        Return the id of the canonical item `item_id` nearly duplicates, or None.
+        Non-duplicates are indexed so later items can match them.
+        """
+        if not self.enabled or fp is None:
+            return None
+        self.checked += 1
+        canonical = self.find(item_id, fp, timestamp)
+        if canonical:
+            self.flagged += 1
+            # An edit that now duplicates another story stops being a canonical itself.
+            self.remove(item_id)
+            return canonical
+        self.add(item_id, fp, timestamp)
+        return None
+
+    def _evict(self):
+        cutoff = self._newest - self.window_seconds
+        while self._expiry and self._expiry[0][0] < cutoff:
+            ts, item_id = heapq.heappop(self._expiry)
+            entry = self._entries.get(item_id)
+            if entry is not None and entry[1] == ts:
+                self.remove(item_id)
+                self.evicted += 1
+
+    def load_recent(self, session_factory: Callable[[], Any]) -> int:
+        """Rebuild the index from canonical items persisted within the window"""
+        from app import db_models
+
+        db = session_factory()
+        try:
+            cutoff = time.time() - self.window_seconds
+            rows = (
+                db.query(db_models.IntelItemDB.id, db_models.IntelItemDB.simhash, db_models.IntelItemDB.timestamp)
+                .filter(
+                    db_models.IntelItemDB.simhash.isnot(None),
+                    db_models.IntelItemDB.duplicate_of.is_(None),
+                    db_models.IntelItemDB.timestamp >= cutoff,
+                )
+                .order_by(db_models.IntelItemDB.timestamp.asc())
+                .all()
+            )
+        finally:
+            db.close()
+        for item_id, fp, ts in rows:
+            self.add(item_id, fp, ts or 0.0)
+        logger.info(f"Near-duplicate index loaded with {len(self._entries)} items")
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_distance": self.max_distance,
+            "window_seconds": self.window_seconds,
+            "indexed": len(self._entries),
+            "checked": self.checked,
+            "flagged": self.flagged,
+            "evicted": self.evicted,
+        }
+
+
+near_dup_index = NearDupIndex()
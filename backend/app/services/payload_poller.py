@@ -1,13 +1,17 @@
-import asyncio
 import aiohttp
 import json
 import uuid
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
 import os
-from app.services.base_poller import BasePoller
+from app.services.base_poller import BasePoller, PollError
+from app.services.poll_scheduler import parse_retry_after
 from app.models import Tag, IntelItem
-from app.agent.orchestrator import orchestrator
+from app.services.ingest_pipeline import ingest_pipeline
+from app.services.list_cache import list_cache
+from app.services.http_client import http_client
+from app.services.json_stream import iter_json_array
+from app.services.dedup_window import DedupWindow, NEW, UPDATED, UNCHANGED
 
 from app.database import SessionLocal
 from app import crud
@@ -23,33 +27,25 @@ class PayloadPoller(BasePoller):
         
         self.poll_interval: int = 10  # seconds
         
-        self.session: Optional[aiohttp.ClientSession] = None
         self.token: Optional[str] = None
-        self.last_fetched_ids: set = set()
+        self.dedup = DedupWindow()
         self.last_cleanup_time: float = 0 # Timestamp of last DB cleanup
 
-    def configure(self, cms_url: str, collection_slug: str, email: str, password: str, user_collection: str = "users", interval: int = 10):
+    def configure(self, cms_url: str, collection_slug: str, email: str, password: str, user_collection: str = "users", interval: int = 10, dedup_window: int = 5000):
         self.cms_url = cms_url.rstrip('/')
         self.collection_slug = collection_slug
         self.email = email
         self.password = password
         self.user_collection = user_collection
         self.poll_interval = max(2, interval)
+        self.dedup = DedupWindow(dedup_window)
         self.logger.info(f"PayloadPoller configured: URL={self.cms_url}, Collection={self.collection_slug}, User={self.email}")
 
     def is_configured(self) -> bool:
         return all([self.cms_url, self.collection_slug, self.email, self.password])
 
-    async def stop(self):
-        await super().stop()
-        if self.session:
-            await self.session.close()
-            self.session = None
-
     async def _login(self) -> bool:
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-
+        session = http_client.get_session()
         login_url = f"{self.cms_url}/api/{self.user_collection}/login"
         payload = {
             "email": self.email,
@@ -57,7 +53,7 @@ class PayloadPoller(BasePoller):
         }
         
         try:
-            async with self.session.post(login_url, json=payload) as response:
+            async with session.post(login_url, json=payload) as response:
                 if response.status == 200:
                     data = await response.json()
                     self.token = data.get("token")
@@ -72,7 +68,7 @@ class PayloadPoller(BasePoller):
             self.logger.error(f"Login error: {e}")
             return False
 
-    async def _poll_step(self):
+    async def _poll_step(self) -> int:
         # 0. Daily DB Cleanup
         now = datetime.now().timestamp()
         if now - self.last_cleanup_time > 86400: # 24 hours
@@ -89,6 +85,7 @@ class PayloadPoller(BasePoller):
                         deleted = crud.delete_old_intel_items(db, days=retention_days)
                         if deleted > 0:
                             self.logger.info(f"Cleaned up {deleted} old items.")
+                            list_cache.invalidate(scopes=("hot", "history"))
                         self.last_cleanup_time = now
                     except Exception as e:
                         self.logger.error(f"Cleanup failed: {e}")
@@ -102,12 +99,9 @@ class PayloadPoller(BasePoller):
         # Initial login if needed
         if not self.token:
             if not await self._login():
-                self.logger.error("Login failed. Retrying next cycle.")
-                return
-
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+                raise PollError("Payload CMS login failed")
 
+        session = http_client.get_session()
         fetch_url = f"{self.cms_url}/api/{self.collection_slug}"
         # Add query params if needed, e.g., sort by date
         # fetch_url += "?sort=-createdAt&limit=10"
@@ -118,123 +112,118 @@ class PayloadPoller(BasePoller):
         if self.token:
             headers["Authorization"] = f"JWT {self.token}"
 
-        async with self.session.get(fetch_url, headers=headers) as response:
+        async with session.get(fetch_url, headers=headers) as response:
             if response.status == 200:
-                data = await response.json()
-                await self._process_data(data)
+                return await self._process_stream(response)
             elif response.status == 401 or response.status == 403:
                 self.logger.warning("Unauthorized, attempting to re-login...")
                 self.token = None # Clear token to force re-login
-                if await self._login():
-                    # Retry once immediately
-                    headers["Authorization"] = f"JWT {self.token}"
-                    async with self.session.get(fetch_url, headers=headers) as retry_response:
-                        if retry_response.status == 200:
-                            data = await retry_response.json()
-                            await self._process_data(data)
+                if not await self._login():
+                    raise PollError("Payload CMS re-login failed", response.status)
+                # Retry once immediately
+                headers["Authorization"] = f"JWT {self.token}"
+                async with session.get(fetch_url, headers=headers) as retry_response:
+                    if retry_response.status == 200:
+                        return await self._process_stream(retry_response)
+                    raise PollError(f"Error fetching data after re-login: {retry_response.status}", retry_response.status)
             else:
-                self.logger.warning(f"Error fetching data: {response.status}")
+                raise PollError(
+                    f"Error fetching data: {response.status}",
+                    response.status,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+
+    async def ingest_docs(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        Push path for CMS `afterChange` webhooks.
+        Docs go through the same mapping/dedup/upsert/broadcast path as polled ones,
+        so an edit is broadcast as `intel_updated` and an unchanged redelivery is skipped.
+        """
+        return await self._process_data({"docs": docs})
+
+    async def _process_stream(self, response: aiohttp.ClientResponse) -> int:
+        """
+        Decode the `docs` array of a collection response incrementally, so each doc
+        is handed to the pipeline as soon as it is parsed and peak memory per poll
+        does not grow with the page size.
+        """
+        return await self._process_docs(iter_json_array(response.content, "docs"))
 
-    async def _process_data(self, data: Dict[str, Any]):
+    async def _process_data(self, data: Dict[str, Any]) -> int:
         """
         Process the fetched collection data.
         Payload CMS returns { "docs": [...] }
+        Returns the number of new or edited items.
         """
-        docs = data.get("docs", [])
-        if not docs:
-            self.logger.info("No docs found in response")
-            return
-
-        # 1. Filter new items
-        new_docs = []
-        for doc in docs:
-            doc_id = doc.get("id")
-            if doc_id in self.last_fetched_ids:
+        async def _docs():
+            for doc in data.get("docs") or []:
+                yield doc
+
+        return await self._process_docs(_docs())
+
+    async def _process_docs(self, docs: AsyncIterator[Dict[str, Any]]) -> int:
+        total = 0
+        new_count = 0
+        updated_count = 0
+        async for doc in docs:
+            total += 1
+            if not isinstance(doc, dict):
                 continue
-            self.last_fetched_ids.add(doc_id)
-            new_docs.append(doc)
-
-        # Limit tracked IDs
-        if len(self.last_fetched_ids) > 1000:
-            self.last_fetched_ids = set(list(self.last_fetched_ids)[-500:])
-
-        if not new_docs:
-            return
-
-        self.logger.info(f"Processing {len(new_docs)} new items...")
-
-        # 2. Refine items using LLM (Concurrent with limit)
-        # SKIP LLM Refinement - Direct Pass Through
-        refined_item_dicts = []
-        
-        for doc in new_docs:
-            # DEBUG: Log keys to check availability of thingId and url
-            if len(refined_item_dicts) == 0:
-                self.logger.debug(f"Doc keys: {list(doc.keys())}")
-                self.logger.debug(f"Doc thingId: {doc.get('thingId')}")
-                self.logger.debug(f"Doc url: {doc.get('url')}")
-
-            # Pre-map to dict structure expected by Orchestrator
-            # We keep 'original' for context if available
-            raw_item_dict = {
-                "id": str(doc.get("id", uuid.uuid4())),
-                "title": doc.get("title") or "Untitled",
-                "summary": doc.get("summary") or doc.get("description") or "",
-                "original": doc.get("original") or doc.get("content") or "",
-                "content": doc.get("original") or doc.get("content") or "", # Map original content to content field
-                "tags": [], # Will be filled by Refiner
-                "thingId": doc.get("thingId"),
-                # Pass through other fields needed for mapping later
-                "publishDate": doc.get("publishDate") or doc.get("createdAt"),
-                "source": doc.get("author") or "PayloadCMS",
-                "url": doc.get("url") or f"{self.cms_url}/admin/collections/{self.collection_slug}/{doc.get('id')}",
-                # Pass through custom CMS fields so they are available in _dict_to_intel_item
-                "regional_country": doc.get("regional_country"),
-                "domain": doc.get("domain"),
-                "topicType": doc.get("topicType")
-            }
-            # Directly use raw item without LLM refinement
-            refined_item_dicts.append(raw_item_dict)
-        
-        # Execute refinement concurrently with limit
-        # refined_item_dicts = await asyncio.gather(*tasks)
-
-        items: List[IntelItem] = []
-        for item_dict in refined_item_dicts:
-            self.logger.debug(f"Preparing to broadcast item: {item_dict.get('id')}")
-            item = self._dict_to_intel_item(item_dict)
-            if not item:
-                self.logger.error(f"Failed to map item {item_dict.get('id')} to IntelItem model")
+            item_dict = self._doc_to_item_dict(doc)
+            if doc.get("id") is None:
+                verdict = NEW
+            else:
+                verdict = self.dedup.classify(str(doc["id"]), doc.get("updatedAt"), item_dict)
+            if verdict == UNCHANGED:
                 continue
-            items.append(item)
-
-        if not items:
-            return
-
-        def _persist_batch(batch: List[IntelItem]) -> int:
-            db = SessionLocal()
-            try:
-                return crud.upsert_intel_items(db, batch)
-            finally:
-                db.close()
+            event = "intel_updated" if verdict == UPDATED else "new_intel"
+            await ingest_pipeline.submit(item_dict, self._normalize_item_dict, source=self.name, event=event)
+            if verdict == UPDATED:
+                updated_count += 1
+            else:
+                new_count += 1
 
-        try:
-            await asyncio.to_thread(_persist_batch, items)
-        except Exception as e:
-            self.logger.error(f"DB upsert batch failed: {e}")
-            return
+        if not total:
+            self.logger.info("No docs found in response")
+        elif new_count or updated_count:
+            self.logger.info(f"Queued {new_count} new and {updated_count} edited items")
+        return new_count + updated_count
+
+    def _doc_to_item_dict(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        # Pre-map to dict structure expected by _dict_to_intel_item
+        # We keep 'original' for context if available
+        return {
+            "id": str(doc.get("id", uuid.uuid4())),
+            "title": doc.get("title") or "Untitled",
+            "summary": doc.get("summary") or doc.get("description") or "",
+            "original": doc.get("original") or doc.get("content") or "",
+            "content": doc.get("original") or doc.get("content") or "", # Map original content to content field
+            "tags": [], # Model tags are added by the refine stage
+            "thingId": doc.get("thingId"),
+            # Pass through other fields needed for mapping later
+            "publishDate": doc.get("publishDate") or doc.get("createdAt"),
+            "source": doc.get("author") or "PayloadCMS",
+            "url": doc.get("url") or f"{self.cms_url}/admin/collections/{self.collection_slug}/{doc.get('id')}",
+            # Pass through custom CMS fields so they are available in _dict_to_intel_item
+            "regional_country": doc.get("regional_country"),
+            "domain": doc.get("domain"),
+            "topicType": doc.get("topicType")
+        }
 
-        broadcast_count = 0
-        for item in items:
-            await orchestrator.broadcast("new_intel", item.model_dump())
-            broadcast_count += 1
+    def _normalize_doc(self, doc: Dict[str, Any]) -> Optional[IntelItem]:
+        return self._normalize_item_dict(self._doc_to_item_dict(doc))
 
-        if broadcast_count > 0:
-            self.logger.info(f"Broadcasted {broadcast_count} new items")
+    def _normalize_item_dict(self, item_dict: Dict[str, Any]) -> Optional[IntelItem]:
+        # Translation/tagging happens later, batched and cached, in the pipeline's refine stage.
+        item = self._dict_to_intel_item(item_dict)
+        if not item:
+            self.logger.error(f"Failed to map item {item_dict.get('id')} to IntelItem model")
+        return item
 
-    async def _refine_with_semaphore(self, raw_item_dict: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
-        async with semaphore:
-            return await orchestrator.refine_intel_item(raw_item_dict)
+    def get_status(self) -> Dict[str, Any]:
+        status = super().get_status()
+        status["dedup"] = self.dedup.stats()
+        return status
 
     def _dict_to_intel_item(self, data: Dict[str, Any]) -> Optional[IntelItem]:
         try:
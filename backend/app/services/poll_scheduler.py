@@ -0,0 +1,130 @@
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptivePollScheduler:
+    """
+    Decides how long a poller sleeps between steps.
+
+    - Steps that return new data shrink the interval (burst mode) down to `min_interval`.
+    - Empty steps grow it exponentially up to `idle_max_interval`, failures up to
+      `max_interval`; every delay gets random jitter.
+    - A `Retry-After` hint is honored as a lower bound for the next delay.
+    - After `failure_threshold` consecutive failures the circuit breaker opens and no
+      requests are made for `cooldown` seconds; then a single half-open probe decides
+      whether to close it again or re-open.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = 5,
+        burst_factor: float = 0.5,
+        backoff_factor: float = 2.0,
+        jitter: float = 0.2,
+        failure_threshold: int = 5,
+        cooldown: float = 60,
+    ):
+        self.burst_factor = burst_factor
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.reset(base_interval)
+
+    def reset(self, base_interval: float):
+        self.base_interval = float(max(0.1, base_interval))
+        self.min_interval = min(self.base_interval, max(1.0, self.base_interval / 4))
+        self.idle_max_interval = self.base_interval * 4
+        self.max_interval = self.base_interval * 12
+        self.interval = self.base_interval
+        self.consecutive_failures = 0
+        self.consecutive_empty = 0
+        self.breaker_state = BREAKER_CLOSED
+        self.open_until = 0.0
+        self.retry_after_until = 0.0
+        self.last_new_count: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def allow_request(self) -> bool:
+        if self.breaker_state != BREAKER_OPEN:
+            return True
+        if time.monotonic() < self.open_until:
+            return False
+        self.breaker_state = BREAKER_HALF_OPEN
+        return True
+
+    def record_success(self, new_count: Optional[int]):
+        self.consecutive_failures = 0
+        self.breaker_state = BREAKER_CLOSED
+        self.last_error = None
+        self.last_new_count = new_count
+        if new_count is None:
+            self.interval = self.base_interval
+        elif new_count > 0:
+            self.consecutive_empty = 0
+            self.interval = max(self.min_interval, min(self.interval, self.base_interval) * self.burst_factor)
+        else:
+            self.consecutive_empty += 1
+            self.interval = min(self.idle_max_interval, max(self.interval, self.base_interval / self.backoff_factor) * self.backoff_factor)
+
+    def record_failure(self, error: Optional[str] = None, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.interval = min(self.max_interval, max(self.interval, self.base_interval) * self.backoff_factor)
+        if retry_after:
+            self.retry_after_until = max(self.retry_after_until, now + retry_after)
+        if self.breaker_state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.breaker_state = BREAKER_OPEN
+            self.open_until = max(now + self.cooldown, self.retry_after_until)
+
+    def next_delay(self) -> float:
+        now = time.monotonic()
+        if self.breaker_state == BREAKER_OPEN:
+            return max(0.0, self.open_until - now)
+        delay = self.interval
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, self.retry_after_until - now, 0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "interval": round(self.interval, 3),
+            "base_interval": self.base_interval,
+            "min_interval": self.min_interval,
+            "idle_max_interval": self.idle_max_interval,
+            "max_interval": self.max_interval,
+            "breaker_state": self.breaker_state,
+            "breaker_open_for": round(max(0.0, self.open_until - now), 3) if self.breaker_state == BREAKER_OPEN else 0.0,
+            "retry_after_for": round(max(0.0, self.retry_after_until - now), 3),
+            "consecutive_failures": self.consecutive_failures,
+            "consecutive_empty": self.consecutive_empty,
+            "last_new_count": self.last_new_count,
+            "last_error": self.last_error,
+        }
@@ -1,56 +1,116 @@
 import asyncio
 import aiohttp
-from typing import Optional, Dict, Any
-from app.services.base_poller import BasePoller
+from typing import Optional, Dict, Any, List, Tuple
+from app.services.base_poller import BasePoller, PollError
+from app.services.poll_scheduler import parse_retry_after
 from app.models import IntelItem
-from app.agent.orchestrator import orchestrator
-from app.database import SessionLocal
-from app import crud
+from app.services.ingest_pipeline import ingest_pipeline
+from app.services.http_client import http_client
 
 class ArticlePoller(BasePoller):
+    """
+    Polls `/api/articles/{id}` by sequential id.
+
+    While behind the head the poller runs in catch-up mode: it fetches a sliding
+    window `current_id .. current_id + lookahead - 1` concurrently over the shared
+    HTTP client pool and immediately continues with the next window. Ids that 404 in front
+    of a found id are treated as gaps and skipped. Once a window comes back empty
+    it falls back to tail polling of a small window every `poll_interval` seconds.
+    """
+
     def __init__(self):
         super().__init__("poller")
         self.base_url: Optional[str] = None
         self.current_id: int = 6617
-        
-    def configure(self, base_url: str, start_id: int = 6617, interval: int = 5):
+        self.lookahead: int = 20
+        self.concurrency: int = 8
+        self.tail_window: int = 3
+        self.catchup_interval: float = 0.2
+        self.catching_up: bool = True
+
+    def configure(self, base_url: str, start_id: int = 6617, interval: int = 5, lookahead: int = 20, concurrency: int = 8):
         self.base_url = base_url.rstrip('/')
         self.current_id = start_id
         self.poll_interval = interval
-        self.logger.info(f"Poller configured: URL={self.base_url}, StartID={self.current_id}, Interval={self.poll_interval}s")
+        self.lookahead = max(1, lookahead)
+        self.concurrency = max(1, concurrency)
+        self.tail_window = min(self.tail_window, self.lookahead)
+        self.catching_up = True
+        self.logger.info(
+            f"Poller configured: URL={self.base_url}, StartID={self.current_id}, Interval={self.poll_interval}s, "
+            f"Lookahead={self.lookahead}, Concurrency={self.concurrency}"
+        )
 
     def is_configured(self) -> bool:
         return bool(self.base_url)
 
-    async def _poll_step(self):
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/api/articles/{self.current_id}?depth=2&draft=false&locale=undefined"
-            self.logger.info(f"Polling: {url}")
-            
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    await self._process_data(data)
-                    self.current_id += 1
-                elif response.status == 404:
-                    self.logger.debug(f"ID {self.current_id} not found, waiting...")
-                else:
-                    self.logger.warning(f"Error fetching {url}: {response.status}")
-
-    async def _process_data(self, data: Dict[str, Any]):
-        try:
-            item = IntelItem.from_cms_data(data, self.current_id)
-            def _persist_one(it: IntelItem):
-                db = SessionLocal()
-                try:
-                    crud.upsert_intel_items(db, [it])
-                finally:
-                    db.close()
-
-            await asyncio.to_thread(_persist_one, item)
-            await orchestrator.broadcast("new_intel", item.model_dump())
-            self.logger.info(f"Broadcasted article {self.current_id}")
-        except Exception as e:
-            self.logger.error(f"Error processing data: {e}")
+    def _next_delay(self) -> float:
+        # Only skip the scheduler while catch-up is healthy; failures back off normally.
+        if self.catching_up and self.scheduler.consecutive_failures == 0:
+            return self.catchup_interval
+        return super()._next_delay()
+
+    async def _fetch_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, article_id: int) -> Tuple[int, int, Optional[Dict[str, Any]], Optional[float]]:
+        url = f"{self.base_url}/api/articles/{article_id}?depth=2&draft=false&locale=undefined"
+        async with semaphore:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return article_id, 200, await response.json(), None
+                    return article_id, response.status, None, parse_retry_after(response.headers.get("Retry-After"))
+            except Exception as e:
+                self.logger.warning(f"Error fetching {url}: {e}")
+                return article_id, 0, None, None
+
+    async def _poll_step(self) -> int:
+        session = http_client.get_session()
+        window = self.lookahead if self.catching_up else self.tail_window
+        start_id = self.current_id
+        self.logger.info(f"Polling articles {start_id}..{start_id + window - 1} (catching_up={self.catching_up})")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *[self._fetch_one(session, semaphore, start_id + i) for i in range(window)]
+        )
+
+        # Walk the window in id order. 404s are gaps only if a later id exists;
+        # any other failure is a barrier we must not skip past.
+        found: List[Tuple[int, Dict[str, Any]]] = []
+        barrier: Optional[PollError] = None
+        for article_id, status, data, retry_after in results:
+            if status == 200 and data is not None:
+                found.append((article_id, data))
+            elif status != 404:
+                barrier = PollError(f"Error fetching article {article_id}: {status}", status, retry_after)
+                break
+
+        if not found:
+            if barrier:
+                raise barrier
+            if self.catching_up:
+                self.logger.info(f"Reached head at ID {self.current_id}, switching to tail polling")
+            self.catching_up = False
+            return 0
+
+        last_id = found[-1][0]
+        skipped = (last_id - start_id + 1) - len(found)
+        if skipped:
+            self.logger.info(f"Skipped {skipped} missing ids between {start_id} and {last_id}")
+
+        await self._process_batch(found)
+        self.current_id = last_id + 1
+        self.catching_up = True
+        if barrier:
+            self.logger.warning(str(barrier))
+        return len(found)
+
+    async def _process_batch(self, found: List[Tuple[int, Dict[str, Any]]]):
+        # The pipeline preserves submission order, so articles are committed by id.
+        await ingest_pipeline.submit_many(found, self._normalize_article, source=self.name)
+        self.logger.info(f"Queued articles {found[0][0]}..{found[-1][0]} ({len(found)} items)")
+
+    def _normalize_article(self, found: Tuple[int, Dict[str, Any]]) -> Optional[IntelItem]:
+        article_id, data = found
+        return IntelItem.from_cms_data(data, article_id)
 
 article_poller = ArticlePoller()
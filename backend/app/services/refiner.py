@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+from app.models import TAG_COLORS, IntelItem, Tag
+from app.services.dedup_window import content_hash
+
+logger = logging.getLogger("refiner")
+
+
+class RefineModel(Protocol):
+    async def refine_batch(self, docs: List[Dict[str, str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Refine `{title, summary, content}` docs in one call. Returns one dict per doc
+        with any of `title`, `summary`, `content` and `tags` (labels or
+        `{label, color}`), or None where the model gave nothing usable.
+        """
+        ...
+
+
+REFINE_PROMPT = (
+    "你是情报编辑。下面是一个 JSON 数组，每个元素是一条情报（title/summary/content）。"
+    "请把每条情报翻译为简体中文，并给出不超过 3 个主题标签。"
+    "只返回一个同样长度、同样顺序的 JSON 数组，每个元素包含 title、summary、content、tags（字符串数组）。"
+)
+
+
+class ChatCompletionsModel:
+    """Refinement through an OpenAI-compatible `/chat/completions` endpoint"""
+
+    def __init__(self, url: str, api_key: Optional[str] = None, model: str = "gpt-4o-mini", max_content_chars: int = 4000):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.max_content_chars = max_content_chars
+
+    async def refine_batch(self, docs: List[Dict[str, str]]) -> List[Optional[Dict[str, Any]]]:
+        from app.services.http_client import http_client
+
+        docs = [{**d, "content": (d.get("content") or "")[: self.max_content_chars]} for d in docs]
+        body = {
+            "model": self.model,
+            "temperature": 0,
+            "messages": [
+                {"role": "system", "content": REFINE_PROMPT},
+                {"role": "user", "content": json.dumps(docs, ensure_ascii=False)},
+            ],
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        async with http_client.get_session().post(self.url, json=body, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+        text = data["choices"][0]["message"]["content"].strip()
+        if text.startswith("```"):
+            text = text.strip("`").removeprefix("json").strip()
+        refined = json.loads(text)
+        if not isinstance(refined, list) or len(refined) != len(docs):
+            raise ValueError(f"expected a list of {len(docs)} refinements")
+        return [x if isinstance(x, dict) else None for x in refined]
+
+
+class Refiner:
+    """
+    Translation/tagging of ingested items by a model, in batches and cached.
+
+    Items missing from the cache are sent `batch_size` per model call, with at
+    most `concurrency` calls in flight (the rest wait on the semaphore). Results
+    are cached by a hash of the raw title, summary and content, so a re-polled,
+    re-submitted or duplicate document never reaches the model twice, and items
+    that share a hash within one batch are sent once. When more than
+    `max_waiting` items are already waiting for a call slot, a call fails or it
+    exceeds `timeout`, the items pass through unrefined instead of stalling ingest.
+    """
+
+    def __init__(self):
+        self.configure()
+
+    def configure(
+        self,
+        model: Optional[RefineModel] = None,
+        batch_size: int = 8,
+        concurrency: int = 2,
+        max_waiting: int = 64,
+        timeout: float = 30.0,
+        cache_size: int = 10000,
+    ):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_waiting = max(0, max_waiting)
+        self.timeout = timeout
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiting = 0
+        self.counts = {"hits": 0, "misses": 0, "calls": 0, "sent": 0, "bypassed": 0, "failed": 0}
+        self.call_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.model is not None
+
+    @staticmethod
+    def key(item: IntelItem) -> str:
+        return content_hash({"title": item.title, "summary": item.summary, "content": item.content or ""})
+
+    def _remember(self, key: str, refined: Dict[str, Any]):
+        if not self.cache_size:
+            return
+        self._cache[key] = refined
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def apply(item: IntelItem, refined: Dict[str, Any], key: Optional[str] = None) -> IntelItem:
+        update: Dict[str, Any] = {k: str(refined[k]) for k in ("title", "summary", "content") if refined.get(k)}
+        model_tags: List[Tag] = []
+        for t in refined.get("tags") or []:
+            label, color = (t.get("label"), t.get("color")) if isinstance(t, dict) else (t, None)
+            if label and all(x.label != str(label) for x in model_tags):
+                model_tags.append(Tag(label=str(label), color=color if color in TAG_COLORS else "purple"))
+        labels = {t.label for t in item.tags}
+        update["tags"] = list(item.tags) + [t for t in model_tags if t.label not in labels]
+        refined_item = item.model_copy(update=update)
+        refined_item.refine_hash = key
+        # Persisted apart from the merged tags, so a warmed cache replays only the model's output.
+        refined_item.refine_tags = model_tags
+        return refined_item
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def refine_many(self, items: List[IntelItem], overloaded: bool = False) -> List[IntelItem]:
+        """
+        Refined copies of `items`, in order. Near-duplicates and, when `overloaded`,
+        cache misses pass through unrefined.
+        """
+        if not self.enabled:
+            return items
+        out = list(items)
+        pending: "OrderedDict[str, List[int]]" = OrderedDict()
+        for i, item in enumerate(items):
+            if item.duplicate_of:
+                continue
+            key = self.key(item)
+            refined = self._cache.get(key)
+            if refined is not None:
+                self._cache.move_to_end(key)
+                self.counts["hits"] += 1
+                out[i] = self.apply(item, refined, key)
+            elif key in pending:
+                self.counts["hits"] += 1
+                pending[key].append(i)
+            else:
+                pending[key] = [i]
+        if not pending:
+            return out
+        if overloaded or self.waiting >= self.max_waiting:
+            self.counts["bypassed"] += sum(len(x) for x in pending.values())
+            return out
+
+        self.counts["misses"] += len(pending)
+        keys = list(pending)
+        chunks = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        results = await asyncio.gather(*(self._call([items[pending[k][0]] for k in chunk]) for chunk in chunks))
+        for chunk, refined_chunk in zip(chunks, results):
+            for key, refined in zip(chunk, refined_chunk):
+                if refined is None:
+                    continue
+                self._remember(key, refined)
+                for i in pending[key]:
+                    out[i] = self.apply(items[i], refined, key)
+        return out
+
+    async def _call(self, items: List[IntelItem]) -> List[Optional[Dict[str, Any]]]:
+        semaphore = self._get_semaphore()
+        self.waiting += len(items)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= len(items)
+        started = time.perf_counter()
+        try:
+            docs = [{"title": x.title, "summary": x.summary, "content": x.content or ""} for x in items]
+            refined = list(await asyncio.wait_for(self.model.refine_batch(docs), self.timeout))
+            self.counts["calls"] += 1
+            self.counts["sent"] += len(items)
+            return refined + [None] * (len(items) - len(refined))
+        except Exception as e:
+            self.counts["failed"] += len(items)
+            logger.error(f"Refinement of {len(items)} items failed, passing them through: {e!r}")
+            return [None] * len(items)
+        finally:
+            self.call_seconds += time.perf_counter() - started
+            semaphore.release()
+
+    def load_recent(self, session_factory: Callable[[], Any]) -> int:
+        """Warm the cache from persisted refinements so a restart does not re-send them"""
+        from app import db_models
+
+        if not self.enabled or not self.cache_size:
+            return 0
+        db = session_factory()
+        try:
+            rows = (
+                db.query(
+                    db_models.IntelItemDB.refine_hash,
+                    db_models.IntelItemDB.title,
+                    db_models.IntelItemDB.summary,
+                    db_models.IntelItemDB.content,
+                    db_models.IntelItemDB.refine_tags,
+                )
+                # Rows refined before refine_tags existed only hold tags merged with source and gazetteer ones.
+                .filter(db_models.IntelItemDB.refine_hash.isnot(None), db_models.IntelItemDB.refine_tags.isnot(None))
+                .order_by(db_models.IntelItemDB.timestamp.desc())
+                .limit(self.cache_size)
+                .all()
+            )
+        finally:
+            db.close()
+        for key, title, summary, content, tags in reversed(rows):
+            self._remember(key, {"title": title, "summary": summary, "content": content, "tags": tags})
+        logger.info(f"Refinement cache warmed with {len(rows)} entries")
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return {
+            "enabled": self.enabled,
+            **self.counts,
+            "waiting": self.waiting,
+            "cache_entries": len(self._cache),
+            "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0.0,
+            "avg_batch": round(self.counts["sent"] / self.counts["calls"], 2) if self.counts["calls"] else 0.0,
+            "avg_call_ms": round(self.call_seconds / self.counts["calls"] * 1000, 3) if self.counts["calls"] else 0.0,
+        }
+
+
+refiner = Refiner()
@@ -0,0 +1,203 @@
+import heapq
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.text_tokens import tokenize
+
+logger = logging.getLogger("search_index")
+
+RANGE_HOURS = {"3h": 3, "6h": 6, "12h": 12}
+
+
+class _Doc:
+    __slots__ = ("terms", "length", "is_hot", "timestamp")
+
+    def __init__(self, terms: Tuple[str, ...], length: int, is_hot: bool, timestamp: float):
+        self.terms = terms
+        self.length = length
+        self.is_hot = is_hot
+        self.timestamp = timestamp
+
+
+@dataclass
+class SearchResult:
+    hits: List[Tuple[str, float]] = field(default_factory=list)
+    took_ms: float = 0.0
+    truncated: bool = False
+    matched: int = 0
+
+
+class SearchIndex:
+    """
+    In-process BM25 index over intel title, summary and content.
+
+    Fields are weighted by repeating their term frequencies (title x3, summary x2,
+    content x1). Postings are updated incrementally as items are persisted, so the
+    index never needs a rebuild while the server runs. A query scores its rarest
+    terms first; once the remaining terms together could not lift a new doc past
+    the current k-th score (MaxScore), they only re-rank docs already matched. It
+    stops at `budget_ms`, returning the best hits found so far (`truncated=True`)
+    instead of overrunning the latency budget.
+    """
+
+    FIELD_WEIGHTS = (("title", 3), ("summary", 2), ("content", 1))
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, budget_ms: float = 50.0, max_content_chars: int = 20000):
+        self.k1 = k1
+        self.b = b
+        self.budget_ms = budget_ms
+        self.max_content_chars = max_content_chars
+        self.clear()
+
+    def configure(self, budget_ms: float = 50.0, max_content_chars: int = 20000):
+        self.budget_ms = max(1.0, budget_ms)
+        self.max_content_chars = max(0, max_content_chars)
+
+    def clear(self):
+        self._docs: Dict[str, _Doc] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._docs
+
+    def upsert(self, item_id: str, title: str, summary: str, content: Optional[str], is_hot: bool, timestamp: float):
+        self.remove(item_id)
+        tf: Counter = Counter()
+        texts = {"title": title, "summary": summary, "content": (content or "")[: self.max_content_chars]}
+        for name, weight in self.FIELD_WEIGHTS:
+            for term in tokenize(texts[name]):
+                tf[term] += weight
+        if not tf:
+            return
+        length = sum(tf.values())
+        self._docs[item_id] = _Doc(tuple(tf), length, bool(is_hot), float(timestamp or 0.0))
+        self._total_length += length
+        for term, count in tf.items():
+            self._postings.setdefault(term, {})[item_id] = count
+
+    def upsert_item(self, item: Any):
+        """Index an `IntelItem` (near-duplicates are left out, like in list views)"""
+        if getattr(item, "duplicate_of", None):
+            self.remove(item.id)
+            return
+        self.upsert(item.id, item.title, item.summary, item.content, item.is_hot, item.timestamp)
+
+    def remove(self, item_id: str):
+        doc = self._docs.pop(item_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc.length
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(item_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        type_filter: Optional[str] = "all",
+        range_filter: Optional[str] = "all",
+        budget_ms: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> SearchResult:
+        started = time.perf_counter()
+        deadline = started + (budget_ms or self.budget_ms) / 1000.0
+        result = SearchResult()
+        n = len(self._docs)
+        if not n or top_k <= 0:
+            return result
+
+        want_hot = {"hot": True, "history": False}.get(type_filter or "all")
+        hours = RANGE_HOURS.get(range_filter or "all")
+        cutoff = (now or time.time()) - hours * 3600 if hours else None
+
+        query_tf = Counter(t for t in tokenize(query) if t in self._postings)
+        terms = sorted(query_tf, key=lambda t: len(self._postings[t]))
+        avg_length = self._total_length / n
+        k1, b = self.k1, self.b
+        docs = self._docs
+        idfs = [math.log(1 + (n - len(self._postings[t]) + 0.5) / (len(self._postings[t]) + 0.5)) * query_tf[t] for t in terms]
+        # The most a doc not matched yet can still score: tf / (tf + norm) < 1 for every term left.
+        remaining = sum(idfs) * (k1 + 1)
+        allowed: Dict[str, bool] = {}
+        scores: Dict[str, float] = {}
+
+        for term, idf in zip(terms, idfs):
+            if time.perf_counter() > deadline:
+                result.truncated = True
+                break
+            postings = self._postings[term]
+            if len(scores) >= top_k and remaining <= heapq.nlargest(top_k, scores.values())[-1]:
+                # No doc outside the current matches can reach the top k any more.
+                entries = [(doc_id, postings[doc_id]) for doc_id in scores if doc_id in postings]
+            else:
+                entries = postings.items()
+            remaining -= idf * (k1 + 1)
+            for i, (doc_id, tf) in enumerate(entries):
+                ok = allowed.get(doc_id)
+                if ok is None:
+                    doc = docs[doc_id]
+                    ok = allowed[doc_id] = (want_hot is None or doc.is_hot == want_hot) and (cutoff is None or doc.timestamp >= cutoff)
+                if not ok:
+                    continue
+                length_norm = k1 * (1 - b + b * docs[doc_id].length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + length_norm)
+                if i & 1023 == 1023 and time.perf_counter() > deadline:
+                    result.truncated = True
+                    break
+            if result.truncated:
+                break
+
+        result.matched = len(scores)
+        result.hits = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+        result.took_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def load_all(self, session_factory: Callable[[], Any], batch_size: int = 2000) -> int:
+        """Build the index from every persisted canonical item"""
+        from app import db_models
+
+        db = session_factory()
+        loaded = 0
+        try:
+            query = (
+                db.query(
+                    db_models.IntelItemDB.id,
+                    db_models.IntelItemDB.title,
+                    db_models.IntelItemDB.summary,
+                    db_models.IntelItemDB.content,
+                    db_models.IntelItemDB.is_hot,
+                    db_models.IntelItemDB.timestamp,
+                )
+                .filter(db_models.IntelItemDB.duplicate_of.is_(None))
+                .yield_per(batch_size)
+            )
+            for item_id, title, summary, content, is_hot, ts in query:
+                self.upsert(item_id, title or "", summary or "", content, bool(is_hot), ts or 0.0)
+                loaded += 1
+        finally:
+            db.close()
+        logger.info(f"Search index loaded with {loaded} items ({len(self._postings)} terms)")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "avg_length": round(self._total_length / len(self._docs), 2) if self._docs else 0.0,
+            "budget_ms": self.budget_ms,
+        }
+
+
+search_index = SearchIndex()
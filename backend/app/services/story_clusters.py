@@ -0,0 +1,246 @@
+import heapq
+import logging
+import math
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.text_tokens import tokenize
+
+logger = logging.getLogger("story_clusters")
+
+
+class StoryCluster:
+    __slots__ = ("id", "label", "centroid", "norm", "size", "first_ts", "last_ts", "posted", "item_ids")
+
+    def __init__(self, cluster_id: str, label: str, timestamp: float):
+        self.id = cluster_id
+        self.label = label
+        self.centroid: Dict[str, float] = {}
+        self.norm = 0.0
+        self.size = 0
+        self.first_ts = timestamp
+        self.last_ts = timestamp
+        self.posted: Set[str] = set()
+        self.item_ids: List[str] = []
+
+    def top_terms(self, n: int) -> List[str]:
+        return [t for t, _ in heapq.nlargest(n, self.centroid.items(), key=lambda kv: kv[1])]
+
+
+class StoryClusterEngine:
+    """
+    Incremental single-pass clustering of intel items into stories.
+
+    Items become TF-IDF vectors over `tokenize(title + summary)` (title counted
+    twice), with document frequencies kept over the time window. A cluster is the
+    pruned sum of its members' vectors. Candidate clusters come from an inverted
+    index over each cluster's top terms, so an assignment scores a handful of
+    clusters with sparse cosine similarity instead of the whole window. If no
+    candidate reaches `threshold`, the item starts a new cluster named after it.
+    """
+
+    def __init__(self, threshold: float = 0.35, window_seconds: float = 72 * 3600, enabled: bool = True):
+        self.configure(threshold, window_seconds, enabled)
+
+    def configure(
+        self,
+        threshold: float = 0.35,
+        window_seconds: float = 72 * 3600,
+        enabled: bool = True,
+        centroid_terms: int = 64,
+        posting_terms: int = 12,
+        query_terms: int = 12,
+        max_df_ratio: float = 0.05,
+    ):
+        self.threshold = threshold
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.enabled = enabled
+        self.centroid_terms = centroid_terms
+        self.posting_terms = posting_terms
+        self.query_terms = query_terms
+        self.max_df_ratio = max_df_ratio
+        self.clear()
+
+    def clear(self):
+        self.clusters: Dict[str, StoryCluster] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._df: Counter = Counter()
+        # item id -> (cluster id, timestamp, distinct terms)
+        self._items: Dict[str, Tuple[str, float, Tuple[str, ...]]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._newest = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def cluster_of(self, item_id: str) -> Optional[str]:
+        entry = self._items.get(item_id)
+        return entry[0] if entry else None
+
+    def _vector(self, title: str, summary: str) -> Tuple[Dict[str, float], Tuple[str, ...]]:
+        tf = Counter(tokenize(title))
+        for t in tf:
+            tf[t] *= 2
+        tf.update(tokenize(summary))
+        # A floor on the corpus size keeps IDF from punishing shared terms while the window is still small.
+        n = max(len(self._items) + 1, 1000)
+        vec = {t: (1.0 + math.log(c)) * math.log((n + 1) / (self._df.get(t, 0) + 1)) for t, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {t: w / norm for t, w in vec.items() if w > 0}, tuple(tf)
+
+    def _candidates(self, vec: Dict[str, float]) -> Set[str]:
+        max_df = max(2, self.max_df_ratio * len(self._items))
+        terms = [t for t in vec if self._df.get(t, 0) <= max_df]
+        terms = heapq.nlargest(self.query_terms, terms, key=vec.__getitem__)
+        found: Set[str] = set()
+        for t in terms:
+            found.update(self._postings.get(t, ()))
+        return found
+
+    def assign(self, item_id: str, title: str, summary: str, timestamp: float, cluster_id: Optional[str] = None) -> Optional[str]:
+        """
+        Return the cluster id for an item, creating a cluster if needed. An item
+        already in the window keeps its cluster; `cluster_id` forces membership
+        (used when reloading persisted assignments).
+        """
+        if not self.enabled:
+            return cluster_id
+        known = self._items.get(item_id)
+        if known and known[0] in self.clusters:
+            return known[0]
+
+        timestamp = timestamp or 0.0
+        vec, terms = self._vector(title, summary)
+        cluster: Optional[StoryCluster] = self.clusters.get(cluster_id) if cluster_id else None
+        dot = 0.0
+        if cluster is None and cluster_id is None and vec:
+            best = 0.0
+            for cid in self._candidates(vec):
+                c = self.clusters[cid]
+                if abs(timestamp - c.last_ts) > self.window_seconds:
+                    continue
+                centroid = c.centroid
+                d = sum(w * centroid.get(t, 0.0) for t, w in vec.items())
+                score = d / c.norm if c.norm else 0.0
+                if score > best:
+                    best, cluster, dot = score, c, d
+            if best < self.threshold:
+                cluster, dot = None, 0.0
+        elif cluster is not None:
+            dot = sum(w * cluster.centroid.get(t, 0.0) for t, w in vec.items())
+
+        if cluster is None:
+            cluster = StoryCluster(cluster_id or item_id, title or "", timestamp)
+            self.clusters[cluster.id] = cluster
+        self._add_member(cluster, item_id, vec, dot, timestamp)
+
+        self._items[item_id] = (cluster.id, timestamp, terms)
+        self._df.update(terms)
+        heapq.heappush(self._expiry, (timestamp, item_id))
+        self._newest = max(self._newest, timestamp)
+        self._evict()
+        return cluster.id
+
+    def _add_member(self, cluster: StoryCluster, item_id: str, vec: Dict[str, float], dot: float, timestamp: float):
+        centroid = cluster.centroid
+        for t, w in vec.items():
+            centroid[t] = centroid.get(t, 0.0) + w
+        cluster.norm = math.sqrt(max(0.0, cluster.norm * cluster.norm + 2 * dot + sum(w * w for w in vec.values())))
+        if len(centroid) > self.centroid_terms * 2:
+            cluster.centroid = centroid = dict(heapq.nlargest(self.centroid_terms, centroid.items(), key=lambda kv: kv[1]))
+            cluster.norm = math.sqrt(sum(w * w for w in centroid.values()))
+        cluster.size += 1
+        cluster.first_ts = min(cluster.first_ts, timestamp)
+        cluster.last_ts = max(cluster.last_ts, timestamp)
+        cluster.item_ids.append(item_id)
+        if len(cluster.item_ids) > 20:
+            del cluster.item_ids[:-20]
+
+        posted = set(cluster.top_terms(self.posting_terms))
+        for t in cluster.posted - posted:
+            self._unpost(t, cluster.id)
+        for t in posted - cluster.posted:
+            self._postings.setdefault(t, set()).add(cluster.id)
+        cluster.posted = posted
+
+    def _unpost(self, term: str, cluster_id: str):
+        ids = self._postings.get(term)
+        if ids:
+            ids.discard(cluster_id)
+            if not ids:
+                del self._postings[term]
+
+    def _evict(self):
+        cutoff = self._newest - self.window_seconds
+        while self._expiry and self._expiry[0][0] < cutoff:
+            ts, item_id = heapq.heappop(self._expiry)
+            entry = self._items.get(item_id)
+            if entry is None or entry[1] != ts:
+                continue
+            del self._items[item_id]
+            self._df.subtract(entry[2])
+            for t in entry[2]:
+                if self._df[t] <= 0:
+                    del self._df[t]
+            cluster = self.clusters.get(entry[0])
+            if cluster is not None and cluster.last_ts < cutoff:
+                for t in cluster.posted:
+                    self._unpost(t, cluster.id)
+                del self.clusters[cluster.id]
+
+    def list_clusters(self, min_size: int = 2, limit: int = 50) -> List[Dict[str, Any]]:
+        """Active stories, most recently updated first"""
+        active = [c for c in self.clusters.values() if c.size >= min_size]
+        active = heapq.nlargest(limit, active, key=lambda c: (c.last_ts, c.size))
+        return [
+            {
+                "id": c.id,
+                "label": c.label,
+                "size": c.size,
+                "first_timestamp": c.first_ts,
+                "last_timestamp": c.last_ts,
+                "top_terms": c.top_terms(8),
+                "latest_item_ids": list(reversed(c.item_ids[-5:])),
+            }
+            for c in active
+        ]
+
+    def load_recent(self, session_factory: Callable[[], Any]) -> int:
+        """Rebuild clusters from items persisted within the window, keeping their cluster ids"""
+        from app import db_models
+
+        db = session_factory()
+        try:
+            cutoff = time.time() - self.window_seconds
+            rows = (
+                db.query(
+                    db_models.IntelItemDB.id,
+                    db_models.IntelItemDB.title,
+                    db_models.IntelItemDB.summary,
+                    db_models.IntelItemDB.timestamp,
+                    db_models.IntelItemDB.cluster_id,
+                )
+                .filter(db_models.IntelItemDB.timestamp >= cutoff, db_models.IntelItemDB.duplicate_of.is_(None))
+                .order_by(db_models.IntelItemDB.timestamp.asc())
+                .all()
+            )
+        finally:
+            db.close()
+        for item_id, title, summary, ts, cluster_id in rows:
+            self.assign(item_id, title, summary, ts or 0.0, cluster_id=cluster_id)
+        logger.info(f"Story clusters loaded: {len(self._items)} items in {len(self.clusters)} clusters")
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "window_seconds": self.window_seconds,
+            "items": len(self._items),
+            "clusters": len(self.clusters),
+            "terms": len(self._df),
+        }
+
+
+story_clusters = StoryClusterEngine()
@@ -0,0 +1,21 @@
+import re
+import unicodedata
+from typing import List
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile("[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Latin words as unigrams, CJK runs as character bigrams (there are no spaces to
+    split on). Text is NFKC-normalized and lower-cased, punctuation is dropped.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = _WORD_RE.findall(_CJK_RE.sub(" ", text))
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
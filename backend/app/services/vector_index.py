@@ -0,0 +1,436 @@
+import hashlib
+import importlib
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from app.services.search_index import RANGE_HOURS
+from app.services.text_tokens import tokenize
+
+logger = logging.getLogger("vector_index")
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a float32 (len(texts), dim) matrix of L2-normalized rows"""
+        ...
+
+
+@lru_cache(maxsize=1 << 18)
+def _slot(term: str, dim: int) -> Tuple[int, float]:
+    h = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, 1.0 if h >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder: signed feature hashing of `tokenize` terms with
+    sublinear TF. No corpus statistics are involved, so a stored vector never goes
+    stale as the corpus grows.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tf: Dict[str, int] = {}
+            for term in tokenize(text):
+                tf[term] = tf.get(term, 0) + 1
+            row = out[i]
+            for term, count in tf.items():
+                slot, sign = _slot(term, self.dim)
+                row[slot] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def load_embedder(spec: str) -> Embedder:
+    """Instantiate an embedder from a `package.module:factory` spec"""
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "Embedder")
+    return factory()
+
+
+def item_text(title: str, summary: str, content: Optional[str], max_content_chars: int = 2000) -> str:
+    # The title is repeated so it outweighs body text, as in the BM25 field weights.
+    return "\n".join((title or "", title or "", summary or "", (content or "")[:max_content_chars]))
+
+
+class VectorIndex:
+    """
+    Embedding index over intel items for "more like this" and semantic lookups.
+
+    Vectors live in a float32 matrix, memory-mapped from `path` when one is set, with
+    hot flags and timestamps in side arrays so filters are vectorized masks. Queries
+    are scored block by block with a NumPy matrix product and the exact top k is
+    selected with `argpartition`. Once the corpus reaches `ivf_threshold` rows the
+    index trains an IVF partitioning (spherical k-means) and scans only the `nprobe`
+    nearest lists. Rows are updated in place as items are persisted.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        path: Optional[str] = None,
+        ivf_threshold: int = 1_000_000,
+        nprobe: int = 16,
+        batch_rows: int = 65536,
+        enabled: bool = True,
+    ):
+        self._lock = threading.RLock()
+        self.configure(embedder, path, ivf_threshold, nprobe, batch_rows, enabled)
+
+    def configure(
+        self,
+        embedder: Optional[Embedder] = None,
+        path: Optional[str] = None,
+        ivf_threshold: int = 1_000_000,
+        nprobe: int = 16,
+        batch_rows: int = 65536,
+        enabled: bool = True,
+    ):
+        with self._lock:
+            self.embedder = embedder or HashingEmbedder()
+            self.dim = self.embedder.dim
+            self.path = path or None
+            self.ivf_threshold = max(0, ivf_threshold)
+            self.nprobe = max(1, nprobe)
+            self.batch_rows = max(1024, batch_rows)
+            self.enabled = enabled
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._vectors: Optional[np.ndarray] = None
+            self._capacity = 0
+            self._live = np.zeros(0, dtype=bool)
+            self._hot = np.zeros(0, dtype=bool)
+            self._ts = np.zeros(0, dtype=np.float64)
+            self._ids: List[Optional[str]] = []
+            self._row_of: Dict[str, int] = {}
+            self._free: List[int] = []
+            self._rows = 0
+            self._reset_ivf()
+
+    def _reset_ivf(self):
+        self._centroids: Optional[np.ndarray] = None
+        self._row_list = np.zeros(self._capacity, dtype=np.int32) - 1
+        self._lists: List[np.ndarray] = []
+        self._list_tail: List[List[int]] = []
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._row_of
+
+    # -- storage ---------------------------------------------------------------
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self._capacity * 2, 1024)
+        if self.path:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            mode = "r+" if self._capacity else "w+"
+            if mode == "r+":
+                with open(self.path, "r+b") as f:
+                    f.truncate(capacity * self.dim * 4)
+            self._vectors = np.memmap(self.path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        else:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self._vectors is not None:
+                vectors[: self._rows] = self._vectors[: self._rows]
+            self._vectors = vectors
+        extra = capacity - self._capacity
+        self._live = np.concatenate([self._live, np.zeros(extra, dtype=bool)])
+        self._hot = np.concatenate([self._hot, np.zeros(extra, dtype=bool)])
+        self._ts = np.concatenate([self._ts, np.zeros(extra, dtype=np.float64)])
+        self._row_list = np.concatenate([self._row_list, np.full(extra, -1, dtype=np.int32)])
+        self._capacity = capacity
+
+    def _take_row(self, item_id: str) -> int:
+        row = self._row_of.get(item_id)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = item_id
+        else:
+            if self._rows >= self._capacity:
+                self._grow(self._rows + 1)
+            row = self._rows
+            self._rows += 1
+            self._ids.append(item_id)
+        self._row_of[item_id] = row
+        return row
+
+    def add_vectors(self, ids: Sequence[str], vectors: np.ndarray, is_hot: Sequence[bool], timestamps: Sequence[float]):
+        """Insert or replace rows from precomputed, L2-normalized vectors"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        with self._lock:
+            if self._rows + len(ids) > self._capacity:
+                self._grow(self._rows + len(ids))
+            rows = np.fromiter((self._take_row(x) for x in ids), dtype=np.int64, count=len(ids))
+            self._vectors[rows] = vectors
+            self._live[rows] = True
+            self._hot[rows] = np.asarray(is_hot, dtype=bool)
+            self._ts[rows] = np.asarray(timestamps, dtype=np.float64)
+            if self._centroids is not None:
+                lists = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+                self._row_list[rows] = lists
+                for row, c in zip(rows.tolist(), lists.tolist()):
+                    self._list_tail[c].append(row)
+        if self.ivf_threshold and len(self) >= self.ivf_threshold and len(self) >= 2 * self._trained_size:
+            self.train_ivf()
+
+    def upsert(self, item_id: str, title: str, summary: str, content: Optional[str], is_hot: bool, timestamp: float):
+        if not self.enabled:
+            return
+        self.add_vectors([item_id], self.embedder.embed([item_text(title, summary, content)]), [bool(is_hot)], [float(timestamp or 0.0)])
+
+    def upsert_items(self, items: Iterable[Any]):
+        """Embed and index `IntelItem`s in one batch (near-duplicates are left out)"""
+        if not self.enabled:
+            return
+        keep = []
+        for item in items:
+            if getattr(item, "duplicate_of", None):
+                self.remove(item.id)
+            else:
+                keep.append(item)
+        if keep:
+            vectors = self.embedder.embed([item_text(x.title, x.summary, x.content) for x in keep])
+            self.add_vectors([x.id for x in keep], vectors, [bool(x.is_hot) for x in keep], [float(x.timestamp or 0.0) for x in keep])
+
+    def remove(self, item_id: str):
+        with self._lock:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                return
+            self._ids[row] = None
+            self._live[row] = False
+            self._row_list[row] = -1
+            self._free.append(row)
+
+    def vector_of(self, item_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._row_of.get(item_id)
+            return None if row is None else np.array(self._vectors[row])
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embedder.embed([text])[0]
+
+    # -- queries ---------------------------------------------------------------
+
+    def _allowed(self, type_filter: Optional[str], range_filter: Optional[str], now: Optional[float], exclude: Iterable[str]) -> np.ndarray:
+        n = self._rows
+        allowed = self._live[:n].copy()
+        want_hot = {"hot": True, "history": False}.get(type_filter or "all")
+        if want_hot is not None:
+            allowed &= self._hot[:n] == want_hot
+        hours = RANGE_HOURS.get(range_filter or "all")
+        if hours:
+            allowed &= self._ts[:n] >= (now or time.time()) - hours * 3600
+        for item_id in exclude:
+            row = self._row_of.get(item_id)
+            if row is not None:
+                allowed[row] = False
+        return allowed
+
+    @staticmethod
+    def _top(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(scores) > k:
+            part = np.argpartition(scores, -k)[-k:]
+            rows, scores = rows[part], scores[part]
+        return rows, scores
+
+    def _scan(self, queries: np.ndarray, allowed: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact top k for a batch of queries. Each block of `batch_rows` is scored
+        against every query with one matrix product, so the matrix is read once per
+        batch rather than once per query.
+        """
+        cand_rows, cand_scores = [], []
+        for start in range(0, self._rows, self.batch_rows):
+            end = min(start + self.batch_rows, self._rows)
+            rows = np.flatnonzero(allowed[start:end])
+            if not len(rows):
+                continue
+            # (queries, rows) keeps each query's scores contiguous for argpartition.
+            scores = queries @ self._vectors[start:end].T
+            if len(rows) < end - start:
+                scores = scores[:, rows]
+            if len(rows) > k:
+                part = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores = np.take_along_axis(scores, part, axis=1)
+                rows = rows[part]
+            else:
+                rows = np.broadcast_to(rows, scores.shape)
+            cand_rows.append(rows + start)
+            cand_scores.append(scores)
+        if not cand_rows:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))] * len(queries)
+        rows, scores = np.hstack(cand_rows), np.hstack(cand_scores)
+        return [self._top(rows[j], scores[j], k) for j in range(len(queries))]
+
+    def _probe(self, query: np.ndarray, allowed: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top k over the `nprobe` IVF lists nearest to the query"""
+        nearest = np.argpartition(-(self._centroids @ query), min(self.nprobe, len(self._lists)) - 1)[: self.nprobe]
+        parts = []
+        for c in nearest.tolist():
+            if self._list_tail[c]:
+                # Re-inserted rows can be listed twice; unique() also keeps the list sorted.
+                self._lists[c] = np.unique(np.concatenate([self._lists[c], np.asarray(self._list_tail[c], dtype=np.int64)]))
+                self._list_tail[c] = []
+            rows = self._lists[c]
+            # Rows freed and reused since training may have moved to another list.
+            parts.append(rows[self._row_list[rows] == c])
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        rows = rows[allowed[rows]]
+        return self._top(rows, self._vectors[rows] @ query, k)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int = 10,
+        type_filter: Optional[str] = "all",
+        range_filter: Optional[str] = "all",
+        exclude: Iterable[str] = (),
+        now: Optional[float] = None,
+        exact: bool = False,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k (id, cosine) pairs per query vector. A single (dim,) vector or a
+        (n, dim) batch is accepted; IVF is used when trained unless `exact`.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if top_k <= 0:
+            return [[] for _ in queries]
+        results = []
+        with self._lock:
+            allowed = self._allowed(type_filter, range_filter, now, exclude)
+            if self._centroids is not None and not exact:
+                found = [self._probe(query, allowed, top_k) for query in queries]
+            else:
+                found = self._scan(queries, allowed, top_k)
+            for rows, scores in found:
+                order = np.argsort(-scores, kind="stable")
+                results.append([(self._ids[r], float(s)) for r, s in zip(rows[order].tolist(), scores[order].tolist())])
+        return results
+
+    def similar(self, item_id: str, top_k: int = 10, **kwargs) -> Optional[List[Tuple[str, float]]]:
+        """Nearest neighbours of an indexed item, or None if it is not indexed"""
+        vector = self.vector_of(item_id)
+        if vector is None:
+            return None
+        return self.search(vector, top_k, exclude=[item_id], **kwargs)[0]
+
+    def search_text(self, text: str, top_k: int = 10, **kwargs) -> List[Tuple[str, float]]:
+        return self.search(self.embed_text(text), top_k, **kwargs)[0]
+
+    # -- IVF -------------------------------------------------------------------
+
+    def train_ivf(self, nlist: Optional[int] = None, iterations: int = 8, sample_per_list: int = 64, seed: int = 0):
+        """(Re)partition the index into `nlist` lists with spherical k-means on a sample"""
+        rng = np.random.default_rng(seed)
+        with self._lock:
+            live_rows = np.flatnonzero(self._live[: self._rows])
+            size = len(live_rows)
+            nlist = nlist or int(min(1024, max(16, math.sqrt(size))))
+            if size < nlist:
+                return
+            sample = np.sort(rng.choice(live_rows, min(size, nlist * sample_per_list), replace=False))
+            data = np.array(self._vectors[sample])
+        started = time.perf_counter()
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            lists, starts = np.unique(assign[order], return_index=True)
+            centroids[lists] = np.add.reduceat(data[order], starts, axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+        with self._lock:
+            n = self._rows
+            row_list = np.full(self._capacity, -1, dtype=np.int32)
+            for start in range(0, n, self.batch_rows):
+                end = min(start + self.batch_rows, n)
+                row_list[start:end] = np.argmax(self._vectors[start:end] @ centroids.T, axis=1)
+            row_list[:n][~self._live[:n]] = -1
+            live = np.flatnonzero(row_list[:n] >= 0)
+            order = live[np.argsort(row_list[live], kind="stable")]
+            bounds = np.searchsorted(row_list[order], np.arange(nlist + 1))
+            self._centroids = centroids
+            self._row_list = row_list
+            self._lists = [order[bounds[c] : bounds[c + 1]].astype(np.int64) for c in range(nlist)]
+            self._list_tail = [[] for _ in range(nlist)]
+            self._trained_size = len(live)
+        logger.info(f"Vector index partitioned {len(live)} rows into {nlist} IVF lists in {time.perf_counter() - started:.1f}s")
+
+    # -- lifecycle -------------------------------------------------------------
+
+    def load_all(self, session_factory: Callable[[], Any], batch_size: int = 2000) -> int:
+        """Embed every persisted canonical item"""
+        from app import db_models
+
+        if not self.enabled:
+            return 0
+        db = session_factory()
+        loaded = 0
+        try:
+            query = (
+                db.query(
+                    db_models.IntelItemDB.id,
+                    db_models.IntelItemDB.title,
+                    db_models.IntelItemDB.summary,
+                    db_models.IntelItemDB.content,
+                    db_models.IntelItemDB.is_hot,
+                    db_models.IntelItemDB.timestamp,
+                )
+                .filter(db_models.IntelItemDB.duplicate_of.is_(None))
+                .yield_per(batch_size)
+            )
+            batch: List[Tuple[Any, ...]] = []
+            for row in query:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    loaded += self._load_batch(batch)
+                    batch = []
+            if batch:
+                loaded += self._load_batch(batch)
+        finally:
+            db.close()
+        logger.info(f"Vector index loaded with {loaded} items (dim={self.dim})")
+        return loaded
+
+    def _load_batch(self, rows: List[Tuple[Any, ...]]) -> int:
+        vectors = self.embedder.embed([item_text(title, summary, content) for _, title, summary, content, _, _ in rows])
+        self.add_vectors([r[0] for r in rows], vectors, [bool(r[4]) for r in rows], [float(r[5] or 0.0) for r in rows])
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "items": len(self._row_of),
+            "dim": self.dim,
+            "capacity": self._capacity,
+            "memmap": bool(self.path),
+            "ivf_lists": len(self._lists),
+            "nprobe": self.nprobe,
+        }
+
+
+vector_index = VectorIndex()
@@ -1,5 +1,5 @@
 import axios, { AxiosError } from 'axios';
-import { IntelListResponse, SearchType, TimeRange, IntelItem as IntelItemType } from './types';
+import { IntelListResponse, IntelChangesResponse, SimilarIntelResponse, ExportJobResponse, SearchType, TimeRange, IntelItem as IntelItemType } from './types';
 
 // 处理 Vite 环境下 import.meta.env 可能不存在的情况
 const normalizeBaseUrl = (base: string) => base.replace(/\/+$/, '');
@@ -64,6 +64,17 @@ export const getIntelDetail = async (id: string) => {
     return res.data;
 };
 
+// Changes after a cursor; pass the returned version / after_id to the next call
+export const getIntelChanges = async (since: number = 0, afterId?: string | null, limit: number = 200) => {
+    const res = await api.get<IntelChangesResponse>('/intel/changes', { params: { since, after_id: afterId || undefined, limit } });
+    return res.data;
+};
+
+export const getSimilarIntel = async (id: string, limit: number = 5) => {
+    const res = await api.get<SimilarIntelResponse>(`/intel/${id}/similar`, { params: { limit } });
+    return res.data;
+};
+
 export const getFavorites = async (
     q: string = "",
     limit: number = 20,
@@ -104,10 +115,28 @@ export const getGlobalStreamUrl = (opts?: { after_ts?: number; after_id?: string
     return url.toString();
 };
 
-export const exportIntel = async (ids: string[], type: SearchType, range: TimeRange, q: string) => {
-    const res = await api.post('/intel/export', { ids: ids.length ? ids : undefined, type, range, q }, {
+export const exportIntel = async (ids: string[], type: SearchType, range: TimeRange, q: string, format: 'docx' | 'csv' | 'json' = 'docx') => {
+    const res = await api.post('/intel/export', { ids: ids.length ? ids : undefined, type, range, q, format }, {
         responseType: 'blob'
     });
+    if (res.status !== 202) {
+        return res.data;
+    }
+    // 大批量 DOCX 在后台渲染：轮询任务状态，完成后下载文件
+    let job: ExportJobResponse = JSON.parse(await res.data.text());
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = await getExportJob(job.job_id);
+    }
+    if (job.status === 'failed') {
+        throw new Error(job.error || 'Export failed');
+    }
+    const file = await api.get(`/intel/export/jobs/${job.job_id}/download`, { responseType: 'blob' });
+    return file.data;
+};
+
+export const getExportJob = async (jobId: string): Promise<ExportJobResponse> => {
+    const res = await api.get(`/intel/export/jobs/${jobId}`);
     return res.data;
 };
 
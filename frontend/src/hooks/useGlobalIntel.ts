@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { IntelItem } from '@/types';
 import { getFavorites, getGlobalStreamUrl, toggleFavorite as apiToggleFavorite } from '@/api';
+import { INTEL_BATCH_EVENT, parseBatchEvent } from '@/lib/sseFetch';
 
 function mergeAndSortByTimestampDesc(existing: IntelItem[], incoming: IntelItem[]) {
     const byId = new Map<string, IntelItem>();
@@ -208,6 +209,28 @@ export function useGlobalIntel(enabled: boolean = true) {
                     console.error("Error parsing new_intel", e);
                 }
             });
+
+            es.addEventListener('intel_updated', (event) => {
+                try {
+                    const item: IntelItem = applyFavorites([JSON.parse((event as MessageEvent).data)])[0];
+                    setItems(prev => mergeAndSortByTimestampDesc(prev, [item]));
+                } catch (e) {
+                    console.error("Error parsing intel_updated", e);
+                }
+            });
+
+            es.addEventListener(INTEL_BATCH_EVENT, (event) => {
+                try {
+                    const batch = parseBatchEvent({ event: INTEL_BATCH_EVENT, data: (event as MessageEvent).data }) ?? [];
+                    const data: IntelItem[] = applyFavorites(batch as IntelItem[]);
+                    const last = data[data.length - 1];
+                    if (!last) return;
+                    lastSeenRef.current = { ts: last.timestamp, id: last.id };
+                    setItems(prev => mergeAndSortByTimestampDesc(prev, data));
+                } catch (e) {
+                    console.error("Error parsing new_intel_batch", e);
+                }
+            });
         };
 
         connect();
@@ -1,6 +1,17 @@
 export type SseEvent = {
   event?: string
   data: string
+  /** Parsed items of a batch event such as `new_intel_batch` */
+  items?: unknown[]
+}
+
+export const INTEL_BATCH_EVENT = 'new_intel_batch'
+
+/** Returns the items carried by a `new_intel_batch` frame, or `null` for other events. */
+export function parseBatchEvent(evt: SseEvent): unknown[] | null {
+  if (evt.event !== INTEL_BATCH_EVENT) return null
+  const parsed: unknown = JSON.parse(evt.data)
+  return Array.isArray(parsed) ? parsed : []
 }
 
 export async function streamSse(
@@ -45,7 +56,11 @@ export async function streamSse(
       if (!dataLines.length) return
       const data = dataLines.join('\n')
       dataLines = []
-      onEvent?.({ event: currentEvent, data })
+      const evt: SseEvent = { event: currentEvent, data }
+      if (evt.event === INTEL_BATCH_EVENT) {
+        evt.items = parseBatchEvent(evt) ?? []
+      }
+      onEvent?.(evt)
       currentEvent = undefined
     }
 
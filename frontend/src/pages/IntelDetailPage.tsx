@@ -1,6 +1,6 @@
-import { useParams, useNavigate } from 'react-router-dom';
+import { useParams, useNavigate, Link } from 'react-router-dom';
 import { useEffect, useState } from 'react';
-import { getIntelDetail, toggleFavorite, exportIntel } from '@/api';
+import { getIntelDetail, getSimilarIntel, toggleFavorite, exportIntel } from '@/api';
 import { IntelItem as IntelItemType } from '@/types';
 import { TAG_COLORS } from '@/lib/constants';
 import { cn } from '@/lib/utils';
@@ -11,6 +11,7 @@ export function IntelDetailPage() {
     const navigate = useNavigate();
     const [item, setItem] = useState<IntelItemType | null>(null);
     const [loading, setLoading] = useState(true);
+    const [similar, setSimilar] = useState<IntelItemType[]>([]);
 
     useEffect(() => {
         if (id) {
@@ -19,6 +20,10 @@ export function IntelDetailPage() {
                 .then(setItem)
                 .catch(console.error)
                 .finally(() => setLoading(false));
+            setSimilar([]);
+            getSimilarIntel(id)
+                .then(res => setSimilar(res.items))
+                .catch(console.error);
         }
     }, [id]);
 
@@ -157,6 +162,26 @@ export function IntelDetailPage() {
                     </div>
                 </div>
 
+                {/* 5. More Like This */}
+                {similar.length > 0 && (
+                    <div className="space-y-3">
+                        <h3 className="text-lg font-bold text-gray-900 dark:text-white">相似情报</h3>
+                        <ul className="space-y-2">
+                            {similar.map(s => (
+                                <li key={s.id} className="flex items-baseline justify-between gap-4 text-sm">
+                                    <Link
+                                        to={`/intel/${s.id}`}
+                                        className="text-gray-800 dark:text-gray-300 hover:text-blue-600 dark:hover:text-blue-300 hover:underline"
+                                    >
+                                        {s.title}
+                                    </Link>
+                                    <span className="shrink-0 text-gray-500 dark:text-gray-400">{s.time}</span>
+                                </li>
+                            ))}
+                        </ul>
+                    </div>
+                )}
+
             </div>
 
             {/* Floating Back Button */}
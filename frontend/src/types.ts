@@ -21,9 +21,39 @@ export interface IntelListResponse {
     total: number;
 }
 
+export interface SimilarIntelResponse {
+    items: IntelItem[];
+    scores: number[];
+    took_ms?: number;
+}
+
 export interface AgentSearchResponse {
     sources: IntelItem[];
     answer?: string;
+    scores?: number[];
+    took_ms?: number;
+    truncated?: boolean;
+}
+
+export type IntelChange =
+    | { op: "upsert"; version: number; item: IntelItem }
+    | { op: "delete"; version: number; id: string };
+
+export interface IntelChangesResponse {
+    changes: IntelChange[];
+    version: number;
+    after_id?: string | null;
+    has_more: boolean;
+}
+
+export interface ExportJobResponse {
+    job_id: string;
+    status: "queued" | "running" | "done" | "failed";
+    total: number;
+    done: number;
+    filename: string;
+    size?: number | null;
+    error?: string | null;
 }
 
 export type SearchType = "hot" | "history" | "all";
@@ -0,0 +1,71 @@
+"""
+Export throughput and memory at scale (not a test; run by hand):
+
+    python tests/bench_export_stream.py [rows]
+
+Writes `rows` (default 200000) items to a throwaway database, then streams them
+as CSV and NDJSON, reporting time to first rows, throughput and peak memory.
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import ensure_schema, insert_items
+
+from app.database import SessionLocal
+from app.models import ExportRequest
+from app.routes.intel import export_intel
+
+
+async def _drain(fmt: str, token: str):
+    db = SessionLocal()
+    started = time.perf_counter()
+    first_rows = size = 0
+    try:
+        res = await export_intel(ExportRequest(format=fmt, q=token), db, current_user=None)
+        async for chunk in res.body_iterator:
+            if not chunk.startswith("﻿".encode("utf-8")):
+                first_rows = first_rows or time.perf_counter() - started
+            size += len(chunk)
+    finally:
+        db.close()
+    return first_rows, size, time.perf_counter() - started
+
+
+async def run_benchmark(count: int):
+    token = uuid.uuid4().hex
+    insert_items(
+        f"bench-export-{token}",
+        count,
+        title=lambda i: f"{token} 标题 {i}, \"quoted\"",
+        summary=lambda i: f"摘要 {i}\n第二行",
+        content="正文" * 20,
+        timestamp=lambda i: 1_000_000.0 + i // 3,
+        tags=[{"label": "日本", "color": "red"}, "芯片"],
+    )
+    for fmt in ("csv", "json"):
+        first_rows, size, took = await _drain(fmt, token)
+        print(
+            f"export {fmt} @ {count} rows: first rows after {first_rows * 1000:.0f}ms, "
+            f"{size / 1e6:.0f}MB in {took:.1f}s ({count / took:.0f} rows/s)"
+        )
+        if first_rows > 0.5:
+            raise AssertionError("export did not start streaming immediately")
+    tracemalloc.start()
+    await _drain("json", token)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"export json @ {count} rows: peak traced memory {peak / 1e6:.1f}MB")
+    if peak > 20e6:
+        raise AssertionError("export memory grows with the row count")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
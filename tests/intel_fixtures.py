@@ -0,0 +1,93 @@
+"""
+Shared setup for the test scripts: a throwaway database, the schema, intel rows
+keyed by an id prefix (so a run never touches rows it did not create), their
+cleanup, and a counter of the SQL statements a block of code issues.
+
+Import it before anything from `app`, which binds its engine on import.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+if "app.database" in sys.modules:
+    raise RuntimeError("import intel_fixtures before app, or the tests write to the configured database")
+
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="intel-test-db-")
+os.environ["SQLITE_PATH"] = os.path.join(DATABASE_DIRECTORY, "intel.db")
+os.environ.pop("DATABASE_URL", None)
+atexit.register(shutil.rmtree, DATABASE_DIRECTORY, ignore_errors=True)
+
+from sqlalchemy import event
+
+from app import db_models
+from app.database import Base, SessionLocal, add_missing_columns, engine
+
+
+def ensure_schema():
+    """Create missing tables and columns, as importing app.main does, so a fresh or older database works"""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+
+def insert_items(prefix: str, count: int, start: int = 0, **columns) -> List[str]:
+    """
+    Insert intel rows `{prefix}-00000`, `{prefix}-00001`, ... and return their ids.
+    Each keyword sets a column, either to a constant or to a function of the row
+    index; unset columns get a hot, unfavorited row, newest first.
+    """
+    now = time.time()
+    values = {
+        "title": lambda i: f"{prefix} 标题{i}",
+        "summary": lambda i: f"价值点{i}",
+        "source": "test",
+        "publish_time_str": "2025/08/01 00:00",
+        "timestamp": lambda i: now - i,
+        "tags": [{"label": "日本", "color": "red"}],
+        "is_hot": True,
+        "favorited": False,
+        **columns,
+    }
+    ids = [f"{prefix}-{i:05d}" for i in range(start, start + count)]
+    rows = [{"id": item_id, **{k: v(i) if callable(v) else v for k, v in values.items()}} for i, item_id in zip(range(start, start + count), ids)]
+    db = SessionLocal()
+    try:
+        db.execute(db_models.IntelItemDB.__table__.insert(), rows)
+        db.commit()
+    finally:
+        db.close()
+    return ids
+
+
+def cleanup(prefix: str):
+    """Delete the intel rows (and change feed tombstones) whose id starts with `{prefix}-`"""
+    db = SessionLocal()
+    try:
+        for model in (db_models.IntelItemDB, db_models.IntelTombstoneDB):
+            db.query(model).filter(model.id.like(f"{prefix}-%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class StatementCounter:
+    """`with StatementCounter() as statements:` counts the statements sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
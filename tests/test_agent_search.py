@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from starlette.requests import Request
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app.models import AgentSearchRequest, IntelItem
+from app.routes.agent import AgentRunRequest, run_agent, search_agent, stream_task
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.search_index import SearchIndex, search_index
+
+
+def _make_request() -> Request:
+    scope = {"type": "http", "method": "GET", "path": "/api/agent/stream/x", "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    return Request(scope, receive)
+
+
+def test_bm25_ranking_and_filters():
+    index = SearchIndex()
+    now = time.time()
+    index.upsert("title", "黄仁勋谈中国AI芯片需求", "英伟达首席执行官接受采访", None, True, now)
+    index.upsert("content", "科技公司季度财报", "多家公司发布财报", "报道中提到黄仁勋的讲话。", True, now)
+    index.upsert("history", "历史情报：黄仁勋 相关", "历史摘要", None, False, now)
+    index.upsert("old", "旧闻：黄仁勋访问台湾", "旧摘要", None, True, now - 13 * 3600)
+    index.upsert("other", "苹果发布新产品", "发布会内容摘要", None, True, now)
+
+    hits = [x for x, _ in index.search("黄仁勋", type_filter="hot", now=now).hits]
+    if set(hits) != {"title", "content", "old"}:
+        raise AssertionError(f"unexpected hot ranking: {hits!r}")
+    if hits.index("title") > hits.index("content"):
+        raise AssertionError("title match should outrank a content-only match")
+    if [x for x, _ in index.search("黄仁勋", type_filter="history").hits] != ["history"]:
+        raise AssertionError("history filter not applied")
+    if "old" in [x for x, _ in index.search("黄仁勋", range_filter="12h", now=now).hits]:
+        raise AssertionError("range filter not applied")
+
+    index.upsert("other", "苹果发布会上黄仁勋现身", "发布会内容摘要", None, True, now)
+    if "other" not in [x for x, _ in index.search("黄仁勋").hits]:
+        raise AssertionError("re-indexed item not found under its new title")
+    index.remove("title")
+    if "title" in [x for x, _ in index.search("黄仁勋").hits]:
+        raise AssertionError("removed item still returned")
+
+
+def test_top_k_recall_with_common_terms():
+    index = SearchIndex()
+    index.upsert("rare", "rareword common", "", None, True, 0.0)
+    for i in range(20):
+        index.upsert(f"c{i}", "common", f"filler{i}", None, True, 0.0)
+    hits = index.search("rareword common", top_k=10).hits
+    if len(hits) != 10 or hits[0][0] != "rare":
+        raise AssertionError(f"docs matching only the common term were dropped: {hits!r}")
+
+    # Pruning never changes the top k against scoring every match.
+    rng = random.Random(7)
+    vocab = [f"w{i}" for i in range(300)]
+    index = SearchIndex()
+    for i in range(2000):
+        index.upsert(str(i), " ".join(rng.choices(vocab, k=6)), " ".join(rng.choices(vocab[:10], k=3)), None, True, 0.0)
+    for _ in range(50):
+        query = " ".join(rng.choices(vocab, k=2) + rng.choices(vocab[:10], k=2))
+        top = [round(score, 9) for _, score in index.search(query, top_k=10, budget_ms=10_000).hits]
+        full = [round(score, 9) for _, score in index.search(query, top_k=len(index), budget_ms=10_000).hits[:10]]
+        if top != full:
+            raise AssertionError(f"pruned top k differs for {query!r}: {top!r} != {full!r}")
+
+
+async def test_search_and_run_stream_offline():
+    prefix = f"test-search-{uuid.uuid4().hex}"
+    marker = f"暗号{uuid.uuid4().hex[:8]}"
+    pipeline = IngestPipeline()
+    now = time.time()
+    items = [
+        IntelItem(id=f"{prefix}-1", title=f"{marker} 黄仁勋谈芯片", summary="英伟达需求旺盛", source="t", time="", timestamp=now, tags=[], is_hot=True),
+        IntelItem(id=f"{prefix}-2", title="芯片出口", summary=f"摘要中出现 {marker}", source="t", time="", timestamp=now, tags=[], is_hot=True),
+    ]
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+
+        res = await search_agent(AgentSearchRequest(query=marker, type="hot", top_k=5), current_user=None)
+        if [x.id for x in res.sources] != [f"{prefix}-1", f"{prefix}-2"] or len(res.scores) != 2 or res.scores[0] < res.scores[1]:
+            raise AssertionError(f"unexpected search response: {res!r}")
+
+        task_id = (await run_agent(AgentRunRequest(query=marker, type="hot"), current_user=None))["task_id"]
+        response = await stream_task(task_id, _make_request(), current_user=None)
+        events = {}
+        async for chunk in response.body_iterator:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            event, data = text.split("\n")[0][len("event: "):], text.split("data: ", 1)[1].strip()
+            events[event] = json.loads(data)
+        if [x["id"] for x in events["result"]["sources"]] != [f"{prefix}-1", f"{prefix}-2"] or events["status"]["status"] != "done":
+            raise AssertionError(f"unexpected stream events: {events!r}")
+    finally:
+        await pipeline.stop()
+        for x in items:
+            search_index.remove(x.id)
+        cleanup(prefix)
+
+
+def run_benchmark(count: int = 100_000, queries: int = 200):
+    rng = random.Random(5)
+    vocab = [f"w{i}" for i in range(20000)]
+    common = [f"c{i}" for i in range(50)]
+    index = SearchIndex(budget_ms=50)
+    started = time.perf_counter()
+    for i in range(count):
+        index.upsert(str(i), " ".join(rng.choices(vocab, k=8)), " ".join(rng.choices(vocab, k=30) + rng.choices(common, k=10)), None, i % 3 != 0, float(i))
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    truncated = 0
+    for _ in range(queries):
+        query = " ".join(rng.choices(vocab, k=3) + rng.choices(common, k=1))
+        res = index.search(query, top_k=10, type_filter="hot")
+        latencies.append(res.took_ms)
+        truncated += res.truncated
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"bm25 @ {count} docs: build {build_s:.1f}s, query p50={statistics.median(latencies):.2f}ms "
+        f"p95={p95:.2f}ms max={latencies[-1]:.2f}ms, truncated {truncated}/{queries}"
+    )
+    if latencies[-1] > index.budget_ms * 2:
+        raise AssertionError(f"query exceeded the latency budget: {latencies[-1]:.2f}ms")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    test_bm25_ranking_and_filters()
+    test_top_k_recall_with_common_terms()
+    asyncio.run(test_search_and_run_stream_offline())
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("agent search tests passed")
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.agent.task_engine import AgentTaskEngine, TaskQueueFull, agent_tasks
+from app.routes.agent import AgentRunRequest, get_task_status, run_agent, stream_task
+
+
+class _SlowEngine(AgentTaskEngine):
+    """Stands in a fixed-latency step for retrieval and tracks concurrency"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.executions = 0
+        self.running = 0
+        self.peak = 0
+
+    async def _execute(self, task):
+        self.executions += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            task.status = "running"
+            task.emit("status", {"status": "running"})
+            await asyncio.sleep(self.delay)
+            if task.query == "boom":
+                raise RuntimeError("boom")
+            self._finish(task, "done")
+            task.emit("status", {"status": "done"})
+        finally:
+            self.running -= 1
+
+
+def _make_request() -> Request:
+    scope = {"type": "http", "method": "GET", "path": "/api/agent/stream/x", "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def _statuses(engine: AgentTaskEngine, task):
+    return [json.loads(f.split("data: ", 1)[1])["status"] async for f in engine.follow(task) if f.startswith("event: status")]
+
+
+async def test_single_flight_and_result_window():
+    engine = _SlowEngine(0.05)
+    engine.configure(workers=2, dedup_seconds=0.2)
+    try:
+        first = await engine.submit("黄仁勋  芯片", "hot", "all", 10)
+        same = await engine.submit(" 黄仁勋 芯片 ", "hot", "all", 10)
+        other = await engine.submit("黄仁勋 芯片", "hot", "all", 5)
+        if first is not same or first is other:
+            raise AssertionError("identical requests should share one task, different top_k should not")
+        if await _statuses(engine, same) != ["submitted", "running", "done"]:
+            raise AssertionError("unexpected status sequence")
+        if await engine.submit("黄仁勋 芯片", "hot", "all", 10) is not first:
+            raise AssertionError("finished task not reused within the dedup window")
+        await asyncio.sleep(0.25)
+        again = await engine.submit("黄仁勋 芯片", "hot", "all", 10)
+        if again is first:
+            raise AssertionError("finished task reused after the dedup window")
+        await asyncio.gather(_statuses(engine, again), _statuses(engine, other))
+        if engine.executions != 3:
+            raise AssertionError(f"expected 3 executions, got {engine.executions}")
+    finally:
+        await engine.stop()
+
+
+async def test_bounded_pool_ttl_and_failures():
+    engine = _SlowEngine(0.05)
+    engine.configure(workers=2, queue_size=3, ttl_seconds=0.1)
+    try:
+        tasks = [await engine.submit(f"q{i}") for i in range(3)]
+        await asyncio.sleep(0.01)  # two workers take a task each
+        tasks += [await engine.submit(f"q{i}") for i in range(3, 5)]
+        try:
+            await engine.submit("overflow")
+            raise AssertionError("queue overflow not rejected")
+        except TaskQueueFull:
+            pass
+        for task in tasks:
+            await _statuses(engine, task)
+        if engine.peak != 2:
+            raise AssertionError(f"worker pool not bounded: peak concurrency {engine.peak}")
+
+        failed = await engine.submit("boom")
+        if await _statuses(engine, failed) != ["submitted", "running", "failed"] or "boom" not in failed.error:
+            raise AssertionError("failed task not reported")
+
+        await asyncio.sleep(0.15)
+        if engine.get(tasks[0].id) is not None or engine.get(failed.id) is not None:
+            raise AssertionError("finished tasks not evicted after their TTL")
+    finally:
+        await engine.stop()
+
+
+async def test_routes_status_and_stream():
+    query = f"不存在的查询{uuid.uuid4().hex[:8]}"
+    task_id = (await run_agent(AgentRunRequest(query=query, type="all"), current_user=None))["task_id"]
+    response = await stream_task(task_id, _make_request(), current_user=None)
+    events = []
+    async for chunk in response.body_iterator:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        events.append(text.split("\n")[0][len("event: "):])
+    if events[-2:] != ["result", "status"] or "progress" not in events:
+        raise AssertionError(f"unexpected stream events: {events!r}")
+
+    res = await get_task_status(task_id, current_user=None)
+    if res.status != "done" or res.result is None or res.result.sources:
+        raise AssertionError(f"unexpected task status: {res!r}")
+    try:
+        await get_task_status("missing", current_user=None)
+        raise AssertionError("unknown task did not 404")
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+    await agent_tasks.stop()
+
+
+async def run_benchmark(clients: int = 2000, distinct: int = 20):
+    engine = _SlowEngine(0.02)
+    engine.configure(workers=4, queue_size=clients)
+    started = time.perf_counter()
+    tasks = [await engine.submit(f"query {i % distinct}") for i in range(clients)]
+    await asyncio.gather(*(_statuses(engine, t) for t in set(tasks)))
+    took = time.perf_counter() - started
+    await engine.stop()
+    print(f"agent tasks: {clients} requests over {distinct} distinct queries -> {engine.executions} executions in {took * 1000:.0f}ms")
+    if engine.executions != distinct:
+        raise AssertionError(f"single-flight failed: {engine.executions} executions")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_single_flight_and_result_window())
+    asyncio.run(test_bounded_pool_ttl_and_failures())
+    asyncio.run(test_routes_status_and_stream())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("agent task tests passed")
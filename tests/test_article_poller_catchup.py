@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import uuid
+
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import db_models
+from app.database import SessionLocal
+from app.services.http_client import http_client
+from app.services.ingest_pipeline import ingest_pipeline
+from app.services.poller import ArticlePoller
+
+
+def _serve_articles(articles):
+    async def get_article(request):
+        article_id = int(request.match_info["article_id"])
+        doc = articles.get(article_id)
+        if doc is None:
+            return web.json_response({"errors": [{"message": "Not Found"}]}, status=404)
+        return web.json_response(doc)
+
+    return get_article
+
+
+async def _start_stand_in_cms(get_article):
+    app = web.Application()
+    app.router.add_get("/api/articles/{article_id}", get_article)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def test_catchup_skips_gaps_and_falls_back_to_tail():
+    prefix = f"test-article-{uuid.uuid4().hex}"
+    present = [100, 101, 103, 104, 107, 108, 109]
+    articles = {
+        i: {"id": i, "title": f"article {i}", "summary": "s", "thingId": f"{prefix}-{i}", "publishDate": "2026-01-01T00:00:00Z"}
+        for i in present
+    }
+    runner, base_url = await _start_stand_in_cms(_serve_articles(articles))
+
+    poller = ArticlePoller()
+    poller.configure(base_url, start_id=100, lookahead=5, concurrency=3)
+    try:
+        await poller._poll_step()
+        if poller.current_id != 105 or not poller.catching_up:
+            raise AssertionError(f"unexpected state after first window: current_id={poller.current_id}, catching_up={poller.catching_up}")
+
+        await poller._poll_step()
+        if poller.current_id != 110:
+            raise AssertionError(f"gap 105-106 not skipped: current_id={poller.current_id}")
+
+        await poller._poll_step()
+        if poller.catching_up:
+            raise AssertionError("poller did not fall back to tail polling at the head")
+        if poller._next_delay() <= poller.catchup_interval:
+            raise AssertionError("tail polling should use the scheduler interval")
+
+        await ingest_pipeline.drain()
+        db = SessionLocal()
+        try:
+            rows = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.like(f"{prefix}-%")).all()
+            stored = sorted(int(r.id.rsplit("-", 1)[1]) for r in rows)
+        finally:
+            db.close()
+        if stored != present:
+            raise AssertionError(f"unexpected persisted ids: {stored!r}")
+
+        articles[110] = {"id": 110, "title": "article 110", "summary": "s", "thingId": f"{prefix}-110"}
+        await poller._poll_step()
+        if poller.current_id != 111 or not poller.catching_up:
+            raise AssertionError("tail poll did not pick up the new head article")
+    finally:
+        await poller.stop()
+        await ingest_pipeline.stop()
+        await http_client.close()
+        await runner.cleanup()
+        cleanup(prefix)
+
+
+async def test_server_error_is_a_barrier():
+    prefix = f"test-article-{uuid.uuid4().hex}"
+    articles = {
+        200: {"id": 200, "title": "a", "summary": "s", "thingId": f"{prefix}-200"},
+        202: {"id": 202, "title": "c", "summary": "s", "thingId": f"{prefix}-202"},
+    }
+
+    async def get_article(request):
+        article_id = int(request.match_info["article_id"])
+        if article_id == 201:
+            return web.Response(status=502)
+        return await _serve_articles(articles)(request)
+
+    runner, base_url = await _start_stand_in_cms(get_article)
+
+    poller = ArticlePoller()
+    poller.configure(base_url, start_id=200, lookahead=4, concurrency=4)
+    try:
+        await poller._poll_step()
+        if poller.current_id != 201:
+            raise AssertionError(f"poller advanced past a 5xx id: current_id={poller.current_id}")
+    finally:
+        await poller.stop()
+        await ingest_pipeline.stop()
+        await http_client.close()
+        await runner.cleanup()
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_catchup_skips_gaps_and_falls_back_to_tail())
+    asyncio.run(test_server_error_is_a_barrier())
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from fastapi import HTTPException
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import db_models
+from app.database import SessionLocal
+from app.models import IntelItem, Tag
+from app.routes.ingest import reload_gazetteer
+from app.services.auto_tagger import AutoTagger, Gazetteer, auto_tagger
+from app.services.ingest_pipeline import IngestPipeline
+
+GAZETTEER = {
+    "countries": {
+        "color": "red",
+        "entries": {
+            "美国": ["united states", "u.s.", "usa"],
+            "印度": ["india"],
+            "印度尼西亚": ["印尼", "indonesia"],
+            "伊朗": ["iran"],
+            "英国": ["uk", "britain"],
+            "乌克兰": ["ukraine"],
+        },
+    },
+    "domains": {"color": "blue", "entries": {"科技": ["芯片", "半导体", "chips"], "军事": ["导弹", "missile"]}},
+}
+
+ZH = (
+    "外交部发言人在例行记者会上表示，中方对有关国家滥用出口管制措施、恶意封锁打压中国企业坚决反对。"
+    "美国商务部本周宣布收紧先进芯片出口限制，英伟达（NVIDIA）等企业受到影响。分析人士认为，此举将影响全球半导体供应链，"
+    "并可能推高相关产品价格。与此同时，欧盟正在评估其对本地产业的冲击，北约秘书长则在峰会上谈及导弹防御。"
+)
+EN = (
+    "The U.S. Commerce Department tightened export controls on advanced chips this week, affecting Nvidia and other firms. "
+    "Analysts say the move will ripple through the global semiconductor supply chain while the European Union weighs the "
+    "impact on local industry, and NATO ministers discussed missile defence with Ukraine at a summit in Brussels. "
+)
+
+
+def _tagger(data, **kwargs) -> AutoTagger:
+    tagger = AutoTagger()
+    tagger.configure(**kwargs)
+    tagger.gazetteer = Gazetteer(data)
+    tagger.check_interval = float("inf")
+    return tagger
+
+
+def test_matching_rules():
+    tagger = _tagger(GAZETTEER, max_tags=2)
+    found = tagger.match("印度尼西亚与ＵＳＡ官员会谈", "Iranian officials met in the UK", "ukraine")
+    if found != {"countries": ["印度尼西亚", "美国"]}:
+        raise AssertionError(f"longest match, full-width folding, word boundaries or the cap not applied: {found!r}")
+
+    found = tagger.match("", "", "芯片 missile; Ukraine and India. 芯片出口, ukraine")
+    if found != {"domains": ["科技"], "countries": ["乌克兰"]}:
+        raise AssertionError(f"content mentions need min_content_hits: {found!r}")
+
+    item = IntelItem(
+        id="1", title="U.S. chips rule", summary="美国收紧芯片出口", source="t", time="", timestamp=0.0, tags=[Tag(label="美国", color="red")]
+    )
+    tagged = tagger.tag(item)
+    if [(t.label, t.color) for t in tagged.tags] != [("美国", "red"), ("科技", "blue")] or item.tags[0] is not tagged.tags[0]:
+        raise AssertionError(f"unexpected tags: {tagged.tags!r}")
+    untouched = item.model_copy(update={"title": "weather", "summary": "", "tags": []})
+    if tagger.tag(untouched) is not untouched or tagger.stats()["tagged"] != 1:
+        raise AssertionError("an item without mentions should pass through")
+
+    for bad in ([], {"x": {"entries": []}}, {"x": {"color": "green", "entries": {}}}):
+        try:
+            Gazetteer(bad)
+            raise AssertionError(f"invalid gazetteer accepted: {bad!r}")
+        except ValueError:
+            pass
+
+
+async def test_reload_without_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "gazetteer.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(GAZETTEER, f, ensure_ascii=False)
+        tagger = AutoTagger()
+        tagger.configure(path=path, check_interval=0)
+        if tagger.match("英伟达发布新芯片", "") != {"domains": ["科技"]}:
+            raise AssertionError("gazetteer not loaded lazily")
+
+        data = json.loads(json.dumps(GAZETTEER))
+        data["organizations"] = {"color": "purple", "entries": {"英伟达": ["nvidia"]}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        if tagger.match("英伟达发布新芯片", "").get("organizations") != ["英伟达"] or tagger.reloads != 2:
+            raise AssertionError("changed gazetteer file not picked up")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        if tagger.match("英伟达发布新芯片", "").get("organizations") != ["英伟达"]:
+            raise AssertionError("an invalid file replaced the working gazetteer")
+
+        previous = auto_tagger.path
+        auto_tagger.path = path
+        try:
+            await reload_gazetteer(current_user=None)
+            raise AssertionError("reloading an invalid gazetteer did not fail")
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+        finally:
+            auto_tagger.path = previous
+
+
+async def test_pipeline_tags_items():
+    prefix = f"test-autotag-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    items = [
+        IntelItem(id=f"{prefix}-0", title=f"美国宣布对华芯片出口新限制 {uuid.uuid4().hex}", summary="", source="test", time="", timestamp=time.time(), tags=[]),
+        IntelItem(id=f"{prefix}-1", title=f"Weather report {uuid.uuid4().hex}", summary="", source="test", time="", timestamp=time.time(), tags=[]),
+    ]
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+        db = SessionLocal()
+        try:
+            rows = {r.id: r for r in db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.like(f"{prefix}-%"))}
+        finally:
+            db.close()
+        tags = {(t["label"], t["color"]) for t in rows[f"{prefix}-0"].tags}
+        if not {("美国", "red"), ("科技", "blue")} <= tags or rows[f"{prefix}-1"].tags:
+            raise AssertionError(f"dictionary tags not persisted: {tags!r}")
+        if pipeline.get_stats()["auto_tagger"]["tagged"] < 1:
+            raise AssertionError("tagger stats not reported by the pipeline")
+    finally:
+        await pipeline.stop()
+        cleanup(prefix)
+
+
+def run_benchmark(megabytes: float = 8.0):
+    auto_tagger.load()
+    for name, text in (("zh", ZH), ("en", EN)):
+        content = text * int(megabytes * 1e6 / len(text.encode()) / 2)
+        size = len(content.encode())
+        started = time.perf_counter()
+        found = auto_tagger.match("", "", content)
+        rate = size / (time.perf_counter() - started) / 1e6
+        print(f"auto tagger ({name}): {size / 1e6:.1f}MB scanned at {rate:.1f}MB/s -> {found}")
+        if "美国" not in found.get("countries", []) or rate < 8:
+            raise AssertionError(f"dictionary scan too slow or wrong: {rate:.1f}MB/s {found!r}")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    test_matching_rules()
+    asyncio.run(test_reload_without_restart())
+    asyncio.run(test_pipeline_tags_items())
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("auto tagger tests passed")
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import StatementCounter, cleanup, ensure_schema
+
+from app import crud
+from app.agent.orchestrator import orchestrator
+from app.database import SessionLocal
+from app.models import ExportRequest, FavoriteToggleRequest
+from app.routes.intel import export_intel, get_intel_detail, toggle_favorite
+from app.services.cached_items import intel_item_from_cache
+
+
+def _cache(prefix: str, count: int):
+    entries = [
+        {
+            "id": f"{prefix}-{i:05d}",
+            "title": f"缓存标题{i}",
+            "summary": f"缓存摘要{i}",
+            "content": "正文" * 50,
+            "time": "2025/08/02 00:00",
+            "timestamp": 2_000_000.0 + i,
+            "tags": [{"label": "美国", "color": "red"}, "芯片"],
+            "is_hot": True,
+        }
+        for i in range(count)
+    ]
+    orchestrator.global_cache.extend(entries)
+    return entries
+
+
+def _cleanup(prefix: str, entries):
+    for entry in entries:
+        orchestrator.global_cache.remove(entry)
+    cleanup(prefix)
+
+
+async def _export(ids, fmt: str = "json"):
+    db = SessionLocal()
+    try:
+        res = await export_intel(ExportRequest(ids=ids, format=fmt), db, current_user=None)
+        return [json.loads(line) for line in b"".join([c async for c in res.body_iterator]).decode("utf-8").splitlines()]
+    finally:
+        db.close()
+
+
+async def test_export_materializes_in_bulk():
+    prefix = f"test-cached-items-{uuid.uuid4().hex}"
+    entries = _cache(prefix, 200)
+    try:
+        db = SessionLocal()
+        try:
+            crud.create_intel_item(db, intel_item_from_cache(entries[0], entries[0]["id"]))
+        finally:
+            db.close()
+        ids = [e["id"] for e in entries][::-1]
+        with StatementCounter() as statements:
+            rows = await _export(ids)
+        if [r["id"] for r in rows] != ids:
+            raise AssertionError("exported rows not in request order")
+        # missing ids, the bulk insert and the export pages; not a round trip per item
+        if statements.count > 8:
+            raise AssertionError(f"{statements.count} statements to export 200 cache-only ids")
+        if rows[0]["is_hot"] or rows[0]["tags"] != [{"label": "美国", "color": "red"}, {"label": "芯片", "color": "blue"}]:
+            raise AssertionError(f"unexpected materialized row: {rows[0]!r}")
+    finally:
+        _cleanup(prefix, entries)
+
+
+async def test_detail_and_favorite_use_the_cache():
+    prefix = f"test-cached-items-{uuid.uuid4().hex}"
+    entries = _cache(prefix, 2)
+    db = SessionLocal()
+    try:
+        detail = await get_intel_detail(entries[0]["id"], db, current_user=None)
+        stored = crud.get_intel_by_id(db, entries[0]["id"])
+        if detail.title != "缓存标题0" or stored is None or stored.is_hot:
+            raise AssertionError("detail of a cache-only item not persisted as a regular item")
+
+        item = await toggle_favorite(entries[1]["id"], FavoriteToggleRequest(favorited=True), db, current_user=None)
+        stored = crud.get_intel_by_id(db, entries[1]["id"])
+        if not item.favorited or not stored.favorited or not stored.is_hot:
+            raise AssertionError("favorite of a cache-only item not persisted with its hot flag")
+
+        try:
+            await get_intel_detail(f"{prefix}-missing", db, current_user=None)
+            raise AssertionError("unknown id did not 404")
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404:
+                raise
+    finally:
+        db.close()
+        _cleanup(prefix, entries)
+
+
+def _materialize_one_by_one(ids):
+    """The per-item resolution the routes used before: scan, lookup and commit for each id"""
+    db = SessionLocal()
+    try:
+        for item_id in ids:
+            cached = orchestrator.get_cached_intel(item_id)
+            item = intel_item_from_cache(cached, item_id)
+            if not crud.get_intel_by_id(db, item.id):
+                crud.create_intel_item(db, item)
+    finally:
+        db.close()
+
+
+async def run_benchmark(count: int = 500):
+    prefix = f"test-cached-items-bench-{uuid.uuid4().hex}"
+    # Both sets sit at the end of a full hot cache, the slow case for a linear scan.
+    baseline = _cache(f"{prefix}-a", count)
+    entries = _cache(f"{prefix}-b", count)
+    try:
+        started = time.perf_counter()
+        await asyncio.to_thread(_materialize_one_by_one, [e["id"] for e in baseline])
+        one_by_one = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with StatementCounter() as statements:
+            rows = await _export([e["id"] for e in entries])
+        bulk = time.perf_counter() - started
+        if len(rows) != count:
+            raise AssertionError(f"exported {len(rows)} of {count} rows")
+        print(
+            f"export of {count} cache-only ids: {bulk * 1000:.0f}ms with bulk materialization ({statements.count} statements), "
+            f"per-item materialization alone took {one_by_one * 1000:.0f}ms ({one_by_one / bulk:.1f}x)"
+        )
+        if bulk > one_by_one:
+            raise AssertionError("bulk materialization slower than per item")
+    finally:
+        _cleanup(prefix, baseline + entries)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_export_materializes_in_bulk())
+    asyncio.run(test_detail_and_favorite_use_the_cache())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("cached items tests passed")
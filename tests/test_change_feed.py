@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from sqlalchemy import func
+
+from intel_fixtures import cleanup, ensure_schema, insert_items
+
+from app import crud, db_models
+from app.database import SessionLocal
+from app.models import FavoriteToggleRequest, IntelChangesResponse, IntelItem
+from app.routes.intel import get_intel_changes, toggle_favorite
+
+# Far older than anything the other tests leave behind, so demotion and retention only touch these rows.
+BASE_TS = 1000.0
+
+
+def _insert(prefix: str, count: int, start: int = 0):
+    return insert_items(prefix, count, start, publish_time_str="1970/01/01 08:16", timestamp=lambda i: BASE_TS + i)
+
+
+def _head() -> int:
+    db = SessionLocal()
+    try:
+        return max(
+            db.query(func.max(db_models.IntelItemDB.change_version)).scalar() or 0,
+            db.query(func.max(db_models.IntelTombstoneDB.change_version)).scalar() or 0,
+        )
+    finally:
+        db.close()
+
+
+async def _changes(since: int, after_id=None, limit: int = 200):
+    db = SessionLocal()
+    try:
+        res = await get_intel_changes(since=since, after_id=after_id, limit=limit, db=db, current_user=None)
+        IntelChangesResponse.model_validate_json(res.body)
+        return json.loads(res.body)
+    finally:
+        db.close()
+
+
+async def _sync(since: int, after_id=None, limit: int = 200):
+    """Follow the feed to its end; returns the changes and the final cursor"""
+    changes = []
+    while True:
+        page = await _changes(since, after_id, limit)
+        changes += page["changes"]
+        since, after_id = page["version"], page["after_id"]
+        if not page["has_more"]:
+            return changes, since, after_id
+
+
+def _change_id(change):
+    return change["id"] if change["op"] == "delete" else change["item"]["id"]
+
+
+async def test_feed_covers_every_kind_of_write():
+    prefix = f"test-change-feed-{uuid.uuid4().hex}"
+    start = _head()
+    try:
+        ids = _insert(prefix, 3)
+        changes, since, after_id = await _sync(start, limit=2)
+        if [_change_id(c) for c in changes] != ids or any(c["op"] != "upsert" for c in changes):
+            raise AssertionError(f"inserts not in the feed: {changes!r}")
+        if (await _changes(since, after_id))["changes"]:
+            raise AssertionError("the cursor of the last page is not at the end")
+
+        db = SessionLocal()
+        try:
+            await toggle_favorite(ids[1], FavoriteToggleRequest(favorited=True), db, current_user=None)
+            now = time.time()
+            crud.demote_hot_items(db, older_than_hours=int((now - BASE_TS - 100) / 3600))
+            crud.delete_old_intel_items(db, days=int((now - BASE_TS - 100) / 86400))
+        finally:
+            db.close()
+
+        changes, since, after_id = await _sync(since, after_id, limit=1)
+        versions = [(c["version"], _change_id(c)) for c in changes]
+        if versions != sorted(versions):
+            raise AssertionError(f"changes out of order: {versions!r}")
+        state = {}
+        for change in changes:
+            if change["op"] == "delete":
+                state.pop(change["id"], None)
+            else:
+                state[change["item"]["id"]] = change["item"]
+        kept = state.get(ids[1])
+        if not kept or not kept["favorited"] or kept["is_hot"]:
+            raise AssertionError(f"favorite toggle or demotion missing: {kept!r}")
+        if {c["id"] for c in changes if c["op"] == "delete"} != {ids[0], ids[2]}:
+            raise AssertionError("retention deletions not in the feed as tombstones")
+
+        # An id deleted and ingested again replays as a delete followed by the new row.
+        _insert(prefix, 1)
+        changes, _, _ = await _sync(since, after_id)
+        if [(c["op"], _change_id(c)) for c in changes] != [("upsert", ids[0])]:
+            raise AssertionError(f"re-ingested item not in the feed: {changes!r}")
+        db = SessionLocal()
+        try:
+            tombstone = db.get(db_models.IntelTombstoneDB, ids[0])
+            item = db.get(db_models.IntelItemDB, ids[0])
+            if tombstone is None or tombstone.change_version >= item.change_version:
+                raise AssertionError("tombstone does not precede the re-ingested row")
+        finally:
+            db.close()
+    finally:
+        cleanup(prefix)
+
+
+async def test_since_without_after_id_is_exclusive():
+    prefix = f"test-change-feed-{uuid.uuid4().hex}"
+    start = _head()
+    try:
+        ids = _insert(prefix, 3)
+        page = await _changes(start)
+        version = page["changes"][0]["version"]
+        if [_change_id(c) for c in page["changes"]] != ids or {c["version"] for c in page["changes"]} != {version}:
+            raise AssertionError(f"one insert statement not at one version: {page!r}")
+        if (await _changes(version))["changes"]:
+            raise AssertionError("changes at `since` returned again without `after_id`")
+        if [_change_id(c) for c in (await _changes(version, ids[0]))["changes"]] != ids[1:]:
+            raise AssertionError("`after_id` no longer resumes within a version")
+    finally:
+        cleanup(prefix)
+
+
+async def test_id_change_leaves_a_tombstone():
+    prefix = f"test-change-feed-{uuid.uuid4().hex}"
+    start = _head()
+
+    def item(item_id: str, title: str) -> IntelItem:
+        return IntelItem(id=item_id, thing_id=f"{prefix}-thing", title=title, summary="s", source="test", time="", timestamp=BASE_TS, tags=[])
+
+    db = SessionLocal()
+    try:
+        crud.upsert_intel_items(db, [item(f"{prefix}-old", "v1")])
+        changes, since, after_id = await _sync(start)
+        # The CMS item comes back under a new id; the row is renamed, not duplicated.
+        crud.upsert_intel_items(db, [item(f"{prefix}-new", "v2")])
+        changes += (await _sync(since, after_id))[0]
+        state = {}
+        for change in changes:
+            if change["op"] == "delete":
+                state.pop(change["id"], None)
+            else:
+                state[change["item"]["id"]] = change["item"]["title"]
+        if state != {f"{prefix}-new": "v2"}:
+            raise AssertionError(f"feed clients keep the old id: {state!r}")
+    finally:
+        db.close()
+        cleanup(prefix)
+
+
+async def test_clear_leaves_tombstones():
+    # Clears every row; runs last, on the throwaway database intel_fixtures sets up.
+    prefix = f"test-change-feed-{uuid.uuid4().hex}"
+    ids = _insert(prefix, 2)
+    since = _head()
+    db = SessionLocal()
+    try:
+        crud.clear_intel_items(db)
+        changes, _, _ = await _sync(since)
+        if [(c["op"], c["id"]) for c in changes if c.get("id", "").startswith(prefix)] != [("delete", x) for x in ids]:
+            raise AssertionError(f"cleared rows not in the feed as tombstones: {changes!r}")
+    finally:
+        db.close()
+        cleanup(prefix)
+
+
+def test_concurrent_writers_keep_commit_order(writers: int = 4, per_writer: int = 25):
+    prefix = f"test-change-feed-concurrent-{uuid.uuid4().hex}"
+    start = _head()
+    written, seen = [], []
+    done = threading.Event()
+
+    def write(w: int):
+        rng = random.Random(w)
+        for i in range(per_writer):
+            db = SessionLocal()
+            try:
+                db.execute(db_models.IntelItemDB.__table__.insert(), {
+                    "id": f"{prefix}-{w}-{i:03d}", "title": "t", "summary": "s", "source": "test",
+                    "publish_time_str": "", "timestamp": BASE_TS, "tags": [], "is_hot": False, "favorited": False,
+                })
+                # Hold the transaction open so other writers queue behind it.
+                time.sleep(rng.random() * 0.002)
+                db.commit()
+                written.append(f"{prefix}-{w}-{i:03d}")
+            finally:
+                db.close()
+
+    def read():
+        since, after_id = start, None
+        while True:
+            finished = done.is_set()
+            db = SessionLocal()
+            try:
+                changes, _ = crud.get_intel_changes(db, since, after_id, limit=50)
+            finally:
+                db.close()
+            for change in changes:
+                seen.append((change["version"], _change_id(change)))
+                since, after_id = seen[-1]
+            if finished and not changes:
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        done.set()
+        reader.join()
+        mine = [(v, i) for v, i in seen if i.startswith(prefix)]
+        # A reader following the cursor while writes commit must not skip any of them.
+        if sorted(i for _, i in mine) != sorted(written) or len(written) != writers * per_writer:
+            raise AssertionError(f"feed reader missed {len(set(written) - {i for _, i in mine})} committed writes")
+        versions = [v for v, _ in mine]
+        if versions != sorted(set(versions)):
+            raise AssertionError("concurrent transactions shared or reordered versions")
+    finally:
+        done.set()
+        cleanup(prefix)
+
+
+async def run_benchmark(count: int = 2000, delta: int = 50):
+    prefix = f"test-change-feed-bench-{uuid.uuid4().hex}"
+    try:
+        start = _head()
+        _insert(prefix, count)
+        started = time.perf_counter()
+        changes, since, after_id = await _sync(start, limit=1000)
+        full = time.perf_counter() - started
+        _insert(prefix, delta, start=count)
+        started = time.perf_counter()
+        new, _, _ = await _sync(since, after_id, limit=1000)
+        incremental = time.perf_counter() - started
+        if len(changes) < count or len(new) != delta:
+            raise AssertionError(f"synced {len(changes)} then {len(new)} changes")
+        print(
+            f"change feed: initial sync of {len(changes)} items {full * 1000:.0f}ms, "
+            f"catching up on {delta} new items {incremental * 1000:.1f}ms"
+        )
+    finally:
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_feed_covers_every_kind_of_write())
+    asyncio.run(test_since_without_after_id_is_exclusive())
+    asyncio.run(test_id_change_leaves_a_tombstone())
+    test_concurrent_writers_keep_commit_order()
+    asyncio.run(test_clear_leaves_tombstones())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("change feed tests passed")
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from starlette.responses import Response, StreamingResponse
+
+from intel_fixtures import cleanup, insert_items
+
+from app.compression import CompressionMiddleware, available_encodings, compress_body, negotiate
+from app.main import app
+from app.routes.auth import get_current_user
+
+
+def _decompress(encoding: str, body: bytes) -> bytes:
+    if encoding == "gzip":
+        return zlib.decompress(body, 47)
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(body)
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+def _insert(prefix: str, count: int):
+    insert_items(
+        prefix,
+        count,
+        title=lambda i: f"{prefix} 美国商务部宣布对华芯片出口新限制{i}",
+        summary=lambda i: f"美国商务部周二宣布，将进一步收紧对中国的先进芯片出口管制，涉及多家企业和研究机构。{i}",
+        tags=[{"label": "美国", "color": "red"}, {"label": "芯片", "color": "blue"}],
+    )
+
+
+async def _call(asgi, path: str, accept_encoding: str = None, query: str = "", on_body=None):
+    """Run one GET through `asgi`; returns (status, headers, body chunks)"""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "", "scheme": "http",
+             "query_string": query.encode(), "headers": headers, "server": ("test", 80), "client": ("test", 1), "http_version": "1.1"}
+    first = True
+
+    async def receive():
+        nonlocal first
+        if first:
+            first = False
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    start, chunks = {}, []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if on_body is not None:
+                await on_body(message.get("body", b""))
+
+    await asgi(scope, receive, send)
+    return start["status"], {k.decode().lower(): v.decode() for k, v in start["headers"]}, chunks
+
+
+def test_negotiation():
+    available = ("zstd", "br", "gzip")
+    if negotiate("gzip, deflate, br, zstd", available) != "zstd":
+        raise AssertionError("server preference not applied")
+    if negotiate("zstd;q=0, br;q=0.5, gzip", available) != "br":
+        raise AssertionError("q=0 not honored")
+    if negotiate("gzip, deflate, br, zstd", ("gzip",)) != "gzip":
+        raise AssertionError("unavailable codec chosen")
+    if negotiate("identity", available) is not None or negotiate(None, available) is not None:
+        raise AssertionError("identity-only client got a compressed body")
+    if negotiate("*", ("gzip",)) != "gzip" or negotiate("*, gzip;q=0", ("gzip",)) is not None:
+        raise AssertionError("wildcard handling")
+
+
+async def test_json_responses():
+    body = json.dumps({"items": [{"title": "标题" * 20, "tags": ["a", "b"]}] * 200}, ensure_ascii=False).encode()
+
+    async def json_app(scope, receive, send):
+        await Response(body if scope["path"] == "/big" else b'{"ok":true}', media_type="application/json")(scope, receive, send)
+
+    middleware = CompressionMiddleware(json_app, min_size=1024, offload_size=16 * 1024)
+    status, headers, chunks = await _call(middleware, "/big", "gzip")
+    compressed = b"".join(chunks)
+    if headers.get("content-encoding") != "gzip" or zlib.decompress(compressed, 47) != body:
+        raise AssertionError(f"large JSON not gzipped: {headers!r}")
+    if int(headers["content-length"]) != len(compressed) or "accept-encoding" not in headers.get("vary", "").lower():
+        raise AssertionError(f"wrong length or missing Vary: {headers!r}")
+
+    # A client offering every codec gets the server's first choice among those installed.
+    expected = negotiate("gzip, br, zstd", available_encodings())
+    if len(available_encodings()) > 1 and expected == "gzip":
+        raise AssertionError("gzip preferred over an installed br / zstd")
+    _, headers, chunks = await _call(middleware, "/big", "gzip, br, zstd")
+    if headers.get("content-encoding") != expected or _decompress(expected, b"".join(chunks)) != body:
+        raise AssertionError(f"large JSON not encoded with {expected}: {headers!r}")
+
+    _, headers, chunks = await _call(middleware, "/small", "gzip")
+    if "content-encoding" in headers or b"".join(chunks) != b'{"ok":true}':
+        raise AssertionError("a body under the threshold was compressed")
+    _, headers, chunks = await _call(middleware, "/big", None)
+    if "content-encoding" in headers or b"".join(chunks) != body:
+        raise AssertionError("a client without Accept-Encoding got a compressed body")
+
+
+async def test_sse_flushes_every_event():
+    step = asyncio.Event()
+    events = [f"event: new_intel\ndata: {json.dumps({'id': i, 'title': '标题' * 30}, ensure_ascii=False)}\n\n".encode() for i in range(3)]
+
+    async def gen():
+        for event in events:
+            yield event
+            await step.wait()
+            step.clear()
+
+    async def sse_app(scope, receive, send):
+        await StreamingResponse(gen(), media_type="text/event-stream; charset=utf-8")(scope, receive, send)
+
+    decoder = zlib.decompressobj(47)
+    received = []
+
+    async def on_body(chunk):
+        received.append(decoder.decompress(chunk))
+        step.set()
+
+    status, headers, _ = await _call(CompressionMiddleware(sse_app), "/stream", "gzip", on_body=on_body)
+    if headers.get("content-encoding") != "gzip" or "content-length" in headers:
+        raise AssertionError(f"SSE not stream-compressed: {headers!r}")
+    # Each event decodes completely from the bytes sent with it.
+    if received[:3] != events:
+        raise AssertionError("an SSE event was held back by the compressor")
+
+
+async def test_list_route_end_to_end():
+    prefix = f"test-compression-{uuid.uuid4().hex}"
+    _insert(prefix, 50)
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        _, plain_headers, plain = await _call(app, "/api/intel/", None, query=f"q={prefix}")
+        _, headers, compressed = await _call(app, "/api/intel/", "gzip", query=f"q={prefix}")
+        if headers.get("content-encoding") != "gzip" or zlib.decompress(b"".join(compressed), 47) != b"".join(plain):
+            raise AssertionError("compressed list page differs from the plain one")
+        if headers["etag"] != plain_headers["etag"]:
+            raise AssertionError("compression changed the page validator")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        cleanup(prefix)
+
+
+async def run_benchmark(count: int = 1000):
+    prefix = f"test-compression-bench-{uuid.uuid4().hex}"
+    _insert(prefix, count)
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        _, _, plain = await _call(app, "/api/intel/", None, query=f"q={prefix}&limit={count}")
+        body = b"".join(plain)
+        started = time.perf_counter()
+        compressed = compress_body("gzip", body)
+        took = time.perf_counter() - started
+        print(f"list page of {count} items: {len(body)} bytes, {len(compressed)} gzipped ({len(body) / len(compressed):.1f}x) in {took * 1000:.1f}ms")
+        if len(compressed) * 3 > len(body):
+            raise AssertionError("list page compressed less than 3x")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    test_negotiation()
+    asyncio.run(test_json_responses())
+    asyncio.run(test_sse_flushes_every_event())
+    asyncio.run(test_list_route_end_to_end())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("compression tests passed")
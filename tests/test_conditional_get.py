@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from fastapi import Response
+from starlette.requests import Request
+
+from intel_fixtures import StatementCounter, cleanup, ensure_schema, insert_items
+
+from app.database import SessionLocal
+from app.models import FavoriteToggleRequest
+from app.routes.intel import get_intel, get_intel_detail, toggle_favorite
+from app.services.list_cache import list_cache
+
+
+def _request(path: str, if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers})
+
+
+async def _detail(item_id: str, if_none_match: str = None):
+    db = SessionLocal()
+    try:
+        response = Response()
+        result = await get_intel_detail(item_id, db, current_user=None, request=_request(f"/api/intel/{item_id}", if_none_match), response=response)
+        return result, response.headers.get("etag")
+    finally:
+        db.close()
+
+
+async def _favorite(item_id: str, favorited: bool):
+    db = SessionLocal()
+    try:
+        await toggle_favorite(item_id, FavoriteToggleRequest(favorited=favorited), db, current_user=None)
+    finally:
+        db.close()
+
+
+async def test_detail_revalidation():
+    prefix = f"test-conditional-get-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 2, content="正文" * 2000)
+    try:
+        item, etag = await _detail(ids[0])
+        if item.id != ids[0] or not etag or not etag.startswith('W/"'):
+            raise AssertionError(f"detail without a weak ETag: {etag!r}")
+        with StatementCounter() as statements:
+            not_modified, _ = await _detail(ids[0], if_none_match=etag)
+        if not_modified.status_code != 304 or not_modified.body or not_modified.headers["etag"] != etag:
+            raise AssertionError("matching If-None-Match did not get a 304")
+        if statements.count != 1:
+            raise AssertionError(f"a revalidation took {statements.count} statements")
+        if (await _detail(ids[1], if_none_match=etag))[1] == etag:
+            raise AssertionError("two items share a validator")
+
+        await _favorite(ids[0], True)
+        item, changed = await _detail(ids[0], if_none_match=etag)
+        if getattr(item, "status_code", None) == 304 or not item.favorited or changed == etag:
+            raise AssertionError("a favorite toggle did not change the detail validator")
+    finally:
+        cleanup(prefix)
+
+
+async def test_list_revalidation():
+    prefix = f"test-conditional-get-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 3, content="正文" * 2000)
+    list_cache.configure()
+
+    async def page(if_none_match: str = None):
+        return await get_intel(type="hot", q=prefix, range="all", limit=20, offset=0, current_user=None, request=_request("/api/intel/", if_none_match))
+
+    try:
+        first = await page()
+        etag = first.headers["etag"]
+        not_modified = await page(f'"other", {etag}')
+        if not_modified.status_code != 304 or not_modified.body or not_modified.headers["etag"] != etag:
+            raise AssertionError("matching If-None-Match did not get a 304")
+
+        # The validator is the page content, so an uncached render of the same page matches too.
+        list_cache.configure(enabled=False)
+        if (await page(etag)).status_code != 304:
+            raise AssertionError("an uncached render of an unchanged page got a new validator")
+        list_cache.configure()
+
+        await _favorite(ids[1], True)
+        changed = await page(etag)
+        if changed.status_code != 200 or not json.loads(changed.body)["items"][1]["favorited"]:
+            raise AssertionError("a changed page was answered with a 304")
+    finally:
+        list_cache.configure()
+        cleanup(prefix)
+
+
+async def run_benchmark(rounds: int = 200):
+    prefix = f"test-conditional-get-bench-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 1, content="正文" * 2000)
+    try:
+        _, etag = await _detail(ids[0])
+        timings = {}
+        for name, tag in (("full", None), ("revalidated", etag)):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                result, _ = await _detail(ids[0], if_none_match=tag)
+            timings[name] = (time.perf_counter() - started) / rounds
+            size = len(result.model_dump_json().encode()) if tag is None else len(result.body)
+            print(f"detail {name}: {timings[name] * 1000:.2f}ms, {size} body bytes")
+        if timings["revalidated"] > timings["full"]:
+            raise AssertionError("revalidation slower than a full fetch")
+    finally:
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_detail_revalidation())
+    asyncio.run(test_list_revalidation())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("conditional get tests passed")
@@ -0,0 +1,125 @@
+import io
+import os
+import sys
+import time
+import zipfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt
+
+from app.services.docx_export import render_docx, render_docx_bytes, render_docx_object_model
+
+ITEMS = [
+    {
+        "title": "  标题 <A&B> \"quoted\"  ",
+        "summary": "价值点\n第二行",
+        "content": "第一段\n\t第二段 \r\n 第三段 ",
+        "source": "来源 & 媒体",
+        "url": "https://example.com/a?x=1&y=2",
+        "time": "2025/08/01 00:00",
+        "tags": ["日本", " ", "军事安全"],
+    },
+    {"title": "", "summary": "只有摘要", "content": "", "source": "", "url": None, "time": "", "tags": []},
+    {"title": "无正文", "summary": None, "content": None, "source": None, "url": "  ", "time": None, "tags": ["美国"]},
+]
+
+
+def _document_xml(render, items) -> bytes:
+    output = io.BytesIO()
+    render(items, output)
+    with zipfile.ZipFile(output) as zf:
+        return zf.read("word/document.xml")
+
+
+def test_same_document_as_object_model():
+    fast = _document_xml(render_docx, ITEMS)
+    reference = _document_xml(render_docx_object_model, ITEMS)
+    if fast != reference:
+        raise AssertionError(f"document.xml differs:\n{fast.decode()}\n---\n{reference.decode()}")
+
+    output = io.BytesIO()
+    render_docx(ITEMS, output)
+    fast_parts = zipfile.ZipFile(output).namelist()
+    output = io.BytesIO()
+    render_docx_object_model(ITEMS, output)
+    if fast_parts != zipfile.ZipFile(output).namelist():
+        raise AssertionError("package parts differ from the python-docx document")
+
+
+def test_layout():
+    doc = Document(io.BytesIO(render_docx_bytes(ITEMS)))
+    if doc.styles["Normal"].font.size != Pt(12):
+        raise AssertionError("Normal style is not 12pt")
+    paragraphs = doc.paragraphs
+    key = paragraphs[0].runs[0]
+    if not key.bold or key.text != "拟投栏目：" or paragraphs[0].text != "拟投栏目：日本 / 军事安全":
+        raise AssertionError(f"unexpected key line: {paragraphs[0].text!r}")
+    title = paragraphs[4]
+    if title.alignment != WD_ALIGN_PARAGRAPH.CENTER or not title.runs[0].bold or title.runs[0].font.size != Pt(16):
+        raise AssertionError("title is not a centered bold 16pt run")
+    if title.text != '标题 <A&B> "quoted"':
+        raise AssertionError(f"unexpected title: {title.text!r}")
+    body = paragraphs[5]
+    if abs(body.paragraph_format.first_line_indent.cm - 0.74) > 0.01 or body.paragraph_format.line_spacing != 1.25:
+        raise AssertionError("body paragraph lost its indent or line spacing")
+    if body.text != "第一段\n\t第二段 \n\n 第三段":
+        raise AssertionError(f"unexpected body: {body.text!r}")
+    breaks = [r for p in paragraphs for r in p.runs if r._r.xpath('./w:br[@w:type="page"]')]
+    if len(breaks) != len(ITEMS) - 1:
+        raise AssertionError(f"expected {len(ITEMS) - 1} page breaks, got {len(breaks)}")
+    texts = [p.text for p in paragraphs if p.text.strip()]
+    if "（来源：未知，原标题：未命名）" not in texts or "只有摘要" not in texts or "（来源：未知，原标题：无正文）" not in texts:
+        raise AssertionError(f"fallback texts missing: {texts!r}")
+
+
+def test_control_characters_are_dropped():
+    doc = Document(io.BytesIO(render_docx_bytes([dict(ITEMS[1], content="a\x00b\x1fc")])))
+    if "abc" not in [p.text for p in doc.paragraphs]:
+        raise AssertionError("control characters not stripped from the body")
+
+
+def test_progress():
+    seen = []
+    render_docx(ITEMS * 40, io.BytesIO(), on_progress=seen.append, progress_every=50)
+    if seen != [50, 100, 120]:
+        raise AssertionError(f"unexpected progress calls: {seen!r}")
+
+
+def run_benchmark(count: int = 2000):
+    items = [
+        {
+            "title": f"标题{i}",
+            "summary": f"价值点{i}",
+            "content": ("正文" * 100 + "\n") * 5,
+            "source": "test",
+            "url": f"https://example.com/{i}",
+            "time": "2025/08/01 00:00",
+            "tags": ["日本", "军事安全"],
+        }
+        for i in range(count)
+    ]
+    rates = {}
+    for name, render in (("object model", render_docx_object_model), ("template", render_docx)):
+        output = io.BytesIO()
+        started = time.perf_counter()
+        render(items, output)
+        took = time.perf_counter() - started
+        rates[name] = count / took
+        print(f"docx {name} @ {count} items: {took:.2f}s ({rates[name]:.0f} items/s, {len(output.getvalue()) / 1e6:.1f}MB)")
+    print(f"template renderer speedup: {rates['template'] / rates['object model']:.1f}x")
+    if rates["template"] < 3 * rates["object model"]:
+        raise AssertionError("template renderer is not substantially faster")
+
+
+if __name__ == "__main__":
+    test_same_document_as_object_model()
+    test_layout()
+    test_control_characters_are_dropped()
+    test_progress()
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("docx template tests passed")
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from starlette.requests import Request
+from starlette.responses import FileResponse
+
+from intel_fixtures import cleanup, ensure_schema, insert_items
+
+from app import crud
+from app.database import SessionLocal
+from app.models import ExportRequest, FavoriteToggleRequest, IntelItem, Tag
+from app.routes.intel import export_intel, toggle_favorite
+from app.services.export_cache import export_cache
+from app.services.export_jobs import export_jobs
+
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "POST", "path": "/api/intel/export", "query_string": b"", "headers": headers})
+
+
+async def _export(ids, if_none_match: str = None):
+    db = SessionLocal()
+    try:
+        return await export_intel(ExportRequest(ids=ids), db, current_user=None, request=_request(if_none_match))
+    finally:
+        db.close()
+
+
+def _file_body(response) -> bytes:
+    """Body of a cache hit, which is sent from the cached file"""
+    if not isinstance(response, FileResponse):
+        raise AssertionError(f"cache hit not served from disk: {type(response).__name__}")
+    with open(response.path, "rb") as f:
+        return f.read()
+
+
+async def test_repeat_exports_hit_the_cache():
+    prefix = f"test-export-cache-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 3, content="正文" * 200)
+    export_cache.configure()
+    try:
+        first = await _export(ids)
+        etag = first.headers["etag"]
+        second = await _export(ids)
+        stats = export_cache.stats()
+        if _file_body(second) != first.body or second.headers["etag"] != etag or stats["hits"] != 1 or stats["stored"] != 1:
+            raise AssertionError(f"repeat export not served from the cache: {stats!r}")
+        if second.headers["content-disposition"] != first.headers["content-disposition"]:
+            raise AssertionError("cached export lost its file name")
+        if (await _export(ids[::-1])).headers["etag"] == etag:
+            raise AssertionError("a different item order must be a different document")
+
+        not_modified = await _export(ids, if_none_match=f'W/"other", {etag}')
+        if not_modified.status_code != 304 or not_modified.body or not_modified.headers["etag"] != etag:
+            raise AssertionError("matching If-None-Match did not get a 304")
+        if (await _export(ids, if_none_match='"other"')).status_code != 200:
+            raise AssertionError("stale If-None-Match got a 304")
+
+        # An ingest upsert of a member drops its entries (both orders) and changes the address.
+        db = SessionLocal()
+        try:
+            edited = IntelItem(id=ids[1], title="改过的标题", summary="价值点1", source="test", time="2025/08/01 00:00", timestamp=1.0, tags=[Tag(label="日本", color="red")])
+            crud.upsert_intel_items(db, [edited])
+        finally:
+            db.close()
+        dropped = export_cache.invalidate([ids[1]])
+        hits = export_cache.stats()["hits"]
+        third = await _export(ids)
+        if dropped != 2 or third.headers["etag"] == etag or export_cache.stats()["hits"] != hits:
+            raise AssertionError(f"upsert did not invalidate the export ({dropped} dropped)")
+
+        # A write through another path changes the address even without invalidation.
+        etag = third.headers["etag"]
+        db = SessionLocal()
+        try:
+            await toggle_favorite(ids[0], FavoriteToggleRequest(favorited=True), db, current_user=None)
+        finally:
+            db.close()
+        if (await _export(ids, if_none_match=etag)).status_code == 304:
+            raise AssertionError("favoriting a member did not change the export address")
+    finally:
+        export_cache.stop()
+        export_cache.configure()
+        cleanup(prefix)
+
+
+def test_lru_size_cap():
+    export_cache.configure(max_bytes=250)
+    try:
+        for key in ("a", "b", "c"):
+            export_cache.put_bytes(key, key.encode() * 100, f"{key}.docx", [f"item-{key}", "shared"])
+            if key == "b":
+                export_cache.get("a")
+        stats = export_cache.stats()
+        if export_cache.get("b") is not None or export_cache.get("a") is None or export_cache.get("c") is None:
+            raise AssertionError("least recently used entry not the one evicted")
+        if stats["bytes"] != 200 or stats["evicted"] != 1:
+            raise AssertionError(f"unexpected cache size: {stats!r}")
+        if export_cache.put_bytes("big", b"x" * 300, "big.docx", []) is not None:
+            raise AssertionError("entry larger than the cap was stored")
+        path = export_cache.get("a").path
+        if export_cache.invalidate(["shared"]) != 2 or os.path.exists(path) or export_cache.stats()["entries"]:
+            raise AssertionError("invalidation left entries or files behind")
+    finally:
+        export_cache.stop()
+        export_cache.configure()
+
+
+async def test_job_result_is_cached():
+    prefix = f"test-export-cache-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 30, content="正文" * 200)
+    export_jobs.configure(workers=1, sync_max_items=10)
+    export_cache.configure()
+    try:
+        accepted = await _export(ids)
+        job = export_jobs.get(json.loads(accepted.body)["job_id"])
+        async for _ in export_jobs.follow(job):
+            pass
+        for _ in range(100):
+            if export_cache.stats()["stored"]:
+                break
+            await asyncio.sleep(0.05)
+        cached = await _export(ids)
+        with open(job.path, "rb") as f:
+            rendered = f.read()
+        if cached.status_code != 200 or _file_body(cached) != rendered:
+            raise AssertionError("finished job was not served from the cache")
+    finally:
+        await export_jobs.stop()
+        export_jobs.configure()
+        export_cache.stop()
+        export_cache.configure()
+        cleanup(prefix)
+
+
+async def run_benchmark(count: int = 50, rounds: int = 20):
+    prefix = f"test-export-cache-bench-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, count, content="正文" * 200)
+    export_cache.configure()
+    try:
+        timings = {}
+        for name in ("render", "cached"):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                if name == "render":
+                    export_cache.clear()
+                await _export(ids)
+            timings[name] = (time.perf_counter() - started) / rounds
+        print(
+            f"docx export of {count} items: {timings['render'] * 1000:.1f}ms rendered, "
+            f"{timings['cached'] * 1000:.1f}ms from the cache ({timings['render'] / timings['cached']:.1f}x)"
+        )
+        if timings["cached"] > timings["render"]:
+            raise AssertionError("cache hit slower than rendering")
+    finally:
+        export_cache.stop()
+        export_cache.configure()
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_repeat_exports_hit_the_cache())
+    test_lru_size_cap()
+    asyncio.run(test_job_result_is_cached())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("export cache tests passed")
@@ -0,0 +1,183 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from docx import Document
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from intel_fixtures import cleanup, ensure_schema, insert_items
+
+from app.database import SessionLocal
+from app.models import ExportRequest
+from app.routes.intel import download_export_job, export_intel, get_export_job
+from app.services.docx_export import render_docx_bytes
+from app.services.export_jobs import export_jobs
+
+
+async def _export(req: ExportRequest):
+    db = SessionLocal()
+    try:
+        return await export_intel(req, db, current_user=None)
+    finally:
+        db.close()
+
+
+async def _call_asgi(response, headers=()):
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": list(headers)}
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await response(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+async def _loop_lag_while(awaitable):
+    """Longest stall of a 5ms ticker while `awaitable` runs"""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - before - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    try:
+        return_value = await awaitable
+    finally:
+        done.set()
+        await tick
+    return worst, return_value
+
+
+async def test_large_export_runs_as_job():
+    prefix = f"test-export-job-{uuid.uuid4().hex}"
+    ids = insert_items(prefix, 120, title=lambda i: f"标题{i}", content="正文" * 200, timestamp=lambda i: float(i), is_hot=False)
+    export_jobs.configure(workers=1, sync_max_items=10, ttl_seconds=1)
+    try:
+        small = await _export(ExportRequest(ids=ids[:2]))
+        if isinstance(small, JSONResponse) or not small.body.startswith(b"PK"):
+            raise AssertionError("small exports should keep the direct DOCX response")
+
+        accepted = await _export(ExportRequest(ids=ids))
+        job = json.loads(accepted.body)
+        if accepted.status_code != 202 or job["status"] != "queued" or job["total"] != 120:
+            raise AssertionError(f"large export not queued as a job: {job!r}")
+
+        frames = [f async for f in export_jobs.follow(export_jobs.get(job["job_id"]))]
+        events = [(f.split("\n")[0][len("event: "):], json.loads(f.split("data: ", 1)[1])) for f in frames]
+        statuses = [d["status"] for e, d in events if e == "status"]
+        progress = [d["done"] for e, d in events if e == "progress"]
+        if statuses != ["queued", "running", "done"] or progress != sorted(progress) or progress[-1] != 120:
+            raise AssertionError(f"unexpected job events: {events!r}")
+        # Frames the worker reported while rendering, not only the final count.
+        if not any(0 < done < 120 for done in progress):
+            raise AssertionError(f"no intermediate progress before done: {progress!r}")
+
+        status = await get_export_job(job["job_id"], current_user=None)
+        if status.status != "done" or not status.size:
+            raise AssertionError(f"unexpected job status: {status!r}")
+        response = await download_export_job(job["job_id"], current_user=None)
+        code, headers, body = await _call_asgi(response)
+        paragraphs = [p.text for p in Document(io.BytesIO(body)).paragraphs if p.text.strip()]
+        if code != 200 or len(body) != status.size or "标题119" not in paragraphs or b"attachment" not in headers[b"content-disposition"]:
+            raise AssertionError("downloaded file does not hold the export")
+        code, headers, part = await _call_asgi(response, [(b"range", b"bytes=100-199")])
+        if code != 206 or part != body[100:200]:
+            raise AssertionError(f"range request not honoured: {code}")
+
+        await asyncio.sleep(2.1)
+        try:
+            await get_export_job(job["job_id"], current_user=None)
+            raise AssertionError("finished job not evicted after its TTL")
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+        if os.path.exists(response.path):
+            raise AssertionError("export file not removed with its job")
+    finally:
+        await export_jobs.stop()
+        export_jobs.configure()
+        cleanup(prefix)
+
+
+async def test_failed_render_is_reported():
+    export_jobs.configure(workers=1)
+    try:
+        job = await export_jobs.submit([{"title": "no other fields"}], "x.docx")
+        statuses = [f for f in [f async for f in export_jobs.follow(job)] if f.startswith("event: status")]
+        if job.status != "failed" or "failed" not in statuses[-1] or not job.error:
+            raise AssertionError(f"failed render not reported: {job.status} {job.error!r}")
+        try:
+            await download_export_job(job.id, current_user=None)
+            raise AssertionError("download of a failed job did not 409")
+        except HTTPException as e:
+            if e.status_code != 409:
+                raise
+    finally:
+        await export_jobs.stop()
+        export_jobs.configure()
+
+
+async def run_benchmark(count: int = 1000):
+    items = [
+        {"title": f"标题{i}", "summary": f"价值点{i}", "content": "正文" * 200, "source": "test", "url": None, "time": "", "tags": ["日本"]}
+        for i in range(count)
+    ]
+
+    async def inline_run():
+        await asyncio.sleep(0.01)
+        return render_docx_bytes(items)
+
+    inline_lag, _ = await _loop_lag_while(inline_run())
+    export_jobs.configure(workers=2)
+    try:
+        await export_jobs.start()
+        started = time.perf_counter()
+
+        async def job_run():
+            job = await export_jobs.submit(items, "bench.docx")
+            async for _ in export_jobs.follow(job):
+                pass
+            return job
+
+        job_lag, job = await _loop_lag_while(job_run())
+        took = time.perf_counter() - started
+    finally:
+        await export_jobs.stop()
+        export_jobs.configure()
+    print(
+        f"docx export of {count} items: rendered on the loop it stalls it {inline_lag * 1000:.0f}ms; "
+        f"as a job it finished in {took:.1f}s ({job.status}) with a worst loop stall of {job_lag * 1000:.1f}ms"
+    )
+    if job.status != "done" or job_lag > 0.1:
+        raise AssertionError("export job blocked the event loop")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_large_export_runs_as_job())
+    asyncio.run(test_failed_render_is_reported())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("export job tests passed")
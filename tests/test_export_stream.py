@@ -0,0 +1,102 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from fastapi import HTTPException
+
+from intel_fixtures import cleanup, ensure_schema, insert_items
+
+from app.agent.orchestrator import orchestrator
+from app.database import SessionLocal
+from app.models import ExportRequest
+from app.routes.intel import export_intel
+
+
+def _insert(prefix: str, count: int, token: str):
+    insert_items(
+        prefix,
+        count,
+        title=lambda i: f"{token} 标题 {i}, \"quoted\"",
+        summary=lambda i: f"摘要 {i}\n第二行",
+        content="正文" * 20,
+        # Every timestamp is shared by three rows, so paging has to break ties by id.
+        timestamp=lambda i: 1_000_000.0 + i // 3,
+        tags=[{"label": "日本", "color": "red"}, "芯片"],
+        is_hot=lambda i: i % 2 == 0,
+    )
+
+
+async def _export(req: ExportRequest):
+    db = SessionLocal()
+    try:
+        res = await export_intel(req, db, current_user=None)
+    finally:
+        db.close()
+    chunks = [chunk async for chunk in res.body_iterator]
+    return res, chunks
+
+
+async def test_ndjson_keyset_pages_in_list_order():
+    prefix = f"test-export-stream-{uuid.uuid4().hex}"
+    token = uuid.uuid4().hex
+    _insert(prefix, 1201, token)
+    try:
+        res, chunks = await _export(ExportRequest(format="json", q=token))
+        rows = [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+        if res.media_type != "application/x-ndjson" or len(chunks) < 3:
+            raise AssertionError(f"expected a chunked NDJSON stream, got {len(chunks)} chunks")
+        expected = sorted((f"{prefix}-{i:05d}" for i in range(1201)), key=lambda x: (int(x[-5:]) // 3, x), reverse=True)
+        if [r["id"] for r in rows] != expected:
+            raise AssertionError("rows missing, repeated or out of order across chunk boundaries")
+        if rows[0]["tags"] != [{"label": "日本", "color": "red"}, {"label": "芯片", "color": "blue"}] or rows[0]["time"] != "2025/08/01 00:00":
+            raise AssertionError(f"unexpected row: {rows[0]!r}")
+
+        _, chunks = await _export(ExportRequest(format="json", q=token, type="history"))
+        ids = [json.loads(line)["id"] for line in b"".join(chunks).decode("utf-8").splitlines()]
+        if len(ids) != 600 or len(set(ids)) != 600 or any(int(x[-5:]) % 2 == 0 for x in ids):
+            raise AssertionError(f"history export selected {len(ids)} rows")
+    finally:
+        cleanup(prefix)
+
+
+async def test_csv_by_ids_with_cache_fallback():
+    prefix = f"test-export-stream-{uuid.uuid4().hex}"
+    _insert(prefix, 3, uuid.uuid4().hex)
+    cached_id = f"{prefix}-cache"
+    cached = {"id": cached_id, "title": "标题CACHE", "summary": "价值点CACHE", "time": "", "timestamp": 2.0, "tags": ["美国"]}
+    orchestrator.global_cache.append(cached)
+    try:
+        ids = [f"{prefix}-00002", cached_id, f"{prefix}-00000"]
+        res, chunks = await _export(ExportRequest(format="csv", ids=ids))
+        text = b"".join(chunks).decode("utf-8")
+        if not text.startswith("﻿id,title,") or not res.media_type.startswith("text/csv"):
+            raise AssertionError("CSV header or BOM missing")
+        records = list(csv.DictReader(io.StringIO(text[1:])))
+        if [r["id"] for r in records] != ids:
+            raise AssertionError(f"ids not exported in request order: {[r['id'] for r in records]!r}")
+        if records[0]["tags"] != "日本; 芯片" or records[0]["summary"] != "摘要 2\n第二行" or records[1]["title"] != "标题CACHE":
+            raise AssertionError(f"unexpected CSV record: {records[:2]!r}")
+
+        try:
+            await _export(ExportRequest(format="csv", ids=[f"{prefix}-missing"]))
+            raise AssertionError("unknown id did not 404")
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+    finally:
+        orchestrator.global_cache.remove(cached)
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_ndjson_keyset_pages_in_list_order())
+    asyncio.run(test_csv_by_ids_with_cache_fallback())
+    print("export stream tests passed")
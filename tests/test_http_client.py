@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from app.services.http_client import HttpClient
+
+
+async def _start_server():
+    async def ok(request):
+        return web.json_response({"docs": [{"id": 1, "title": "x" * 2000}]})
+
+    async def slow(request):
+        await asyncio.sleep(1.0)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/slow", slow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def test_keepalive_reuse_and_metrics():
+    runner, base = await _start_server()
+    client = HttpClient()
+    client.configure(limit_per_host=4, read_timeout=0.2)
+    try:
+        session = client.get_session()
+        for _ in range(5):
+            async with session.get(f"{base}/ok") as resp:
+                data = await resp.json()
+                if resp.status != 200 or data["docs"][0]["id"] != 1:
+                    raise AssertionError("unexpected response")
+
+        if client.get_session() is not session:
+            raise AssertionError("session should be shared within the same loop")
+
+        stats = client.get_stats()
+        if stats["pool"]["connections_created"] != 1 or stats["pool"]["connections_reused"] != 4:
+            raise AssertionError(f"keep-alive connection not reused: {stats['pool']!r}")
+
+        try:
+            async with session.get(f"{base}/slow") as resp:
+                await resp.read()
+            raise AssertionError("read timeout not applied")
+        except asyncio.TimeoutError:
+            pass
+
+        host = next(iter(client.get_stats()["hosts"].values()))
+        if host["requests"] != 6 or host["errors"] != 1 or host["status_counts"].get(200) != 5:
+            raise AssertionError(f"unexpected host metrics: {host!r}")
+        if host["latency_ms_max"] <= 0:
+            raise AssertionError("latency not recorded")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_keepalive_reuse_and_metrics())
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import crud, db_models
+from app.agent.orchestrator import orchestrator
+from app.database import SessionLocal
+from app.models import IntelItem
+from app.services.ingest_pipeline import IngestPipeline, ingest_pipeline
+from app.services.payload_poller import PayloadPoller
+from app.services.dedup_window import DedupWindow, NEW, UPDATED, UNCHANGED
+
+
+async def test_payload_poller_feeds_pipeline_in_order():
+    prefix = f"test-pipe-{uuid.uuid4().hex}"
+    poller = PayloadPoller()
+    poller.configure("http://cms.local", "posts", "a@b.c", "pw")
+    docs = [
+        {"id": i, "title": f"t{i}", "summary": "s", "thingId": f"{prefix}-{i}", "publishDate": f"2026-01-01T00:00:0{i}Z", "domain": ["科技安全"]}
+        for i in range(5)
+    ]
+
+    q = asyncio.Queue()
+    orchestrator.listeners.append(q)
+    try:
+        count = await poller._process_data({"docs": docs})
+        if count != 5:
+            raise AssertionError(f"unexpected new count: {count}")
+        await ingest_pipeline.drain()
+
+        ids = []
+        while not q.empty():
+            msg = q.get_nowait()
+            data = json.loads(msg.split("data: ", 1)[1])
+            if msg.startswith("event: new_intel_batch\n"):
+                ids.extend(x["id"] for x in data)
+            elif msg.startswith("event: new_intel\n"):
+                ids.append(data["id"])
+        expected = [f"{prefix}-{i}" for i in range(5)]
+        if ids != expected:
+            raise AssertionError(f"unexpected broadcast order: {ids!r}")
+
+        db = SessionLocal()
+        try:
+            stored = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.like(f"{prefix}-%")).count()
+        finally:
+            db.close()
+        if stored != 5:
+            raise AssertionError(f"expected 5 persisted rows, got {stored}")
+
+        stats = ingest_pipeline.get_stats()["stages"]
+        if stats["persist"]["processed"] < 5 or stats["broadcast"]["processed"] < 5:
+            raise AssertionError(f"stage counters not updated: {stats!r}")
+        await ingest_pipeline.stop()
+    finally:
+        orchestrator.listeners.remove(q)
+        cleanup(prefix)
+
+
+def test_dedup_window_evicts_least_recently_seen():
+    window = DedupWindow(max_entries=3)
+    for key in ("a", "b", "c"):
+        window.classify(key, "v1", {"k": key})
+    # Touching "a" makes "b" the oldest entry.
+    if window.classify("a", "v1", {"k": "a"}) != UNCHANGED:
+        raise AssertionError("same updatedAt not recognised as unchanged")
+    window.classify("d", "v1", {"k": "d"})
+    if window.classify("a", "v1", {"k": "a"}) != UNCHANGED or window.classify("b", "v1", {"k": "b"}) != NEW:
+        raise AssertionError(f"eviction was not least-recently-seen: {window.stats()!r}")
+    if window.classify("d", "v2", {"k": "d"}) != UNCHANGED:
+        raise AssertionError("bumped updatedAt without a content change counted as an edit")
+    if window.classify("d", "v3", {"k": "d2"}) != UPDATED:
+        raise AssertionError("content change not detected")
+
+
+async def test_payload_poller_skips_unchanged_and_broadcasts_edits():
+    prefix = f"test-pipe-{uuid.uuid4().hex}"
+    poller = PayloadPoller()
+    poller.configure("http://cms.local", "posts", "a@b.c", "pw")
+    docs = [
+        {"id": i, "title": f"t{i}", "summary": "s", "thingId": f"{prefix}-{i}", "updatedAt": "2026-01-01T00:00:00Z"}
+        for i in range(3)
+    ]
+
+    q = asyncio.Queue()
+    orchestrator.listeners.append(q)
+    try:
+        if await poller._process_data({"docs": docs}) != 3:
+            raise AssertionError("first poll did not queue all docs")
+        if await poller._process_data({"docs": docs}) != 0:
+            raise AssertionError("unchanged docs were queued again")
+        edited = dict(docs[1], title="t1 edited", updatedAt="2026-01-01T00:01:00Z")
+        if await poller._process_data({"docs": [docs[0], edited, docs[2]]}) != 1:
+            raise AssertionError("edited doc was not queued exactly once")
+        await ingest_pipeline.drain()
+
+        events = []
+        while not q.empty():
+            msg = q.get_nowait()
+            event = msg.split("\n", 1)[0][len("event: "):]
+            data = json.loads(msg.split("data: ", 1)[1].split("\n", 1)[0])
+            events.append((event, data))
+        updates = [data for event, data in events if event == "intel_updated"]
+        if len(updates) != 1 or updates[0]["id"] != f"{prefix}-1" or updates[0]["title"] != "t1 edited":
+            raise AssertionError(f"expected one intel_updated event for the edit: {events!r}")
+        await ingest_pipeline.stop()
+    finally:
+        orchestrator.listeners.remove(q)
+        cleanup(prefix)
+
+
+async def test_in_flight_duplicates_are_dropped():
+    prefix = f"test-pipe-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    pipeline.configure(persist_batch_wait=0.2)
+
+    def normalize(version):
+        return IntelItem(id=f"{prefix}-dup", title=f"v{version}", summary="s", source="test", time="", timestamp=1.0, tags=[])
+
+    try:
+        await pipeline.submit_many([1, 1, 1, 2], normalize, source="test")
+        await pipeline.drain()
+        stats = pipeline.get_stats()["stages"]
+        if stats["dedup"]["dropped"] != 2 or stats["persist"]["processed"] != 2:
+            raise AssertionError(f"in-flight duplicates not collapsed: {stats!r}")
+
+        db = SessionLocal()
+        try:
+            row = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id == f"{prefix}-dup").first()
+        finally:
+            db.close()
+        if not row or row.title != "v2":
+            raise AssertionError("edited version queued behind an in-flight one was lost")
+    finally:
+        await pipeline.stop()
+        cleanup(prefix)
+
+
+async def test_failed_persist_is_retried():
+    prefix = f"test-pipe-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    pipeline.configure(persist_retry_wait=0.01)
+    upsert = crud.upsert_intel_items
+    calls = []
+
+    def flaky_upsert(db, items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return upsert(db, items)
+
+    crud.upsert_intel_items = flaky_upsert
+    try:
+        await pipeline.submit(1, lambda i: IntelItem(id=f"{prefix}-{i}", title="t", summary="s", source="test", time="", timestamp=1.0, tags=[]), source="test")
+        await pipeline.drain()
+        stats = pipeline.get_stats()["stages"]["persist"]
+        if len(calls) != 2 or stats["retried"] != 1 or stats["errors"] or stats["processed"] != 1:
+            raise AssertionError(f"failed upsert not retried: {calls!r} {stats!r}")
+
+        db = SessionLocal()
+        try:
+            row = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id == f"{prefix}-1").first()
+        finally:
+            db.close()
+        if row is None:
+            raise AssertionError("item lost after a transient upsert failure")
+    finally:
+        crud.upsert_intel_items = upsert
+        await pipeline.stop()
+        cleanup(prefix)
+
+
+async def test_full_queue_applies_backpressure():
+    prefix = f"test-pipe-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    pipeline.configure(queue_size=1)
+
+    def slow_normalize(i):
+        time.sleep(0.05)
+        return IntelItem(id=f"{prefix}-{i}", title="t", summary="s", source="test", time="", timestamp=float(i), tags=[])
+
+    try:
+        started = time.monotonic()
+        await pipeline.submit_many(range(6), slow_normalize, source="test")
+        if time.monotonic() - started < 0.15:
+            raise AssertionError("submit did not block on a full queue")
+        await pipeline.drain()
+    finally:
+        await pipeline.stop()
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_payload_poller_feeds_pipeline_in_order())
+    test_dedup_window_evicts_least_recently_seen()
+    asyncio.run(test_payload_poller_skips_unchanged_and_broadcasts_edits())
+    asyncio.run(test_in_flight_duplicates_are_dropped())
+    asyncio.run(test_failed_persist_is_retried())
+    asyncio.run(test_full_queue_applies_backpressure())
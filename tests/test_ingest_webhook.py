@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import aiohttp
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+os.environ["INGEST_WEBHOOK_SECRET"] = "test-webhook-secret"
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import db_models
+from app.database import SessionLocal
+from app.routes.ingest import ingest_webhook
+from app.services.auth_utils import sign_webhook_body, create_access_token, get_password_hash
+from app.services.ingest_pipeline import ingest_pipeline
+
+SECRET = os.environ["INGEST_WEBHOOK_SECRET"]
+
+
+def _make_request(body: bytes, headers: dict) -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/ingest/webhook",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def _signature_headers(body: bytes, sent_at: float = None) -> dict:
+    timestamp = str(int(time.time() if sent_at is None else sent_at))
+    return {"X-Ingest-Timestamp": timestamp, "X-Ingest-Signature": sign_webhook_body(SECRET, timestamp, body)}
+
+
+def _signed(payload, **extra_headers):
+    body = json.dumps(payload).encode("utf-8")
+    return _make_request(body, {**_signature_headers(body), **extra_headers})
+
+
+async def _rejected(request) -> bool:
+    try:
+        await ingest_webhook(request)
+    except HTTPException as e:
+        if e.status_code != 401:
+            raise AssertionError(f"unexpected status for a rejected signature: {e.status_code}")
+        return True
+    return False
+
+
+async def test_webhook_signature_and_idempotency():
+    prefix = f"test-hook-{uuid.uuid4().hex}"
+    doc = {"id": 1, "title": "t", "summary": "s", "thingId": f"{prefix}-1", "updatedAt": "2026-01-01T00:00:00Z"}
+    try:
+        body = json.dumps({"doc": doc}).encode("utf-8")
+        if not await _rejected(_make_request(body, {**_signature_headers(body), "X-Ingest-Signature": "sha256=deadbeef"})):
+            raise AssertionError("bad signature accepted")
+        # A captured delivery replayed after the tolerance, or with a fresh timestamp it was not signed with.
+        captured = _signature_headers(body, sent_at=time.time() - 3600)
+        if not await _rejected(_make_request(body, captured)):
+            raise AssertionError("delivery older than the tolerance accepted")
+        if not await _rejected(_make_request(body, dict(captured, **{"X-Ingest-Timestamp": str(int(time.time()))}))):
+            raise AssertionError("timestamp not covered by the signature")
+        if not await _rejected(_make_request(body, {"X-Ingest-Signature": _signature_headers(body)["X-Ingest-Signature"]})):
+            raise AssertionError("delivery without a timestamp accepted")
+
+        key = uuid.uuid4().hex
+        res = await ingest_webhook(_signed({"doc": doc}, **{"Idempotency-Key": key}))
+        if res["accepted"] != 1:
+            raise AssertionError(f"unexpected first delivery result: {res!r}")
+
+        res = await ingest_webhook(_signed({"doc": doc}, **{"Idempotency-Key": key}))
+        if not res["replayed"]:
+            raise AssertionError(f"redelivery with same Idempotency-Key not detected: {res!r}")
+
+        res = await ingest_webhook(_signed({"docs": [doc]}))
+        if res["accepted"] != 0 or res["duplicates"] != 1:
+            raise AssertionError(f"same doc version not deduplicated: {res!r}")
+
+        edited = dict(doc, title="t2", updatedAt="2026-01-01T00:05:00Z")
+        res = await ingest_webhook(_signed({"doc": edited}))
+        if res["accepted"] != 1:
+            raise AssertionError(f"edited doc not accepted: {res!r}")
+
+        await ingest_pipeline.drain()
+        db = SessionLocal()
+        try:
+            row = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id == f"{prefix}-1").first()
+        finally:
+            db.close()
+        if not row or row.title != "t2":
+            raise AssertionError("webhook edit was not upserted")
+    finally:
+        await ingest_pipeline.stop()
+        cleanup(prefix)
+
+
+class StandInCms:
+    """Publishes docs and fires a signed afterChange hook, like Payload would"""
+
+    def __init__(self, hook_url: str, session: aiohttp.ClientSession):
+        self.hook_url = hook_url
+        self.session = session
+        self.next_id = 1
+
+    async def publish(self, prefix: str) -> str:
+        doc_id = self.next_id
+        self.next_id += 1
+        now = datetime.now(timezone.utc).isoformat()
+        doc = {"id": doc_id, "title": f"hook {doc_id}", "summary": "s", "thingId": f"{prefix}-{doc_id}", "publishDate": now, "updatedAt": now}
+        body = json.dumps({"operation": "create", "doc": doc}).encode("utf-8")
+        headers = {"Content-Type": "application/json", **_signature_headers(body)}
+        async with self.session.post(self.hook_url, data=body, headers=headers) as resp:
+            if resp.status != 200:
+                raise AssertionError(f"webhook delivery failed: {resp.status} {await resp.text()}")
+        return doc["thingId"]
+
+
+async def run_end_to_end_latency(samples: int = 20):
+    import uvicorn
+    from app.main import app
+
+    prefix = f"test-hook-e2e-{uuid.uuid4().hex}"
+    user_id = f"test-user-{uuid.uuid4().hex}"
+    db = SessionLocal()
+    db.add(db_models.UserDB(id=user_id, username=user_id, hashed_password=get_password_hash("pw123456")))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": user_id})
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    latencies = []
+    try:
+        async with aiohttp.ClientSession() as session:
+            cms = StandInCms(f"{base}/api/ingest/webhook", session)
+            async with session.get(f"{base}/api/agent/stream/global?token={token}&after_ts={time.time() + 3600}") as sse:
+                for _ in range(samples):
+                    started = time.perf_counter()
+                    thing_id = await cms.publish(prefix)
+                    while True:
+                        line = (await asyncio.wait_for(sse.content.readline(), timeout=5)).decode("utf-8")
+                        if line.startswith("data: ") and thing_id in line:
+                            latencies.append((time.perf_counter() - started) * 1000)
+                            break
+    finally:
+        server.should_exit = True
+        await serve_task
+        cleanup(prefix)
+        db = SessionLocal()
+        db.query(db_models.UserDB).filter(db_models.UserDB.id == user_id).delete()
+        db.commit()
+        db.close()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"webhook publish -> SSE frame latency over {len(latencies)} docs: p50={p50:.1f}ms p95={p95:.1f}ms max={latencies[-1]:.1f}ms")
+    if p95 > 1000:
+        raise AssertionError(f"webhook end-to-end latency too high: p95={p95:.1f}ms")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_webhook_signature_and_idempotency())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_end_to_end_latency())
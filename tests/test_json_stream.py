@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from app.services.json_stream import iter_json_array
+
+
+class ChunkedStream:
+    """Mimics aiohttp `response.content.read(n)` with random short reads"""
+
+    def __init__(self, data: bytes, rng: random.Random):
+        self.data = data
+        self.pos = 0
+        self.rng = rng
+
+    async def read(self, n: int = -1) -> bytes:
+        size = min(n, self.rng.randint(1, 7))
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+class GeneratedPage:
+    """A `{"docs": [...]}` body produced lazily, so the test itself never holds the whole page"""
+
+    def __init__(self, count: int, doc_size: int):
+        self.count = count
+        self.filler = "情报" * (doc_size // 6)
+        self.parts = self._parts()
+        self.pending = b""
+
+    def _parts(self):
+        yield b'{"totalDocs": %d, "docs": [' % self.count
+        for i in range(self.count):
+            doc = {"id": i, "title": f"doc {i}", "content": self.filler}
+            yield (b"," if i else b"") + json.dumps(doc, ensure_ascii=False).encode("utf-8")
+        yield b'], "hasNextPage": false}'
+
+    async def read(self, n: int = -1) -> bytes:
+        while len(self.pending) < n:
+            part = next(self.parts, None)
+            if part is None:
+                break
+            self.pending += part
+        chunk, self.pending = self.pending[:n], self.pending[n:]
+        return chunk
+
+
+async def _collect(stream, key="docs"):
+    return [doc async for doc in iter_json_array(stream, key, chunk_size=5)]
+
+
+async def test_matches_json_loads_under_arbitrary_chunking():
+    rng = random.Random(7)
+    bodies = [
+        {"docs": []},
+        {},
+        {"totalDocs": 3, "docs": [1, -2.5e3, "x\\\"y"], "page": 1},
+        {"meta": {"docs": [9]}, "docs": [{"id": 1, "title": "中文   emoji 😀", "tags": [None, True]}]},
+        {"docs": [{"id": i, "nested": {"a": [i] * i}} for i in range(30)], "hasNextPage": True},
+    ]
+    for body in bodies:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        for _ in range(20):
+            got = await _collect(ChunkedStream(raw, rng))
+            if got != body.get("docs", []):
+                raise AssertionError(f"stream decode mismatch for {body!r}: {got!r}")
+
+    for bad in (b'{"docs": [1, 2', b'["docs"]', b'{"docs": [1 2]}'):
+        try:
+            await _collect(ChunkedStream(bad, rng))
+            raise AssertionError(f"malformed body accepted: {bad!r}")
+        except ValueError:
+            pass
+
+
+async def test_peak_memory_stays_flat():
+    count, doc_size = 2000, 8 * 1024
+    tracemalloc.start()
+    try:
+        seen = 0
+        async for doc in iter_json_array(GeneratedPage(count, doc_size)):
+            if doc["id"] != seen:
+                raise AssertionError(f"out of order doc {doc['id']} (expected {seen})")
+            seen += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    page_bytes = count * doc_size
+    print(f"streamed {seen} docs (~{page_bytes // (1024 * 1024)} MiB page), peak traced memory {peak / 1024:.0f} KiB")
+    if seen != count:
+        raise AssertionError(f"expected {count} docs, got {seen}")
+    if peak > page_bytes / 20:
+        raise AssertionError(f"peak memory {peak} grows with page size ({page_bytes} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_matches_json_loads_under_arbitrary_chunking())
+    asyncio.run(test_peak_memory_stays_flat())
+    print("json stream tests passed")
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import StatementCounter, cleanup, ensure_schema, insert_items
+
+from app.database import SessionLocal
+from app.models import FavoriteToggleRequest, IntelItem
+from app.routes.intel import get_favorites, get_intel, toggle_favorite
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.list_cache import ListCache, list_cache
+
+
+def _insert(prefix: str, count: int, is_hot: bool = True):
+    now = time.time()
+    return insert_items(prefix, count, timestamp=lambda i: now - 60 - i, is_hot=is_hot)
+
+
+async def _page(type: str, q: str, limit: int = 20):
+    return json.loads((await get_intel(type=type, q=q, range="all", limit=limit, offset=0, current_user=None)).body)
+
+
+async def test_ingest_and_favorites_invalidate_their_pages():
+    prefix = f"test-list-cache-{uuid.uuid4().hex}"
+    hot = _insert(prefix, 3)
+    _insert(f"{prefix}-h", 2, is_hot=False)
+    list_cache.configure()
+    try:
+        first = await _page("hot", prefix)
+        history = await _page("history", prefix)
+        if await _page("hot", prefix) != first or list_cache.stats()["hits"] != 1:
+            raise AssertionError(f"repeat page not served from the cache: {list_cache.stats()!r}")
+
+        # A new hot item reaches the hot page before its broadcast; the history page stays cached.
+        pipeline = IngestPipeline()
+        item = IntelItem(id=f"{prefix}-new", title=f"{prefix} 新标题", summary="新价值点", source="test", time="", timestamp=time.time(), tags=[], is_hot=True)
+        await pipeline.submit_many([item], lambda x: x, source="test")
+        await pipeline.drain()
+        page = await _page("hot", prefix)
+        if page["total"] != 4 or page["items"][0]["id"] != item.id:
+            raise AssertionError(f"ingested item missing from the hot page: {page['total']}")
+        hits = list_cache.stats()["hits"]
+        if await _page("history", prefix) != history or list_cache.stats()["hits"] != hits + 1:
+            raise AssertionError("a hot insert invalidated the history page")
+
+        favorites = json.loads((await get_favorites(q=prefix, limit=20, offset=0, current_user=None)).body)
+        db = SessionLocal()
+        try:
+            await toggle_favorite(hot[1], FavoriteToggleRequest(favorited=True), db, current_user=None)
+        finally:
+            db.close()
+        after = json.loads((await get_favorites(q=prefix, limit=20, offset=0, current_user=None)).body)
+        if favorites["total"] != 0 or [x["id"] for x in after["items"]] != [hot[1]]:
+            raise AssertionError("favorite toggle did not reach the favorites page")
+        if not next(x for x in (await _page("hot", prefix))["items"] if x["id"] == hot[1])["favorited"]:
+            raise AssertionError("favorite toggle did not reach the list page showing the item")
+    finally:
+        list_cache.configure()
+        cleanup(prefix)
+
+
+async def test_concurrent_misses_share_one_query():
+    prefix = f"test-list-cache-{uuid.uuid4().hex}"
+    _insert(prefix, 5)
+    list_cache.configure()
+    try:
+        with StatementCounter() as statements:
+            pages = await asyncio.gather(*(_page("hot", prefix) for _ in range(20)))
+        stats = list_cache.stats()
+        if any(p != pages[0] for p in pages) or pages[0]["total"] != 5:
+            raise AssertionError("coalesced callers got different pages")
+        # one count and one select
+        if statements.count != 2 or stats["misses"] != 1 or stats["coalesced"] != 19:
+            raise AssertionError(f"{statements.count} statements for 20 identical misses: {stats!r}")
+    finally:
+        list_cache.configure()
+        cleanup(prefix)
+
+
+async def test_invalidation_during_a_load():
+    cache = ListCache()
+    cache.configure(max_entries=2)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_load():
+        started.set()
+        await release.wait()
+        return b"stale", ["a"]
+
+    first = asyncio.create_task(cache.get_or_load("k", frozenset({"hot"}), slow_load))
+    await started.wait()
+    cache.invalidate(["a"])
+    # A request after the change must not join the load that predates it.
+    fresh = await cache.get_or_load("k", frozenset({"hot"}), lambda: asyncio.sleep(0, (b"fresh", ["a"])))
+    release.set()
+    if (await first).body != b"stale" or fresh.body != b"fresh":
+        raise AssertionError("callers got the wrong bodies")
+    if (await cache.get_or_load("k", frozenset({"hot"}), slow_load)).body != b"fresh":
+        raise AssertionError("the load that overlapped the invalidation replaced the fresh page")
+
+    for key in ("x", "y"):
+        await cache.get_or_load(key, frozenset({"favorites"}), lambda: asyncio.sleep(0, (b"", ["b"])))
+    if cache.stats()["entries"] != 2 or cache.stats()["evicted"] != 1:
+        raise AssertionError(f"least recently used page not evicted: {cache.stats()!r}")
+    if cache.invalidate(scopes=["favorites"]) != 2 or cache.invalidate(["b"]) != 0:
+        raise AssertionError("scope invalidation did not drop the favorites pages")
+
+
+async def run_benchmark(clients: int = 200, count: int = 1000):
+    prefix = f"test-list-cache-bench-{uuid.uuid4().hex}"
+    _insert(prefix, count)
+    try:
+        timings = {}
+        for name, enabled in (("uncached", False), ("cached", True)):
+            list_cache.configure(enabled=enabled)
+            started = time.perf_counter()
+            with StatementCounter() as statements:
+                await asyncio.gather(*(_page("hot", None) for _ in range(clients)))
+            timings[name] = (time.perf_counter() - started, statements.count)
+        print(
+            f"{clients} concurrent requests for the default hot page: "
+            f"{timings['uncached'][0] * 1000:.0f}ms uncached ({timings['uncached'][1]} statements), "
+            f"{timings['cached'][0] * 1000:.0f}ms cached ({timings['cached'][1]} statements)"
+        )
+        if timings["cached"][1] > 2:
+            raise AssertionError("identical requests were not coalesced")
+    finally:
+        list_cache.configure()
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_ingest_and_favorites_invalidate_their_pages())
+    asyncio.run(test_concurrent_misses_share_one_query())
+    asyncio.run(test_invalidation_during_a_load())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("list cache tests passed")
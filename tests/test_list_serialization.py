@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from intel_fixtures import cleanup, ensure_schema, insert_items
+
+from app import crud, db_models
+from app.database import SessionLocal
+from app.models import FavoriteToggleRequest, IntelItem, IntelListResponse
+from app.routes.intel import get_favorites, get_intel, toggle_favorite
+from app.services.list_cache import list_cache
+
+
+def _insert(prefix: str, count: int):
+    insert_items(
+        prefix,
+        count,
+        content=lambda i: "正文" * 100 if i % 3 else None,
+        url=lambda i: f"https://example.com/{i}" if i % 2 else None,
+        timestamp=lambda i: 3_000_000.0 + i,
+        # Rows written before colors were checked may hold any color.
+        tags=lambda i: [{"label": "日本", "color": "red"}, "芯片"] if i % 2 else [{"label": "旧", "color": "green"}],
+        is_hot=False,
+        favorited=lambda i: i % 4 == 0,
+        thing_id=lambda i: f"thing-{i}" if i % 5 == 0 else None,
+    )
+
+
+_LIST_FIELD = create_model_field(name="Response_get_intel", type_=IntelListResponse, mode="serialization")
+
+
+async def _validated_body(items, total) -> bytes:
+    """What FastAPI's response_model path produced for a list page before the fast path"""
+    content = await serialize_response(field=_LIST_FIELD, response_content={"items": items, "total": total})
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+async def test_list_pages_match_the_schema():
+    prefix = f"test-list-serialization-{uuid.uuid4().hex}"
+    _insert(prefix, 30)
+    db = SessionLocal()
+    try:
+        fast = await get_intel(type="all", q=prefix, range="all", limit=50, offset=0, current_user=None)
+        items, total = crud.get_filtered_intel(db, q=prefix, limit=50)
+        if fast.media_type != "application/json" or total != 30:
+            raise AssertionError(f"unexpected list response: {fast.media_type}, total={total}")
+        if json.loads(fast.body) != json.loads(await _validated_body(items, total)):
+            raise AssertionError("fast list body differs from the validated response")
+        IntelListResponse.model_validate_json(fast.body)
+
+        await toggle_favorite(f"{prefix}-00001", FavoriteToggleRequest(favorited=True), db, current_user=None)
+        fast = await get_favorites(q=prefix, limit=50, offset=0, current_user=None)
+        items, total = crud.get_favorites(db, q=prefix, limit=50)
+        body = json.loads(fast.body)
+        if body != json.loads(await _validated_body(items, total)) or total != 9:
+            raise AssertionError("fast favorites body differs from the validated response")
+        if any(x["content"] is not None or x["thing_id"] is not None for x in body["items"]):
+            raise AssertionError("favorites list must not carry content or thing_id")
+    finally:
+        db.close()
+        cleanup(prefix)
+
+
+async def test_fast_path_matches_item_model():
+    prefix = f"test-list-serialization-{uuid.uuid4().hex}"
+    _insert(prefix, 10)
+    list_cache.configure(enabled=False)
+    try:
+        body = json.loads((await get_intel(type="all", q=prefix, range="all", limit=50, offset=0, current_user=None)).body)
+        for item in body["items"]:
+            validated = IntelItem.model_validate(item).model_dump(mode="json")
+            if list(item) != list(validated):
+                raise AssertionError(f"fast path fields {list(item)!r} drifted from IntelItem {list(validated)!r}")
+            for name, value in validated.items():
+                if item[name] != value:
+                    raise AssertionError(f"{name}: fast path {item[name]!r} != IntelItem {value!r}")
+        if {t["color"] for x in body["items"] for t in x["tags"]} - {"red", "blue"}:
+            raise AssertionError("an unknown tag color reached the fast path output")
+    finally:
+        list_cache.configure()
+        cleanup(prefix)
+
+
+async def run_benchmark(count: int = 1000, rounds: int = 10):
+    prefix = f"test-list-serialization-bench-{uuid.uuid4().hex}"
+    _insert(prefix, count)
+    # Serialization cost only: every round goes to the database.
+    list_cache.configure(enabled=False)
+    db = SessionLocal()
+    try:
+        # The old path: ORM objects -> IntelItem -> response_model validation -> JSON.
+        def orm_page():
+            rows = (
+                db.query(db_models.IntelItemDB)
+                .filter(db_models.IntelItemDB.title.ilike(f"%{prefix}%"))
+                .order_by(db_models.IntelItemDB.timestamp.desc())
+                .limit(count)
+                .all()
+            )
+            db.expunge_all()
+            return [IntelItem(
+                id=r.id, title=r.title, summary=r.summary, source=r.source, url=r.url, time=r.publish_time_str,
+                timestamp=r.timestamp, tags=crud._tag_dicts(r.tags), favorited=r.favorited, is_hot=r.is_hot,
+                content=r.content, thing_id=r.thing_id, cluster_id=r.cluster_id,
+            ) for r in rows]
+
+        timings = {}
+        for name in ("validated", "fast"):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                if name == "validated":
+                    items = orm_page()
+                    body = await _validated_body(items, len(items))
+                else:
+                    body = (await get_intel(type="all", q=prefix, range="all", limit=count, offset=0, current_user=None)).body
+            timings[name] = (time.perf_counter() - started) / rounds
+            if len(json.loads(body)["items"]) != count:
+                raise AssertionError(f"{name} page does not hold {count} items")
+        print(
+            f"list page of {count} items: {timings['validated'] * 1000:.1f}ms validated, "
+            f"{timings['fast'] * 1000:.1f}ms on the fast path ({timings['validated'] / timings['fast']:.1f}x)"
+        )
+        if timings["fast"] > timings["validated"]:
+            raise AssertionError("fast list path slower than the validated one")
+    finally:
+        list_cache.configure()
+        db.close()
+        cleanup(prefix)
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_list_pages_match_the_schema())
+    asyncio.run(test_fast_path_matches_item_model())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("list serialization tests passed")
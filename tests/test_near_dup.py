@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import crud
+from app.agent.orchestrator import orchestrator
+from app.database import SessionLocal
+from app.models import IntelItem
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.near_dup import NearDupIndex, fingerprint, hamming, near_dup_index
+
+STORY_TITLE = "美国商务部宣布对华芯片出口新限制"
+STORY_SUMMARY = "美国商务部周二宣布，将进一步收紧对中国的先进芯片出口管制，涉及多家企业和研究机构。"
+
+
+def test_fingerprint_distance():
+    same = fingerprint(STORY_TITLE, STORY_SUMMARY)
+    repost = fingerprint(STORY_TITLE + "！", STORY_SUMMARY.replace("，", " "))
+    other = fingerprint("欧盟通过人工智能法案最终文本", "欧洲议会以压倒性多数通过人工智能法案，该法案将分阶段实施并设立监管机构。")
+    if same is None or hamming(same, repost) != 0:
+        raise AssertionError("punctuation-only changes should not change the fingerprint")
+    if hamming(same, other) <= 10:
+        raise AssertionError(f"unrelated stories too close: {hamming(same, other)} bits")
+    if not (-(1 << 63) <= same < (1 << 63)):
+        raise AssertionError("fingerprint does not fit a signed BIGINT")
+    if fingerprint("短标题", "") is not None:
+        raise AssertionError("texts that are too short should not be fingerprinted")
+
+
+def test_index_threshold_and_window():
+    index = NearDupIndex(max_distance=3, window_seconds=3600)
+    base = random.Random(1).getrandbits(64)
+    if index.check_and_add("a", base, 1000.0) is not None:
+        raise AssertionError("first item flagged")
+    if index.check_and_add("b", base ^ 0b1011, 1100.0) != "a":
+        raise AssertionError("item within 3 bits not flagged")
+    if index.check_and_add("c", base ^ 0b11111, 1200.0) is not None:
+        raise AssertionError("item 5 bits away flagged")
+    if index.check_and_add("a", base, 1300.0) is not None:
+        raise AssertionError("an edit of an indexed item matched itself")
+    if index.check_and_add("d", base, 1000.0 + 3 * 3600) is not None:
+        raise AssertionError("match outside the time window")
+    if "a" in index._entries:
+        raise AssertionError(f"expired entry not evicted: {index.stats()!r}")
+
+
+async def test_pipeline_flags_near_duplicates():
+    prefix = f"test-neardup-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    near_dup_index.clear()
+    now = time.time()
+    items = [
+        IntelItem(id=f"{prefix}-1", title=STORY_TITLE, summary=STORY_SUMMARY, source="a", time="", timestamp=now, tags=[], thing_id=f"{prefix}-t1"),
+        IntelItem(id=f"{prefix}-2", title=STORY_TITLE + "。", summary=STORY_SUMMARY, source="b", time="", timestamp=now + 60, tags=[], thing_id=f"{prefix}-t2"),
+    ]
+
+    q = asyncio.Queue()
+    orchestrator.listeners.append(q)
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+        frames = []
+        while not q.empty():
+            frames.append(q.get_nowait())
+        if any(f"{prefix}-2" in f for f in frames) or not any(f"{prefix}-1" in f for f in frames):
+            raise AssertionError(f"near-duplicate was broadcast: {frames!r}")
+
+        db = SessionLocal()
+        try:
+            dup = crud.get_intel_by_id(db, f"{prefix}-2")
+            listed, _ = crud.get_filtered_intel(db, q=STORY_TITLE, limit=50)
+        finally:
+            db.close()
+        if not dup or dup.duplicate_of != f"{prefix}-1" or dup.simhash is None:
+            raise AssertionError("near-duplicate not persisted with duplicate_of")
+        if any(x.id == f"{prefix}-2" for x in listed):
+            raise AssertionError("near-duplicate still listed")
+    finally:
+        orchestrator.listeners.remove(q)
+        await pipeline.stop()
+        near_dup_index.clear()
+        cleanup(prefix)
+
+
+async def test_edit_keeps_verdict_and_cluster():
+    prefix = f"test-neardup-edit-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    near_dup_index.clear()
+    now = time.time()
+    other_title, other_summary = "欧盟通过人工智能法案最终文本", "欧洲议会以压倒性多数通过人工智能法案，该法案将分阶段实施并设立监管机构。"
+    story = IntelItem(id=f"{prefix}-1", title=STORY_TITLE, summary=STORY_SUMMARY, source="a", time="", timestamp=now, tags=[])
+    other = IntelItem(id=f"{prefix}-2", title=other_title, summary=other_summary, source="b", time="", timestamp=now + 60, tags=[])
+    try:
+        await pipeline.submit_many([story, other], lambda x: x, source="test")
+        await pipeline.drain()
+        db = SessionLocal()
+        try:
+            cluster_id = crud.get_intel_by_id(db, story.id).cluster_id
+        finally:
+            db.close()
+
+        # The edit now reads like the other story; a fresh pipeline has nothing in flight, so it looks the row up.
+        await pipeline.stop()
+        pipeline = IngestPipeline()
+        edit = story.model_copy(update={"title": other_title + "。", "summary": other_summary})
+        await pipeline.submit(edit, lambda x: x, source="test", event="intel_updated")
+        await pipeline.drain()
+        db = SessionLocal()
+        try:
+            row = crud.get_intel_by_id(db, story.id)
+            listed, _ = crud.get_filtered_intel(db, q=other_title, limit=50)
+        finally:
+            db.close()
+        if row.duplicate_of or row.cluster_id != cluster_id or row.title != edit.title:
+            raise AssertionError(f"edit changed the item's verdict or cluster: {row.duplicate_of!r} {row.cluster_id!r} != {cluster_id!r}")
+        if story.id not in [x.id for x in listed]:
+            raise AssertionError("edited canonical item dropped from the list")
+    finally:
+        await pipeline.stop()
+        near_dup_index.clear()
+        cleanup(prefix)
+
+
+def run_benchmark(count: int = 1_000_000):
+    rng = random.Random(42)
+    words = [f"w{i}" for i in range(5000)]
+    sample = 20000
+    texts = [(" ".join(rng.choices(words, k=8)), " ".join(rng.choices(words, k=40))) for _ in range(sample)]
+    started = time.perf_counter()
+    for title, summary in texts:
+        fingerprint(title, summary)
+    fp_us = (time.perf_counter() - started) / sample * 1e6
+
+    index = NearDupIndex(max_distance=3, window_seconds=float(count))
+    fps = [rng.getrandbits(64) for _ in range(count)]
+    started = time.perf_counter()
+    for i, fp in enumerate(fps):
+        index.check_and_add(str(i), fp, float(i))
+    insert_s = time.perf_counter() - started
+
+    probes = 10000
+    hits = 0
+    started = time.perf_counter()
+    for i in range(probes):
+        fp = fps[rng.randrange(count)] ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        hits += index.find(f"probe-{i}", fp, float(count)) is not None
+    lookup_us = (time.perf_counter() - started) / probes * 1e6
+
+    print(
+        f"near-dup @ {count} items: fingerprint {fp_us:.1f}us/item, "
+        f"check_and_add {insert_s / count * 1e6:.1f}us/item ({insert_s:.1f}s total), "
+        f"lookup {lookup_us:.1f}us, recall of 2-bit variants {hits / probes:.3f}"
+    )
+    if hits != probes:
+        raise AssertionError("LSH lookup missed a fingerprint within the threshold")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    test_fingerprint_distance()
+    test_index_threshold_and_window()
+    asyncio.run(test_pipeline_flags_near_duplicates())
+    asyncio.run(test_edit_keeps_verdict_and_cluster())
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("near-dup tests passed")
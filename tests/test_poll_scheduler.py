@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from app.services.base_poller import BasePoller, PollError
+from app.services.poll_scheduler import AdaptivePollScheduler, parse_retry_after, BREAKER_OPEN, BREAKER_HALF_OPEN, BREAKER_CLOSED
+
+
+def run_burst_and_backoff_test():
+    s = AdaptivePollScheduler(base_interval=10, jitter=0)
+    s.record_success(5)
+    s.record_success(5)
+    if s.interval != s.min_interval:
+        raise AssertionError(f"burst mode did not reach min_interval: {s.interval}")
+
+    for _ in range(10):
+        s.record_success(0)
+    if s.interval != s.idle_max_interval:
+        raise AssertionError(f"empty polls did not back off to idle_max_interval: {s.interval}")
+
+    s.record_success(1)
+    if s.interval >= s.base_interval:
+        raise AssertionError(f"new data did not snap back below base interval: {s.interval}")
+
+
+def run_retry_after_test():
+    if parse_retry_after("30") != 30.0:
+        raise AssertionError("delta-seconds Retry-After not parsed")
+    if parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") != 0.0:
+        raise AssertionError("past HTTP-date Retry-After should clamp to 0")
+    if parse_retry_after("garbage") is not None:
+        raise AssertionError("invalid Retry-After should be ignored")
+
+    s = AdaptivePollScheduler(base_interval=1, jitter=0)
+    s.record_failure("429", retry_after=30)
+    if s.next_delay() < 29:
+        raise AssertionError(f"Retry-After not honored: {s.next_delay()}")
+
+
+def run_circuit_breaker_test():
+    s = AdaptivePollScheduler(base_interval=1, jitter=0, failure_threshold=3, cooldown=60)
+    for _ in range(3):
+        s.record_failure("500")
+    if s.breaker_state != BREAKER_OPEN or s.allow_request():
+        raise AssertionError("breaker did not open after threshold failures")
+
+    s.open_until = 0
+    if not s.allow_request() or s.breaker_state != BREAKER_HALF_OPEN:
+        raise AssertionError("breaker did not move to half-open after cooldown")
+    s.record_failure("500")
+    if s.breaker_state != BREAKER_OPEN:
+        raise AssertionError("failed half-open probe should re-open the breaker")
+
+    s.open_until = 0
+    s.allow_request()
+    s.record_success(0)
+    if s.breaker_state != BREAKER_CLOSED:
+        raise AssertionError("successful half-open probe should close the breaker")
+
+
+class _ScriptedPoller(BasePoller):
+    def __init__(self, script):
+        super().__init__("scripted")
+        self.script = list(script)
+        self.calls = 0
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def _poll_step(self):
+        self.calls += 1
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+async def test_base_poller_feeds_scheduler():
+    poller = _ScriptedPoller([PollError("503", 503, retry_after=5)] * 5 + [3])
+    poller.scheduler.reset(1)
+    for _ in range(6):
+        await poller._run_step()
+
+    status = poller.get_status()
+    if status["breaker_state"] != BREAKER_OPEN:
+        raise AssertionError(f"unexpected breaker state: {status!r}")
+    if poller.calls != 5:
+        raise AssertionError(f"open breaker should skip polling, calls={poller.calls}")
+    if status["last_error"] != "503" or status["consecutive_failures"] != 5:
+        raise AssertionError(f"unexpected status: {status!r}")
+
+
+if __name__ == "__main__":
+    run_burst_and_backoff_test()
+    run_retry_after_test()
+    run_circuit_breaker_test()
+    asyncio.run(test_base_poller_feeds_scheduler())
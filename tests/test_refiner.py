@@ -0,0 +1,170 @@
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import db_models
+from app.database import SessionLocal
+from app.models import IntelItem, Tag
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.refiner import Refiner, refiner
+
+
+class StubModel:
+    """Local stand-in for the LLM: fixed latency per call, prefixes the title"""
+
+    def __init__(self, latency: float = 0.02, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.docs = 0
+        self.running = 0
+        self.peak = 0
+
+    async def refine_batch(self, docs):
+        self.calls += 1
+        self.docs += len(docs)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail:
+                raise RuntimeError("model unavailable")
+            return [{"title": f"译:{d['title']}", "summary": d["summary"], "tags": ["芯片", {"label": "出口管制", "color": "red"}]} for d in docs]
+        finally:
+            self.running -= 1
+
+
+def _item(i: int, text: str = "", **kwargs) -> IntelItem:
+    return IntelItem(
+        id=str(i), title=text or f"title {i}", summary="summary", content="content", source="t", time="", timestamp=float(i),
+        tags=[Tag(label="芯片", color="blue")], **kwargs,
+    )
+
+
+async def test_batches_and_caches_by_content():
+    model = StubModel()
+    r = Refiner()
+    r.configure(model=model, batch_size=4, concurrency=2)
+    # 10 items, two of which repeat the text of another one.
+    items = [_item(i) for i in range(8)] + [_item(8, "title 0"), _item(9, "title 1")]
+    out = await r.refine_many(items)
+    if [x.id for x in out] != [x.id for x in items] or out[8].title != "译:title 0":
+        raise AssertionError(f"unexpected refinement: {[x.title for x in out]!r}")
+    if model.calls != 2 or model.docs != 8 or model.peak != 2:
+        raise AssertionError(f"expected 2 batched calls of 4 with both slots used: {model.__dict__!r}")
+    if [(t.label, t.color) for t in out[0].tags] != [("芯片", "blue"), ("出口管制", "red")] or not out[0].refine_hash:
+        raise AssertionError(f"tags not merged: {out[0].tags!r}")
+
+    again = await r.refine_many([_item(20, "title 3"), _item(21, "title 7")])
+    if model.calls != 2 or again[0].title != "译:title 3":
+        raise AssertionError("re-polled content was sent to the model again")
+    stats = r.stats()
+    if stats["hits"] != 4 or stats["misses"] != 8:
+        raise AssertionError(f"unexpected stats: {stats!r}")
+
+    dup = _item(30, "title 30", duplicate_of="0")
+    if (await r.refine_many([dup]))[0] is not dup or model.calls != 2:
+        raise AssertionError("near-duplicates must not be refined")
+
+
+async def test_overload_failure_and_timeout_pass_through():
+    r = Refiner()
+    r.configure(model=StubModel())
+    items = [_item(i) for i in range(3)]
+    out = await r.refine_many(items, overloaded=True)
+    if any(a is not b for a, b in zip(out, items)) or r.stats()["bypassed"] != 3:
+        raise AssertionError("overloaded refinement did not pass items through")
+
+    r.configure(model=StubModel(fail=True))
+    out = await r.refine_many(items)
+    if any(a is not b for a, b in zip(out, items)) or r.stats()["failed"] != 3 or r.stats()["cache_entries"]:
+        raise AssertionError("a failed call must pass through without caching")
+
+    r.configure(model=StubModel(latency=1.0), timeout=0.05)
+    started = time.perf_counter()
+    out = await r.refine_many(items)
+    if time.perf_counter() - started > 0.5 or out[0] is not items[0]:
+        raise AssertionError("a slow model call was not cut off by the timeout")
+
+
+async def test_pipeline_refines_and_persists_hash():
+    prefix = f"test-refine-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    refiner.configure(model=StubModel(latency=0.001), batch_size=4)
+    items = [
+        IntelItem(id=f"{prefix}-{i}", title=f"Chip export rule {uuid.uuid4().hex}", summary="s", source="test", time="", timestamp=time.time(), tags=[Tag(label="来源", color="blue")])
+        for i in range(6)
+    ]
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+        db = SessionLocal()
+        try:
+            rows = db.query(db_models.IntelItemDB).filter(db_models.IntelItemDB.id.like(f"{prefix}-%")).all()
+        finally:
+            db.close()
+        if len(rows) != 6 or not all(r.title.startswith("译:") and r.refine_hash for r in rows):
+            raise AssertionError(f"refined items not persisted: {[(r.title, r.refine_hash) for r in rows]!r}")
+        if pipeline.in_flight:
+            raise AssertionError(f"in-flight items not released: {list(pipeline.in_flight)!r}")
+
+        if [t["label"] for t in rows[0].refine_tags] != ["芯片", "出口管制"] or any(t["label"] == "来源" for t in rows[0].refine_tags):
+            raise AssertionError(f"model tags not persisted apart from source tags: {rows[0].refine_tags!r}")
+
+        warmed = Refiner()
+        warmed.configure(model=StubModel())
+        warmed.load_recent(SessionLocal)
+        # The same text from another source keeps its own tags plus only the model's.
+        repost = items[0].model_copy(update={"id": f"{prefix}-repost", "tags": [Tag(label="转载", color="gray")]})
+        out = await warmed.refine_many([repost])
+        if warmed.model.calls or out[0].title != f"译:{items[0].title}":
+            raise AssertionError("persisted refinement did not warm the cache")
+        if [t.label for t in out[0].tags] != ["转载", "芯片", "出口管制"]:
+            raise AssertionError(f"warmed refinement replayed another item's tags: {out[0].tags!r}")
+    finally:
+        await pipeline.stop()
+        refiner.configure()
+        cleanup(prefix)
+
+
+async def run_benchmark(docs: int = 4000, repeat_ratio: float = 0.5, latency: float = 0.02):
+    rng = random.Random(9)
+    unique = int(docs * (1 - repeat_ratio))
+    stream = [_item(i, f"title {rng.randrange(unique) if i >= unique else i}") for i in range(docs)]
+
+    async def run(batch_size: int, concurrency: int, count: int):
+        model = StubModel(latency)
+        r = Refiner()
+        r.configure(model=model, batch_size=batch_size, concurrency=concurrency)
+        started = time.perf_counter()
+        step = batch_size * concurrency
+        for i in range(0, count, step):
+            await r.refine_many(stream[i:i + step])
+        return count / (time.perf_counter() - started), r.stats()
+
+    naive_rate, _ = await run(1, 1, 200)
+    rate, stats = await run(8, 4, docs)
+    print(
+        f"refiner @ {latency * 1000:.0f}ms/call: one doc per call {naive_rate:.0f} docs/s; batched x8 with 4 slots {rate:.0f} docs/s, "
+        f"{stats['calls']} calls for {docs} docs, hit rate {stats['hit_rate']:.2f}"
+    )
+    if rate < naive_rate * 10 or stats["sent"] != unique:
+        raise AssertionError(f"batching/caching ineffective: {stats!r}")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    asyncio.run(test_batches_and_caches_by_content())
+    asyncio.run(test_overload_failure_and_timeout_pass_through())
+    asyncio.run(test_pipeline_refines_and_persists_hash())
+    if "--benchmark" in sys.argv[1:]:
+        asyncio.run(run_benchmark())
+    print("refiner tests passed")
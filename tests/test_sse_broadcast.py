@@ -130,6 +130,44 @@ async def test_broadcast_five_messages():
     await agen.aclose()
 
 
+async def test_broadcast_many_sends_one_batch_frame():
+    orchestrator = AgentOrchestrator()
+    orchestrator.global_cache.clear()
+    orchestrator.global_cache.append({"id": "seed-1", "title": "seed", "summary": "seed", "timestamp": 0, "tags": [], "favorited": False, "is_hot": True})
+
+    agen = orchestrator.run_global_stream()
+    initial = await _read_until_event(agen, "initial_batch", timeout_s=2.0)
+    if not initial:
+        raise AssertionError("did not receive initial_batch event")
+
+    payloads = [
+        {"id": f"batch-{i+1}", "title": f"t-{i+1}", "summary": "s", "content": "full body", "timestamp": i + 1, "tags": [], "favorited": False, "is_hot": True}
+        for i in range(100)
+    ]
+    await orchestrator.broadcast_many("new_intel", payloads)
+
+    if orchestrator.listeners[0].qsize() != 1:
+        raise AssertionError(f"expected a single enqueue per listener, got {orchestrator.listeners[0].qsize()}")
+
+    msg = await _read_until_event(agen, "new_intel_batch", timeout_s=2.0)
+    if not msg:
+        raise AssertionError("did not receive new_intel_batch event")
+
+    data_line = next((p for p in msg.split("\n") if p.startswith("data: ")), None)
+    data = json.loads(data_line[len("data: ") :])
+    if [x.get("id") for x in data] != [p["id"] for p in payloads]:
+        raise AssertionError("unexpected batch payload order")
+    if any("content" in x for x in data):
+        raise AssertionError("batch frame should not carry full content")
+
+    cached_ids = [x.get("id") for x in orchestrator.global_cache]
+    if cached_ids[-100:] != [p["id"] for p in payloads] or orchestrator.get_cached_intel("batch-1").get("content") != "full body":
+        raise AssertionError("batch not appended to the cache with content")
+
+    await agen.aclose()
+
+
 if __name__ == "__main__":
     asyncio.run(test_broadcast_new_intel())
     asyncio.run(test_broadcast_five_messages())
+    asyncio.run(test_broadcast_many_sends_one_batch_frame())
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app import crud
+from app.database import SessionLocal
+from app.models import IntelItem
+from app.routes.intel import get_story_clusters
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.near_dup import near_dup_index
+from app.services.story_clusters import StoryClusterEngine, story_clusters
+
+CHIPS = [
+    ("美国商务部宣布对华芯片出口新限制", "美国商务部周二宣布收紧先进芯片出口管制，英伟达等企业受影响。"),
+    ("英伟达回应美国芯片出口管制新规", "英伟达表示将遵守美国商务部的芯片出口管制规定，并评估对中国市场的影响。"),
+    ("中方回应美国芯片出口管制", "外交部发言人表示，美国滥用出口管制措施限制芯片贸易，中方将采取必要措施。"),
+]
+AI_ACT = [
+    ("欧盟通过人工智能法案", "欧洲议会投票通过人工智能法案，对高风险人工智能系统提出严格要求。"),
+    ("人工智能法案获欧洲议会批准", "欧盟人工智能法案将分阶段生效，违规企业最高面临全球营业额罚款。"),
+]
+
+
+def test_related_reports_share_a_cluster():
+    engine = StoryClusterEngine(window_seconds=3600)
+    now = 1_000_000.0
+    chip_ids = {engine.assign(f"chip-{i}", t, s, now + i) for i, (t, s) in enumerate(CHIPS)}
+    ai_ids = {engine.assign(f"ai-{i}", t, s, now + 10 + i) for i, (t, s) in enumerate(AI_ACT)}
+    if chip_ids != {"chip-0"} or ai_ids != {"ai-0"}:
+        raise AssertionError(f"unexpected clusters: chips={chip_ids} ai={ai_ids}")
+
+    listed = {c["id"]: c["size"] for c in engine.list_clusters(min_size=2)}
+    if listed != {"chip-0": 3, "ai-0": 2}:
+        raise AssertionError(f"unexpected cluster listing: {listed!r}")
+
+    if engine.assign("chip-1", "完全不同的标题", "内容", now + 20) != "chip-0":
+        raise AssertionError("an item already in the window changed cluster")
+
+    engine.assign("late", "遥远未来的一条新闻报道", "与之前的任何报道都不相关的内容。", now + 3 * 3600)
+    if "chip-0" in engine.clusters or engine.cluster_of("chip-0") is not None:
+        raise AssertionError(f"cluster outside the window not evicted: {engine.stats()!r}")
+
+
+def test_reload_keeps_persisted_cluster_ids():
+    engine = StoryClusterEngine()
+    if engine.assign("x", CHIPS[0][0], CHIPS[0][1], 1.0, cluster_id="persisted") != "persisted":
+        raise AssertionError("persisted cluster id not kept")
+    if engine.assign("y", CHIPS[1][0], CHIPS[1][1], 2.0) != "persisted":
+        raise AssertionError("new item did not join a reloaded cluster")
+
+
+async def test_pipeline_persists_cluster_and_lists_it():
+    prefix = f"test-cluster-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    story_clusters.clear()
+    near_dup_index.clear()
+    now = time.time()
+    items = [
+        IntelItem(id=f"{prefix}-{i}", title=t, summary=s, source="test", time="", timestamp=now + i, tags=[])
+        for i, (t, s) in enumerate(CHIPS)
+    ]
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+        db = SessionLocal()
+        try:
+            stored = crud.get_by_ids(db, [x.id for x in items])
+        finally:
+            db.close()
+        if {x.cluster_id for x in stored} != {f"{prefix}-0"}:
+            raise AssertionError(f"cluster ids not persisted: {[x.cluster_id for x in stored]!r}")
+
+        res = await get_story_clusters(min_size=2, limit=10, current_user=None)
+        if not res["clusters"] or res["clusters"][0]["id"] != f"{prefix}-0" or res["clusters"][0]["size"] != 3:
+            raise AssertionError(f"unexpected /clusters response: {res!r}")
+    finally:
+        await pipeline.stop()
+        story_clusters.clear()
+        near_dup_index.clear()
+        cleanup(prefix)
+
+
+def run_benchmark(window: int = 50_000, probes: int = 5000):
+    rng = random.Random(3)
+    common = [f"c{i}" for i in range(300)]
+    topics = [[f"t{k}w{i}" for i in range(30)] for k in range(window // 6)]
+
+    def item():
+        words = topics[rng.randrange(len(topics))]
+        return " ".join(rng.sample(words, 6)), " ".join(rng.sample(words, 12) + rng.choices(common, k=15))
+
+    engine = StoryClusterEngine(window_seconds=float(window + probes) * 2)
+    for i in range(window):
+        engine.assign(str(i), *item(), float(i))
+    docs = [item() for _ in range(probes)]
+    started = time.perf_counter()
+    for i, (title, summary) in enumerate(docs):
+        engine.assign(f"p{i}", title, summary, float(window + i))
+    per_item_ms = (time.perf_counter() - started) / probes * 1000
+    print(f"story clustering: {per_item_ms:.3f}ms per assignment against a {window}-item window ({len(engine.clusters)} clusters)")
+    if per_item_ms >= 1.0:
+        raise AssertionError(f"assignment too slow: {per_item_ms:.3f}ms")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    test_related_reports_share_a_cluster()
+    test_reload_keeps_persisted_cluster_ids()
+    asyncio.run(test_pipeline_persists_cluster_and_lists_it())
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("story cluster tests passed")
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from intel_fixtures import cleanup, ensure_schema
+
+from app.database import SessionLocal
+from app.models import IntelItem
+from app.routes.intel import get_similar_intel
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.vector_index import HashingEmbedder, VectorIndex, vector_index
+
+CHIPS = [
+    ("美国商务部宣布对华芯片出口新限制", "美国商务部周二宣布收紧先进芯片出口管制，英伟达等企业受影响。"),
+    ("英伟达回应美国芯片出口管制新规", "英伟达表示将遵守美国商务部的芯片出口管制规定，并评估对中国市场的影响。"),
+    ("中方回应美国芯片出口管制", "外交部发言人表示，美国滥用出口管制措施限制芯片贸易，中方将采取必要措施。"),
+]
+OTHER = [
+    ("欧盟通过人工智能法案", "欧洲议会投票通过人工智能法案，对高风险人工智能系统提出严格要求。"),
+    ("苹果发布新款手机", "苹果公司在发布会上推出新款手机和手表。"),
+]
+
+
+def _clustered(rng: np.random.Generator, count: int, dim: int, centers: int = 200) -> np.ndarray:
+    means = rng.standard_normal((centers, dim)).astype(np.float32)
+    data = means[rng.integers(0, centers, count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def test_similar_ranking_and_filters():
+    index = VectorIndex()
+    now = time.time()
+    for i, (title, summary) in enumerate(CHIPS):
+        index.upsert(f"chip-{i}", title, summary, None, i != 2, now)
+    for i, (title, summary) in enumerate(OTHER):
+        index.upsert(f"other-{i}", title, summary, None, True, now)
+
+    hits = [x for x, _ in index.similar("chip-0", top_k=2)]
+    if set(hits) != {"chip-1", "chip-2"}:
+        raise AssertionError(f"related reports not ranked first: {hits!r}")
+    if "chip-0" in [x for x, _ in index.similar("chip-0", top_k=10)]:
+        raise AssertionError("an item is listed as similar to itself")
+    if "chip-2" in [x for x, _ in index.similar("chip-0", top_k=10, type_filter="hot")]:
+        raise AssertionError("type filter not applied")
+    if index.similar("missing") is not None:
+        raise AssertionError("unindexed item should return None")
+
+    index.remove("chip-1")
+    index.upsert("other-1", "英伟达芯片出口受限", "美国芯片出口管制影响英伟达。", None, True, now)
+    hits = [x for x, _ in index.similar("chip-0", top_k=2)]
+    if "chip-1" in hits or "other-1" not in hits or len(index) != 4:
+        raise AssertionError(f"remove/re-upsert not reflected: {hits!r}")
+
+    a, b = HashingEmbedder().embed(["芯片出口管制"]), HashingEmbedder().embed(["芯片出口管制"])
+    if not np.array_equal(a, b) or abs(float(np.linalg.norm(a)) - 1.0) > 1e-5:
+        raise AssertionError("hashing embedder is not deterministic and normalized")
+
+
+def test_memmap_growth_and_ivf():
+    rng = np.random.default_rng(1)
+    dim, count = 32, 6000
+    data = _clustered(rng, count, dim, centers=40)
+    ids = [str(i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(HashingEmbedder(dim), path=os.path.join(tmp, "vectors.f32"), ivf_threshold=4000, nprobe=6)
+        for start in range(0, count, 500):
+            index.add_vectors(ids[start:start + 500], data[start:start + 500], [True] * 500, [0.0] * 500)
+        if not isinstance(index._vectors, np.memmap) or index.stats()["ivf_lists"] == 0:
+            raise AssertionError(f"expected a memmapped, IVF-partitioned index: {index.stats()!r}")
+
+        # Rows removed and reused after training must not be listed twice.
+        for i in range(100):
+            index.remove(str(i))
+        index.add_vectors([f"n{i}" for i in range(100)], data[:100], [True] * 100, [0.0] * 100)
+
+        recall = []
+        for q in data[rng.integers(0, count, 50)]:
+            exact = [x for x, _ in index.search(q, top_k=10, exact=True)[0]]
+            approx = [x for x, _ in index.search(q, top_k=10)[0]]
+            if len(set(approx)) != len(approx) or any(x in approx for x in ("0", "1", "2")):
+                raise AssertionError(f"stale or duplicate rows in IVF results: {approx!r}")
+            recall.append(len(set(exact) & set(approx)) / 10)
+        if statistics.mean(recall) < 0.9:
+            raise AssertionError(f"IVF recall too low: {statistics.mean(recall):.2f}")
+        index._vectors = None
+
+
+async def test_pipeline_indexes_and_similar_route():
+    prefix = f"test-vector-{uuid.uuid4().hex}"
+    pipeline = IngestPipeline()
+    now = time.time()
+    items = [
+        IntelItem(id=f"{prefix}-{i}", title=t, summary=s, source="test", time="", timestamp=now + i, tags=[], is_hot=True)
+        for i, (t, s) in enumerate(CHIPS + OTHER)
+    ]
+    try:
+        await pipeline.submit_many(items, lambda x: x, source="test")
+        await pipeline.drain()
+        if any(x.id not in vector_index for x in items):
+            raise AssertionError("persisted items were not embedded")
+
+        db = SessionLocal()
+        try:
+            res = await get_similar_intel(f"{prefix}-0", limit=2, type="hot", db=db, current_user=None)
+        finally:
+            db.close()
+        if {x.id for x in res["items"]} != {f"{prefix}-1", f"{prefix}-2"} or len(res["scores"]) != 2:
+            raise AssertionError(f"unexpected /similar response: {res!r}")
+    finally:
+        await pipeline.stop()
+        for x in items:
+            vector_index.remove(x.id)
+        cleanup(prefix)
+
+
+def run_benchmark(count: int = 200_000, dim: int = 256, queries: int = 200):
+    rng = np.random.default_rng(7)
+    data = _clustered(rng, count, dim)
+    index = VectorIndex(HashingEmbedder(dim), ivf_threshold=0, nprobe=16)
+    index.add_vectors([str(i) for i in range(count)], data, [True] * count, [0.0] * count)
+    probes = data[rng.integers(0, count, queries)]
+
+    def timed(**kwargs):
+        latencies, results = [], []
+        for q in probes:
+            started = time.perf_counter()
+            results.append([x for x, _ in index.search(q, top_k=10, **kwargs)[0]])
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        return latencies, results
+
+    exact_lat, exact = timed(exact=True)
+    started = time.perf_counter()
+    index.search(probes, top_k=10, exact=True)
+    batch_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    index.train_ivf()
+    train_s = time.perf_counter() - started
+    ivf_lat, approx = timed()
+    recall = statistics.mean(len(set(a) & set(b)) / 10 for a, b in zip(exact, approx))
+    p95 = lambda xs: xs[int(len(xs) * 0.95) - 1]
+    print(
+        f"vectors @ {count}x{dim}: exact p50={statistics.median(exact_lat):.2f}ms p95={p95(exact_lat):.2f}ms, "
+        f"batch of {queries} {batch_ms:.0f}ms; IVF ({index.stats()['ivf_lists']} lists, trained in {train_s:.1f}s) "
+        f"p50={statistics.median(ivf_lat):.2f}ms p95={p95(ivf_lat):.2f}ms recall@10={recall:.3f}"
+    )
+    if recall < 0.9:
+        raise AssertionError(f"IVF recall too low: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    ensure_schema()
+    test_similar_ranking_and_filters()
+    test_memmap_growth_and_ivf()
+    asyncio.run(test_pipeline_indexes_and_similar_route())
+    if "--benchmark" in sys.argv[1:]:
+        run_benchmark()
+    print("vector index tests passed")